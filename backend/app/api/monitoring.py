@@ -0,0 +1,24 @@
+from flask import Blueprint, Response, jsonify
+from app.core.auth import admin_required
+from app.core.instrumentation import render_prometheus
+from app.db.session import get_pool_stats
+
+monitoring_bp = Blueprint('monitoring', __name__, url_prefix='/api')
+
+@monitoring_bp.route('/pool', methods=['GET'])
+@admin_required
+def pool_stats_endpoint():
+    """Live connection pool statistics for sizing the pool against the worker count"""
+    return jsonify({
+        "success": True,
+        "data": get_pool_stats()
+    }), 200
+
+@monitoring_bp.route('/metrics', methods=['GET'])
+@admin_required
+def metrics_endpoint():
+    """Per-endpoint request, SQL and pool metrics in the Prometheus text format"""
+    return Response(
+        render_prometheus(get_pool_stats()),
+        mimetype="text/plain; version=0.0.4",
+    )
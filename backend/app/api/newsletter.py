@@ -1,9 +1,40 @@
-from flask import Blueprint, jsonify, request
+import io
+from typing import Optional
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from app.core.auth import admin_required
 from app.db.session import get_db
-from app.crud.newsletter import subscribe_to_newsletter as create_subscription, is_email_subscribed
+from app.crud.newsletter import (
+    ALREADY_SUBSCRIBED,
+    EXPORT_FORMATS,
+    INVALID_EMAIL,
+    REACTIVATED,
+    SUBSCRIBED,
+    bulk_import_subscribers,
+    export_active_subscribers,
+    iter_csv_emails,
+    unsubscribe_from_newsletter as remove_subscription,
+    upsert_subscription,
+)
+from app.crud.outbox import enqueue_newsletter_welcome
 
 newsletter_bp = Blueprint('newsletter', __name__, url_prefix='/api/newsletter')
 
+# Status code, message and success flag for each upsert_subscription outcome
+SUBSCRIBE_RESPONSES = {
+    SUBSCRIBED: (201, "Successfully subscribed to newsletter", True),
+    REACTIVATED: (200, "Welcome back! Your newsletter subscription has been reactivated", True),
+    ALREADY_SUBSCRIBED: (409, "This email is already subscribed to the newsletter", False),
+    INVALID_EMAIL: (400, "Please enter a valid email address", False),
+}
+
+def subscription_response(email: Optional[str], outcome: str) -> tuple:
+    """Build the (status code, body) pair for an upsert_subscription outcome"""
+    status, message, success = SUBSCRIBE_RESPONSES[outcome]
+    body = {"message": message, "success": success}
+    if success:
+        body["data"] = {"email": email}
+    return status, body
+
 @newsletter_bp.route('/subscribe', methods=['POST'])
 def subscribe_endpoint():
     """Subscribe a user to the newsletter"""
@@ -21,28 +52,12 @@ def subscribe_endpoint():
 
         # Get database session
         with get_db() as db:
-            # Check if email is already subscribed
-            if is_email_subscribed(db, email):
-                return jsonify({
-                    "message": "This email is already subscribed to the newsletter",
-                    "success": False
-                }), 409  # Conflict status code
-
-            # Create the subscription
+            # Insert, reactivate or detect an active subscription in one statement
             try:
-                # Store the result of create_subscription
-                newsletter_subscription = create_subscription(
-                    db=db,
-                    email=email
-                )
-                
-                # Return successful response with the subscription data
-                return jsonify({
-                    "message": "Successfully subscribed to newsletter",
-                    "success": True,
-                    "data": {"email": email}
-                }), 201
-
+                outcome, email = upsert_subscription(db=db, email=email)
+                if outcome in (SUBSCRIBED, REACTIVATED):
+                    # Sent by the outbox worker once this transaction commits
+                    enqueue_newsletter_welcome(db, email)
             except Exception as e:
                 # Handle any errors from the subscription creation
                 return jsonify({
@@ -50,6 +65,9 @@ def subscribe_endpoint():
                     "success": False
                 }), 500
 
+        status, body = subscription_response(email, outcome)
+        return jsonify(body), status
+
     except Exception as e:
         # Catch any unexpected errors
         return jsonify({
@@ -84,13 +102,18 @@ def unsubscribe_from_newsletter():
 
         # Get database session
         with get_db() as db:
-            # Implement unsubscribe logic here
-            # This would call a function like remove_subscription(db, email)
-            # For now, we'll return a placeholder response
+            unsubscribed = remove_subscription(db, email)
+
+        if not unsubscribed:
             return jsonify({
-                "message": "Successfully unsubscribed from newsletter",
-                "success": True
-            }), 200
+                "message": "This email is not subscribed to the newsletter",
+                "success": False
+            }), 404
+
+        return jsonify({
+            "message": "Successfully unsubscribed from newsletter",
+            "success": True
+        }), 200
 
     except Exception as e:
         # Catch any unexpected errors
@@ -98,3 +121,56 @@ def unsubscribe_from_newsletter():
             "message": f"An unexpected error occurred: {str(e)}",
             "success": False
         }), 500
+
+
+@newsletter_bp.route('/export', methods=['GET'])
+@admin_required
+def export_endpoint():
+    """Stream every active subscriber as CSV or NDJSON"""
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({
+            "message": f"Invalid format. Use one of: {', '.join(EXPORT_FORMATS)}",
+            "success": False
+        }), 400
+
+    def generate():
+        # The session lives as long as the response is being streamed, on a replica if there is one
+        with get_db(readonly=True) as db:
+            yield from export_active_subscribers(db, export_format)
+
+    mimetype = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename=subscribers.{export_format}"},
+    )
+
+
+@newsletter_bp.route('/import', methods=['POST'])
+@admin_required
+def import_endpoint():
+    """Bulk import subscribers from a CSV upload (multipart "file" field or raw text/csv body)"""
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+
+    try:
+        source = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+        with get_db() as db:
+            report = bulk_import_subscribers(db, iter_csv_emails(source))
+    except UnicodeDecodeError:
+        return jsonify({
+            "message": "The CSV file must be UTF-8 encoded",
+            "success": False
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "message": f"Error importing subscribers: {str(e)}",
+            "success": False
+        }), 500
+
+    return jsonify({
+        "message": "Import completed",
+        "success": True,
+        "data": report
+    }), 200
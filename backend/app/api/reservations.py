@@ -1,82 +1,194 @@
-from flask import Blueprint, jsonify, request
+import base64
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from datetime import datetime, timedelta
-from crud.reservation import create_reservation
+from typing import Optional, Tuple
+from app.crud.reservation import create_reservation, get_availability, list_reservations
+from app.core.auth import admin_required
+from app.core.serialization import dumps, row_dicts
+from app.crud.occupancy import get_nightly_occupancy, get_slot_utilization
+from app.crud.idempotency import (
+    MAX_IDEMPOTENCY_KEY_LENGTH,
+    StoredResponse,
+    cached_response,
+    lock_idempotency_key,
+    request_fingerprint,
+    save_idempotent_response,
+)
+from app.crud.outbox import enqueue_reservation_confirmation
 from app.db.session import get_db
 
 
 reservations_bp = Blueprint('reservations', __name__, url_prefix='/api/reservations')
 
+# Longest range the availability endpoint will compute in one call
+MAX_AVAILABILITY_DAYS = 31
+
+# Rows per page of the admin listing, by default and at most
+DEFAULT_LISTING_LIMIT = 100
+MAX_LISTING_LIMIT = 5000
+
+# Longest range of an occupancy report, three years
+MAX_REPORT_DAYS = 1096
+
+def parse_reservation_payload(reservation_data: dict) -> Tuple[Optional[dict], Optional[dict]]:
+    """
+    Validate a reservation request body from the frontend.
+
+    Shared by the Flask endpoint and the ASGI entry point.
+
+    Args:
+        reservation_data: JSON body with email, date, time, guests, name and phone,
+            and optionally duration in minutes
+
+    Returns:
+        Tuple of (create_reservation keyword arguments, None) when valid,
+        or (None, error response body) when not
+    """
+    # Extract fields from the frontend payload
+    email = reservation_data.get('email')
+    date_str = reservation_data.get('date')
+    time_str = reservation_data.get('time')
+    guest_count = reservation_data.get('guests')
+    
+    # Get customer information
+    name = reservation_data.get('name', '')
+    phone = reservation_data.get('phone', '')
+    
+    # Validate required fields
+    if not all([email, date_str, time_str, guest_count, name]):
+        return None, {
+            "message": "Missing required fields: email, date, time, guests, and name are required",
+            "success": False
+        }
+        
+    try:
+        # Combine date and time strings into a datetime object
+        reservation_datetime = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %I:%M %p")
+    except ValueError:
+        return None, {
+            "message": "Invalid date or time format. Use YYYY-MM-DD for date and HH:MM for time",
+            "success": False
+        }
+        
+    # Validate guest count
+    try:
+        guest_count = int(guest_count)
+        if guest_count <= 0:
+            raise ValueError("Guest count must be positive")
+    except (ValueError, TypeError):
+        return None, {
+            "message": "Invalid guest count. Must be a positive number",
+            "success": False
+        }
+
+    booking = {
+        "email": email,
+        "name": name,
+        "phone": phone,
+        "reservation_date": reservation_datetime,
+        "guest_count": guest_count,
+    }
+
+    # Optional length of the booking, the restaurant's default otherwise
+    duration = reservation_data.get('duration')
+    if duration is not None:
+        try:
+            booking["duration_minutes"] = int(duration)
+            if booking["duration_minutes"] <= 0:
+                raise ValueError("Duration must be positive")
+        except (ValueError, TypeError):
+            return None, {
+                "message": "Invalid duration. Must be a positive number of minutes",
+                "success": False
+            }
+
+    return booking, None
+
+def parse_idempotency_key(key: Optional[str]) -> Optional[dict]:
+    """Error response body for an unusable Idempotency-Key header, None if it is absent or valid"""
+    if key is not None and not (0 < len(key) <= MAX_IDEMPOTENCY_KEY_LENGTH):
+        return {
+            "message": f"Idempotency-Key must be 1 to {MAX_IDEMPOTENCY_KEY_LENGTH} characters",
+            "success": False
+        }
+    return None
+
+def replay_response(stored: Optional[StoredResponse], request_hash: str) -> Optional[Tuple[int, dict]]:
+    """
+    The (status code, body) to answer a repeated Idempotency-Key with.
+
+    Args:
+        stored: Response stored for the key, from cached_response or lock_idempotency_key
+        request_hash: request_fingerprint of this request's body
+
+    Returns:
+        The first response for the same body, a 422 if the key was used for a
+        different body, or None if nothing is stored for the key
+    """
+    if stored is None:
+        return None
+    stored_hash, status, body = stored
+    if stored_hash != request_hash:
+        return 422, {
+            "message": "This Idempotency-Key was already used for a different reservation request",
+            "success": False
+        }
+    return status, body
+
 @reservations_bp.route('', methods=['POST'])
 def create_reservation_endpoint():
     """Create a new reservation with proper table availability checking"""
     # Get the JSON data from the request
     reservation_data = request.json
+    # Retries with the same key get the first response instead of booking again
+    idempotency_key = request.headers.get('Idempotency-Key')
 
     # Extract required fields from the reservation data
     try:
-        # Extract fields from the frontend payload
-        email = reservation_data.get('email')
-        date_str = reservation_data.get('date')
-        time_str = reservation_data.get('time')
-        guest_count = reservation_data.get('guests')
-        
-        # Get customer information
-        name = reservation_data.get('name', '')
-        phone = reservation_data.get('phone', '')
-        
-        # Validate required fields
-        if not all([email, date_str, time_str, guest_count, name]):
-            return jsonify({
-                "message": "Missing required fields: email, date, time, guests, and name are required",
-                "success": False
-            }), 400
-            
-        try:
-            # Combine date and time strings into a datetime object
-            reservation_datetime = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %I:%M %p")
-        except ValueError:
-            return jsonify({
-                "message": "Invalid date or time format. Use YYYY-MM-DD for date and HH:MM for time",
-                "success": False
-            }), 400
-            
-        # Validate guest count
-        try:
-            guest_count = int(guest_count)
-            if guest_count <= 0:
-                raise ValueError("Guest count must be positive")
-        except (ValueError, TypeError):
-            return jsonify({
-                "message": "Invalid guest count. Must be a positive number",
-                "success": False
-            }), 400
+        booking, error = parse_reservation_payload(reservation_data)
+        error = error or parse_idempotency_key(idempotency_key)
+        if error:
+            return jsonify(error), 400
+
+        if idempotency_key is not None:
+            request_hash = request_fingerprint(reservation_data)
+            replay = replay_response(cached_response(idempotency_key), request_hash)
+            if replay:
+                return jsonify(replay[1]), replay[0]
             
         # Get database session - use the session yielded by the context manager
         with get_db() as db:                
+            if idempotency_key is not None:
+                # Waits for an in-flight request with the same key to commit
+                replay = replay_response(lock_idempotency_key(db, idempotency_key), request_hash)
+                if replay:
+                    return jsonify(replay[1]), replay[0]
+
             # Create the reservation with the available table
             try:
-                response = create_reservation(
-                    db=db,
-                    email=email,
-                    name=name,
-                    phone=phone,
-                    reservation_date=reservation_datetime,
-                    guest_count=guest_count,
-                )
-
-                # Check response status and return appropriate error code
-                if not response.get("success"):
-                    return jsonify(response), 400
-
-                # Return successful response
-                return jsonify(response), 201
-                
+                response = create_reservation(db=db, **booking)
             except Exception as e:
                 # Handle any errors from the reservation creation
                 return jsonify({
                     "message": f"Error creating reservation: {str(e)}",
                     "success": False
                 }), 500
+
+            if response.get("retryable"):
+                # Not an outcome for this key: the rollback releases its lock without
+                # storing anything, so a retry with the same key books afresh
+                db.rollback()
+                return jsonify(response), 503
+
+            # Check response status and return appropriate error code
+            status = 201 if response.get("success") else 400
+            if response.get("success"):
+                # Sent by the outbox worker once this transaction commits
+                enqueue_reservation_confirmation(db, response)
+            if idempotency_key is not None:
+                save_idempotent_response(db, idempotency_key, request_hash, status, response)
+
+        return jsonify(response), status
             
     except Exception as e:
         # Catch any unexpected errors
@@ -85,3 +197,192 @@ def create_reservation_endpoint():
             "success": False
         }), 500
 
+
+@reservations_bp.route('/availability', methods=['GET'])
+def availability_endpoint():
+    """Return free table counts for every bookable slot in a date range"""
+    try:
+        # Default to a single day starting today
+        from_str = request.args.get('from') or datetime.now().strftime("%Y-%m-%d")
+        to_str = request.args.get('to') or from_str
+
+        try:
+            start_date = datetime.strptime(from_str, "%Y-%m-%d").date()
+            end_date = datetime.strptime(to_str, "%Y-%m-%d").date()
+        except ValueError:
+            return jsonify({
+                "message": "Invalid date format. Use YYYY-MM-DD for from and to",
+                "success": False
+            }), 400
+
+        if end_date < start_date:
+            return jsonify({
+                "message": "The to date must not be before the from date",
+                "success": False
+            }), 400
+
+        if (end_date - start_date).days >= MAX_AVAILABILITY_DAYS:
+            return jsonify({
+                "message": f"Date range cannot exceed {MAX_AVAILABILITY_DAYS} days",
+                "success": False
+            }), 400
+
+        # Availability may trail the primary by the replication lag, like any cached answer
+        with get_db(readonly=True) as db:
+            slots = get_availability(db, start_date, end_date)
+
+        return jsonify({
+            "success": True,
+            "data": {
+                "from": start_date.strftime("%Y-%m-%d"),
+                "to": end_date.strftime("%Y-%m-%d"),
+                "slots": slots,
+            }
+        }), 200
+
+    except Exception as e:
+        # Catch any unexpected errors
+        return jsonify({
+            "message": f"An unexpected error occurred: {str(e)}",
+            "success": False
+        }), 500
+
+
+def encode_cursor(reservation_date: datetime, reservation_id: int) -> str:
+    """Opaque cursor pointing just after a listed reservation"""
+    raw = f"{reservation_date.isoformat()}|{reservation_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor; raises ValueError for anything it did not produce"""
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    reservation_date, _, reservation_id = raw.partition("|")
+    return datetime.fromisoformat(reservation_date), int(reservation_id)
+
+
+@reservations_bp.route('', methods=['GET'])
+@admin_required
+def list_reservations_endpoint():
+    """
+    List reservations with their customers for managers, one page at a time.
+
+    Query parameters: from and to (YYYY-MM-DD, default today), status, table,
+    limit (default 100, at most 5000) and cursor, the next_cursor of the
+    previous page. The page is streamed as it is read from the database.
+    """
+    today = datetime.now().strftime("%Y-%m-%d")
+    try:
+        start_date = datetime.strptime(request.args.get('from') or today, "%Y-%m-%d").date()
+        end_date = datetime.strptime(request.args.get('to') or request.args.get('from') or today, "%Y-%m-%d").date()
+    except ValueError:
+        return jsonify({
+            "message": "Invalid date format. Use YYYY-MM-DD for from and to",
+            "success": False
+        }), 400
+
+    if end_date < start_date:
+        return jsonify({
+            "message": "The to date must not be before the from date",
+            "success": False
+        }), 400
+
+    try:
+        table_number = request.args.get('table', type=int)
+        limit = int(request.args.get('limit', DEFAULT_LISTING_LIMIT))
+        if not 0 < limit <= MAX_LISTING_LIMIT or (table_number is not None and table_number <= 0):
+            raise ValueError("out of range")
+    except ValueError:
+        return jsonify({
+            "message": f"Invalid table or limit. limit must be between 1 and {MAX_LISTING_LIMIT}",
+            "success": False
+        }), 400
+
+    cursor = request.args.get('cursor')
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        return jsonify({
+            "message": "Invalid cursor. Pass the next_cursor of the previous page",
+            "success": False
+        }), 400
+
+    filters = dict(status=request.args.get('status') or None, table_number=table_number, after=after)
+
+    def generate():
+        # The session lives as long as the response is being streamed. One row
+        # past the page is read to tell whether another page follows.
+        with get_db(readonly=True) as db:
+            yield b'{"success":true,"data":{"reservations":['
+            read, sent, last = 0, 0, None
+            for rows in list_reservations(db, start_date, end_date, limit=limit + 1, **filters):
+                read += len(rows)
+                rows = rows[:limit - sent]
+                if rows:
+                    yield (b"," if sent else b"") + dumps(row_dicts(rows))[1:-1]
+                    sent += len(rows)
+                    last = rows[-1]
+            next_cursor = encode_cursor(last.reservation_date, last.id) if read > limit else None
+            yield b'],"next_cursor":' + dumps(next_cursor) + b'}}'
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
+
+
+@reservations_bp.route('/occupancy', methods=['GET'])
+@admin_required
+def occupancy_report_endpoint():
+    """
+    Occupancy report for managers, read from the occupancy summary only.
+
+    Query parameters: from and to (YYYY-MM-DD, default the last 90 days) and
+    group, either night (bookings, covers and peak tables per night, the
+    default) or slot (bookings, covers and utilization per time of day).
+    """
+    today = datetime.now().date()
+    try:
+        end_date = datetime.strptime(request.args['to'], "%Y-%m-%d").date() if request.args.get('to') else today
+        start_date = (datetime.strptime(request.args['from'], "%Y-%m-%d").date() if request.args.get('from')
+                      else end_date - timedelta(days=89))
+    except ValueError:
+        return jsonify({
+            "message": "Invalid date format. Use YYYY-MM-DD for from and to",
+            "success": False
+        }), 400
+
+    if end_date < start_date:
+        return jsonify({
+            "message": "The to date must not be before the from date",
+            "success": False
+        }), 400
+
+    if (end_date - start_date).days >= MAX_REPORT_DAYS:
+        return jsonify({
+            "message": f"Date range cannot exceed {MAX_REPORT_DAYS} days",
+            "success": False
+        }), 400
+
+    group = request.args.get('group', 'night')
+    reports = {"night": get_nightly_occupancy, "slot": get_slot_utilization}
+    if group not in reports:
+        return jsonify({
+            "message": "Invalid group. Use night or slot",
+            "success": False
+        }), 400
+
+    try:
+        with get_db(readonly=True) as db:
+            rows = reports[group](db, start_date, end_date)
+    except Exception as e:
+        return jsonify({
+            "message": f"An unexpected error occurred: {str(e)}",
+            "success": False
+        }), 500
+
+    return jsonify({
+        "success": True,
+        "data": {
+            "from": start_date.strftime("%Y-%m-%d"),
+            "to": end_date.strftime("%Y-%m-%d"),
+            "group": group,
+            "rows": rows,
+        }
+    }), 200
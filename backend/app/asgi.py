@@ -0,0 +1,248 @@
+"""
+ASGI entry point serving the booking and newsletter APIs on the async database stack.
+
+POST /api/reservations and POST /api/newsletter/subscribe are handled natively
+with an AsyncSession over asyncpg. Every other request (static pages, the
+remaining API routes, CORS preflight) is passed to the Flask app through
+uvicorn's WSGI adapter.
+
+Run from the backend directory:
+
+    uvicorn app.asgi:app --port 8080
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from pydantic_core import from_json
+from uvicorn.middleware.wsgi import WSGIMiddleware
+from app.api.newsletter import subscription_response
+from app.api.reservations import parse_idempotency_key, parse_reservation_payload, replay_response
+from app.core.admission import get_admission_controller
+from app.core.instrumentation import RequestMetrics, current_request, endpoint_stats
+from app.core.serialization import dumps
+from app.crud.idempotency import (
+    cached_response,
+    lock_idempotency_key_async,
+    request_fingerprint,
+    save_idempotent_response_async,
+)
+from app.crud.newsletter import REACTIVATED, SUBSCRIBED, upsert_subscription_async
+from app.crud.outbox import enqueue_newsletter_welcome, enqueue_reservation_confirmation
+from app.crud.reservation import create_reservation_async
+from app.db.config import settings
+from app.db.session import dispose_async_engine, dispose_engine, get_async_db, warm_async_pool
+from app.main import create_app, warm_up
+
+_flask_asgi: Optional[WSGIMiddleware] = None
+
+
+def get_flask_asgi() -> WSGIMiddleware:
+    """The Flask app serving every route but the native ones, built at startup or by the first request."""
+    global _flask_asgi
+    if _flask_asgi is None:
+        # Warmup runs in lifespan startup, once per worker process uvicorn starts.
+        # Flask requests run on WEB_THREADS threads, each holding at most one pooled connection.
+        _flask_asgi = WSGIMiddleware(create_app(warmup=False), workers=settings.WEB_THREADS)
+    return _flask_asgi
+
+
+async def create_reservation_view(reservation_data: dict, headers: Dict[str, str]) -> Tuple[int, dict]:
+    """Async counterpart of create_reservation_endpoint"""
+    try:
+        idempotency_key = headers.get("idempotency-key")
+        booking, error = parse_reservation_payload(reservation_data)
+        error = error or parse_idempotency_key(idempotency_key)
+        if error:
+            return 400, error
+
+        if idempotency_key is not None:
+            request_hash = request_fingerprint(reservation_data)
+            replay = replay_response(cached_response(idempotency_key), request_hash)
+            if replay:
+                return replay
+
+        async with get_async_db() as db:
+            if idempotency_key is not None:
+                replay = replay_response(await lock_idempotency_key_async(db, idempotency_key), request_hash)
+                if replay:
+                    return replay
+            try:
+                response = await create_reservation_async(db, **booking)
+                # Sent by the outbox worker once this transaction commits
+                enqueue_reservation_confirmation(db, response)
+            except Exception as e:
+                return 500, {
+                    "message": f"Error creating reservation: {str(e)}",
+                    "success": False
+                }
+            if response.get("retryable"):
+                # Releases the key's lock without storing anything, as in the Flask endpoint
+                await db.rollback()
+                return 503, response
+            status = 201 if response.get("success") else 400
+            if idempotency_key is not None:
+                await save_idempotent_response_async(db, idempotency_key, request_hash, status, response)
+
+        return status, response
+
+    except Exception as e:
+        return 500, {
+            "message": f"An unexpected error occurred: {str(e)}",
+            "success": False
+        }
+
+
+async def subscribe_view(subscription_data: dict, headers: Dict[str, str]) -> Tuple[int, dict]:
+    """Async counterpart of subscribe_endpoint"""
+    try:
+        email = subscription_data.get('email')
+        if not email:
+            return 400, {
+                "message": "Missing required field: email is required",
+                "success": False
+            }
+
+        async with get_async_db() as db:
+            try:
+                outcome, email = await upsert_subscription_async(db, email)
+                if outcome in (SUBSCRIBED, REACTIVATED):
+                    enqueue_newsletter_welcome(db, email)
+            except Exception as e:
+                return 500, {
+                    "message": f"Error creating subscription: {str(e)}",
+                    "success": False
+                }
+
+        return subscription_response(email, outcome)
+
+    except Exception as e:
+        return 500, {
+            "message": f"An unexpected error occurred: {str(e)}",
+            "success": False
+        }
+
+
+# (method, path) -> (Flask endpoint it replaces, view taking the decoded JSON body and
+# the lower-cased request headers); admission control counts both under the endpoint
+ASYNC_ROUTES: Dict[Tuple[str, str], Tuple[str, Callable[[dict, Dict[str, str]], Awaitable[Tuple[int, dict]]]]] = {
+    ("POST", "/api/reservations"): ("reservations.create_reservation_endpoint", create_reservation_view),
+    ("POST", "/api/newsletter/subscribe"): ("newsletter.subscribe_endpoint", subscribe_view),
+}
+
+
+async def read_body(receive) -> bytes:
+    """Collect the full request body from the ASGI receive channel."""
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def send_json(send, status: int, payload: dict, headers: Optional[Dict[str, str]] = None) -> int:
+    """
+    Send a JSON response with the same CORS header Flask-CORS adds, plus any extra headers.
+
+    Returns:
+        Size of the body in bytes
+    """
+    body = dumps(payload)
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"access-control-allow-origin", b"*"),
+            *((name.lower().encode(), value.encode()) for name, value in (headers or {}).items()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+    return len(body)
+
+
+async def send_timed_json(send, endpoint: str, metrics: RequestMetrics, status: int, payload: dict,
+                          headers: Optional[Dict[str, str]] = None) -> None:
+    """send_json with the Server-Timing header and ENDPOINT_STATS entry Flask's hooks give its routes."""
+    total = time.perf_counter() - metrics.started
+    size = await send_json(send, status, payload, {**(headers or {}), "Server-Timing": metrics.server_timing(total)})
+    endpoint_stats(endpoint).observe(metrics, total, status, size)
+
+
+async def lifespan(receive, send) -> None:
+    """
+    Warm up on startup if WARMUP_ON_START is set, and drain on shutdown.
+
+    uvicorn sends the shutdown event once in-flight requests have finished or
+    the graceful shutdown timeout cancelled them. Cancelling a request passed to
+    Flask does not stop its thread, so a booking may still be mid-transaction:
+    wait for the WSGI threads to finish before closing the pooled connections.
+    """
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            get_flask_asgi()
+            if settings.WARMUP_ON_START:
+                # Both stacks serve requests: the async pool for the native routes,
+                # the sync pool and caches for everything passed to Flask
+                await warm_async_pool()
+                await asyncio.to_thread(warm_up)
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            if _flask_asgi is not None:
+                await asyncio.to_thread(_flask_asgi.executor.shutdown, wait=True)
+            await asyncio.to_thread(dispose_engine)
+            await dispose_async_engine()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def serve_route(scope, receive, send, endpoint: str, view, metrics: RequestMetrics) -> None:
+    """Decode the JSON body, apply admission control and answer with one of ASYNC_ROUTES."""
+    try:
+        data = from_json(await read_body(receive) or b"null")
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        await send_timed_json(send, endpoint, metrics, 400,
+                              {"message": "Request body must be a JSON object", "success": False})
+        return
+
+    headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope.get("headers", [])}
+    admission_controller = get_admission_controller()
+    if admission_controller.enabled:
+        # Never waits for a concurrency slot, which would block the event loop
+        client = admission_controller.client_address((scope.get("client") or (None,))[0],
+                                                     headers.get("x-forwarded-for"))
+        rejection = admission_controller.admit(endpoint.split(".")[0], endpoint, client, wait=0)
+        if rejection:
+            await send_timed_json(send, endpoint, metrics, rejection.status, rejection.body,
+                                  {"Retry-After": str(rejection.retry_after)})
+            return
+    try:
+        status, payload = await view(data, headers)
+    finally:
+        if admission_controller.enabled:
+            admission_controller.release(endpoint)
+    await send_timed_json(send, endpoint, metrics, status, payload)
+
+
+async def app(scope, receive, send) -> None:
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+
+    route = ASYNC_ROUTES.get((scope.get("method"), scope.get("path", "").rstrip("/")))
+    if scope["type"] != "http" or route is None:
+        await get_flask_asgi()(scope, receive, send)
+        return
+
+    endpoint, view = route
+    # Timed and counted under the Flask endpoint it replaces, like requests that reach Flask
+    metrics = RequestMetrics()
+    token = current_request.set(metrics)
+    try:
+        await serve_route(scope, receive, send, endpoint, view, metrics)
+    finally:
+        current_request.reset(token)
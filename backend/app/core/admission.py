@@ -0,0 +1,318 @@
+import fcntl
+import hashlib
+import math
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from multiprocessing import shared_memory
+from typing import Dict, NamedTuple, Optional, Tuple
+from flask import Blueprint, g, jsonify, request
+from app.db.config import settings
+
+# (key hash, tokens, last refill) of one bucket in the shared memory table
+_SLOT = struct.Struct("<Qdd")
+# Slots looked at for a key before the least recently used one is taken over
+_PROBES = 8
+
+
+def _take_token(tokens: float, updated: float, now: float, rate: float, burst: float) -> Tuple[float, float]:
+    """Refill a bucket for the time since ``updated`` and take one token: (tokens left, seconds to wait)."""
+    tokens = min(burst, tokens + (now - updated) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+
+class MemoryBucketStore:
+    """Token buckets private to one worker process, the least recently used dropped past ``max_buckets``."""
+
+    def __init__(self, max_buckets: int = 4096):
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        """
+        Take a token from a bucket, creating it full.
+
+        Args:
+            key: Bucket key, e.g. blueprint and client address
+            rate: Tokens added per second
+            burst: Bucket size
+
+        Returns:
+            0.0 if a token was taken, otherwise seconds until one is available
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens, wait = _take_token(tokens, updated, now, rate, burst)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+class SharedMemoryBucketStore:
+    """
+    Token buckets in a POSIX shared memory segment, shared by every worker
+    process on the host that opens the same ``name``.
+
+    The segment is a fixed table of ``slots`` buckets addressed by a hash of
+    the key with linear probing. When the probed slots are all taken, the one
+    refilled longest ago is reused; an idle bucket is full again by then, so
+    forgetting it loses nothing. Updates are serialized with flock on a lock
+    file next to the segment. CLOCK_MONOTONIC is system-wide on Linux, so
+    timestamps written by one process are valid in the others.
+    """
+
+    def __init__(self, name: str, slots: int = 4096):
+        try:
+            # A new segment is zero-filled, i.e. every slot is empty
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=_SLOT.size * slots, track=False)
+        except FileExistsError:
+            self._shm = shared_memory.SharedMemory(name=name, track=False)
+        self.name = name
+        self.slots = self._shm.size // _SLOT.size
+        self._lock_fd = os.open(os.path.join(tempfile.gettempdir(), f"{name}.lock"), os.O_RDWR | os.O_CREAT, 0o600)
+        # flock is held per open file, so threads of one process also need a lock of their own
+        self._thread_lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        """Same as MemoryBucketStore.take, with the bucket shared across processes."""
+        key_hash = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+        first = key_hash % self.slots
+        with self._thread_lock:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                now = time.monotonic()
+                buffer = self._shm.buf
+                offset, tokens, updated = None, burst, now
+                reuse, reuse_updated = None, math.inf
+                for probe in range(min(_PROBES, self.slots)):
+                    slot_offset = (first + probe) % self.slots * _SLOT.size
+                    slot_hash, slot_tokens, slot_updated = _SLOT.unpack_from(buffer, slot_offset)
+                    if slot_hash == key_hash:
+                        offset, tokens, updated = slot_offset, slot_tokens, slot_updated
+                        break
+                    # Empty slots sort before every used one
+                    rank = -math.inf if slot_hash == 0 else slot_updated
+                    if rank < reuse_updated:
+                        reuse, reuse_updated = slot_offset, rank
+                tokens, wait = _take_token(tokens, updated, now, rate, burst)
+                _SLOT.pack_into(buffer, reuse if offset is None else offset, key_hash, tokens, now)
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+        return wait
+
+    def clear(self) -> None:
+        """Empty every bucket, e.g. between benchmark runs."""
+        with self._thread_lock:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                self._shm.buf[:] = bytes(len(self._shm.buf))
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+
+class Rejection(NamedTuple):
+    """Why a request was not admitted: its status code, JSON body and Retry-After seconds."""
+    status: int
+    body: dict
+    retry_after: int
+
+
+class AdmissionController:
+    """
+    Sheds API load before it reaches the database pool.
+
+    Two checks run before a protected view:
+
+    * A token bucket per client address and blueprint, refilled at
+      ``per_minute`` with room for ``burst`` requests. An empty bucket gets a
+      429 with Retry-After set to when the next token arrives.
+    * A cap on concurrent requests per endpoint, by default the pool size plus
+      overflow, so one busy endpoint cannot hold every connection and leave
+      the rest of the process (including static pages) waiting on the pool.
+      A request that cannot get a slot within ``queue_timeout`` seconds gets a
+      503 instead of queuing behind the pool timeout.
+
+    The concurrency cap is per worker process, like the pool it protects. The
+    buckets can be shared between processes with SharedMemoryBucketStore.
+    """
+
+    def __init__(self, store=None, per_minute: float = 60.0, burst: int = 20, concurrency: int = 15,
+                 queue_timeout: float = 0.1, trusted_proxies: int = 0, enabled: bool = True):
+        self._store = store
+        # Only a store this controller created from settings is recreated after a fork
+        self._store_from_settings = store is None
+        self.enabled = enabled
+        self.per_minute = per_minute
+        self.burst = burst
+        self.concurrency = concurrency
+        self.queue_timeout = queue_timeout
+        self.trusted_proxies = trusted_proxies
+        # Blueprint name -> (per_minute, burst) overriding the defaults
+        self.limits: Dict[str, Tuple[float, int]] = {}
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def store(self):
+        # Created on first use, so importing the app does not open shared memory
+        if self._store is None:
+            with self._lock:
+                if self._store is None:
+                    self._store = _store_from_settings()
+        return self._store
+
+    def client_address(self, remote_addr: Optional[str], forwarded_for: Optional[str] = None) -> str:
+        """
+        The address to rate limit: the peer, or with ``trusted_proxies`` reverse
+        proxies in front, the X-Forwarded-For entry the outermost proxy added.
+        """
+        if self.trusted_proxies and forwarded_for:
+            hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+            if len(hops) >= self.trusted_proxies:
+                return hops[-self.trusted_proxies]
+        return remote_addr or "unknown"
+
+    def _slot(self, endpoint: str) -> threading.BoundedSemaphore:
+        slot = self._slots.get(endpoint)
+        if slot is None:
+            with self._lock:
+                slot = self._slots.setdefault(endpoint, threading.BoundedSemaphore(self.concurrency))
+        return slot
+
+    def admit(self, scope: str, endpoint: str, client: str, wait: Optional[float] = None) -> Optional[Rejection]:
+        """
+        Decide whether a request may run.
+
+        Args:
+            scope: Rate limit scope, the blueprint name
+            endpoint: Endpoint whose concurrency slot is taken
+            client: Client address
+            wait: Seconds to wait for a concurrency slot, queue_timeout by default;
+                0 never blocks, for callers on an event loop
+
+        Returns:
+            None if admitted, in which case release(endpoint) must be called
+            when the request is done, otherwise the Rejection to answer with
+        """
+        per_minute, burst = self.limits.get(scope, (self.per_minute, self.burst))
+        retry_after = self.store.take(f"{scope}|{client}", per_minute / 60, burst)
+        if retry_after:
+            return Rejection(429, {
+                "message": "Too many requests, please try again shortly",
+                "success": False
+            }, math.ceil(retry_after))
+
+        wait = self.queue_timeout if wait is None else wait
+        slot = self._slot(endpoint)
+        if not (slot.acquire(timeout=wait) if wait > 0 else slot.acquire(blocking=False)):
+            return Rejection(503, {
+                "message": "The service is busy, please try again shortly",
+                "success": False
+            }, 1)
+        return None
+
+    def reset_after_fork(self) -> None:
+        """
+        Forget state a forked worker must not share with its parent.
+
+        The concurrency slots count the parent's requests, and a shared memory
+        store's flock would be held jointly with the parent through the
+        inherited file, so both are recreated on first use. The buckets
+        themselves stay shared through the segment.
+        """
+        self._lock = threading.Lock()
+        self._slots = {}
+        if self._store_from_settings:
+            self._store = None
+
+    def release(self, endpoint: str) -> None:
+        """Give back the concurrency slot of an admitted request."""
+        self._slot(endpoint).release()
+
+    def protect(self, blueprint: Blueprint, per_minute: Optional[float] = None, burst: Optional[int] = None) -> None:
+        """
+        Admit every request to a blueprint's views through this controller.
+
+        Must be called before the blueprint is registered on the app. Does
+        nothing when the controller is disabled.
+
+        Args:
+            blueprint: The API blueprint
+            per_minute: Requests per minute per client, the controller's default if None
+            burst: Requests a client may make at once, the controller's default if None
+        """
+        # A blueprint is shared by every app create_app builds, and its hooks can only be added once
+        if not self.enabled or blueprint.name in self.limits:
+            return
+        self.limits[blueprint.name] = (per_minute or self.per_minute, burst or self.burst)
+
+        @blueprint.before_request
+        def admit_request():
+            # CORS preflights never reach a view or the database
+            if request.method == "OPTIONS" or request.endpoint is None:
+                return None
+            client = self.client_address(request.remote_addr, request.headers.get("X-Forwarded-For"))
+            rejection = self.admit(blueprint.name, request.endpoint, client)
+            if rejection:
+                response = jsonify(rejection.body)
+                response.status_code = rejection.status
+                response.headers["Retry-After"] = str(rejection.retry_after)
+                return response
+            g.admitted_endpoint = request.endpoint
+            return None
+
+        @blueprint.teardown_request
+        def release_request(exc=None):
+            endpoint = g.pop("admitted_endpoint", None)
+            if endpoint is not None:
+                self.release(endpoint)
+
+
+def _store_from_settings():
+    if settings.RATE_LIMIT_BACKEND == "shared_memory":
+        return SharedMemoryBucketStore(settings.RATE_LIMIT_SHM_NAME, settings.RATE_LIMIT_SLOTS)
+    return MemoryBucketStore(settings.RATE_LIMIT_SLOTS)
+
+
+_admission_controller: Optional[AdmissionController] = None
+_admission_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    """The process-wide admission controller, configured from settings on first use."""
+    global _admission_controller
+    if _admission_controller is None:
+        with _admission_controller_lock:
+            if _admission_controller is None:
+                _admission_controller = AdmissionController(
+                    per_minute=settings.API_RATE_LIMIT_PER_MINUTE,
+                    burst=settings.API_RATE_LIMIT_BURST,
+                    concurrency=settings.API_CONCURRENCY_LIMIT or settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW,
+                    queue_timeout=settings.API_QUEUE_TIMEOUT_SECONDS,
+                    trusted_proxies=settings.TRUSTED_PROXY_COUNT,
+                    enabled=settings.ADMISSION_CONTROL_ENABLED,
+                )
+    return _admission_controller
+
+
+def _reset_after_fork() -> None:
+    global _admission_controller_lock
+    _admission_controller_lock = threading.Lock()
+    if _admission_controller is not None:
+        _admission_controller.reset_after_fork()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
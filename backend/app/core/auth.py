@@ -0,0 +1,29 @@
+import hmac
+from functools import wraps
+from flask import jsonify, request
+from app.db.config import settings
+
+
+def admin_required(view):
+    """
+    Restrict a Flask view to callers presenting ``Authorization: Bearer <ADMIN_API_TOKEN>``.
+
+    Admin endpoints stay disabled until ADMIN_API_TOKEN is configured.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not settings.ADMIN_API_TOKEN:
+            return jsonify({
+                "message": "Admin endpoints are disabled: ADMIN_API_TOKEN is not configured",
+                "success": False
+            }), 403
+
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not hmac.compare_digest(supplied, settings.ADMIN_API_TOKEN):
+            return jsonify({
+                "message": "Invalid or missing admin token",
+                "success": False
+            }), 401
+
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Optional, Tuple
+from app.db.config import settings
+
+
+class DateRangeCache:
+    """
+    Small LRU cache for results computed over an inclusive date range.
+
+    Entries expire after ``ttl`` seconds and can be invalidated by any date
+    they cover, so a new booking only drops the cached ranges it affects.
+    Without a ``ttl``, AVAILABILITY_CACHE_TTL_SECONDS is read on each lookup.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self._ttl = ttl
+        self._entries: "OrderedDict[Tuple[date, date], Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self) -> float:
+        return settings.AVAILABILITY_CACHE_TTL_SECONDS if self._ttl is None else self._ttl
+
+    def get(self, start: date, end: date) -> Optional[Any]:
+        """Return the cached value for a range, or None if missing or expired."""
+        key = (start, end)
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            if time.monotonic() - entry[1] >= self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, start: date, end: date, value: Any) -> None:
+        """Store a value for a range, evicting the least recently used entry if full."""
+        with self._lock:
+            self._entries[(start, end)] = (value, time.monotonic())
+            self._entries.move_to_end((start, end))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, day: Optional[date | datetime] = None) -> None:
+        """Drop every cached range covering ``day``, or everything if no day is given."""
+        with self._lock:
+            if day is None:
+                self._entries.clear()
+                return
+            if isinstance(day, datetime):
+                day = day.date()
+            for key in [k for k in self._entries if k[0] <= day <= k[1]]:
+                del self._entries[key]
+
+
+class ExpiringLRUCache:
+    """
+    Small LRU cache of string keys where each entry carries its own expiry.
+
+    Meant for values that never change once stored, so a worker process can
+    answer repeats from memory without the database. Without ``max_entries``,
+    IDEMPOTENCY_CACHE_ENTRIES is read on each store.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self._max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def max_entries(self) -> int:
+        return settings.IDEMPOTENCY_CACHE_ENTRIES if self._max_entries is None else self._max_entries
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for a key, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            if time.monotonic() >= entry[1]:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        """Store a value for ``ttl`` seconds, evicting the least recently used entry if full."""
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Both read their limits from settings on use, so importing them needs no configuration
+availability_cache = DateRangeCache()
+# Stored reservation responses by Idempotency-Key, see app/crud/idempotency.py
+idempotency_cache = ExpiringLRUCache()
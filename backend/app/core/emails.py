@@ -0,0 +1,52 @@
+from datetime import datetime
+from typing import Tuple
+
+RESTAURANT_SIGNATURE = """Café Fausse
+1234 Culinary Ave, Suite 100, Washington, DC 20002
+(202) 555-4567"""
+
+# EmailOutbox.kind of each email the site sends
+RESERVATION_CONFIRMATION = "reservation_confirmation"
+NEWSLETTER_WELCOME = "newsletter_welcome"
+
+
+def reservation_confirmation(data: dict, updated: bool = False) -> Tuple[str, str]:
+    """
+    Render the confirmation for a booking.
+
+    Args:
+        data: The "data" of a successful create_reservation response
+        updated: Whether an existing booking's guest count was changed
+
+    Returns:
+        Tuple of (subject, body)
+    """
+    when = datetime.strptime(f"{data['date']} {data['time']}", "%Y-%m-%d %H:%M")
+    day = when.strftime("%A, %B %d").replace(" 0", " ")
+    hour = when.strftime("%I:%M %p").lstrip("0")
+    guests = data["guest_count"]
+    party = f"{guests} guest" + ("" if guests == 1 else "s")
+
+    subject = ("Your reservation has been updated" if updated else "Your reservation is confirmed") + f" - {day}"
+    body = f"""Dear {data['name']},
+
+{"We've updated your reservation" if updated else "Thank you for booking with us. Your table is reserved"} for {party} on {day} at {hour}.
+
+If your plans change, please call us and we will be happy to help.
+
+{RESTAURANT_SIGNATURE}
+"""
+    return subject, body
+
+
+def newsletter_welcome(email: str) -> Tuple[str, str]:
+    """Render the welcome email for a new or returning newsletter subscriber."""
+    subject = "Welcome to the Café Fausse newsletter"
+    body = f"""Hello,
+
+{email} is now subscribed to the Café Fausse newsletter. We'll write with special
+events, new menu items and exclusive offers.
+
+{RESTAURANT_SIGNATURE}
+"""
+    return subject, body
@@ -0,0 +1,275 @@
+import re
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from flask import Flask, Response, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.metrics import Histogram
+
+# Statements per request, from a single lookup to a runaway N+1 loop
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+# Response body sizes in bytes, from an error body to a full subscriber export
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+# Requests that match no route are aggregated under one label
+UNMATCHED_ENDPOINT = "unmatched"
+
+# "SELECT ... FROM reservations" -> ("SELECT", "reservations"), for a short label of a statement
+_STATEMENT_TARGET = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+\"?(\w+)", re.IGNORECASE)
+
+
+class RequestMetrics:
+    """Wall time, database time and statements of the request being handled."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_time = 0.0
+        self.statements = 0
+        self.slowest_time = 0.0
+        self.slowest_statement: Optional[str] = None
+
+    def record_statement(self, statement: str, duration: float) -> None:
+        self.db_time += duration
+        self.statements += 1
+        if duration >= self.slowest_time:
+            self.slowest_time = duration
+            self.slowest_statement = statement
+
+    def server_timing(self, total: float) -> str:
+        """Format as a Server-Timing header value, durations in milliseconds."""
+        plural = "" if self.statements == 1 else "s"
+        parts = [
+            f"app;dur={total * 1000:.1f}",
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.statements} statement{plural}"',
+        ]
+        if self.slowest_statement:
+            parts.append(f'slowest;dur={self.slowest_time * 1000:.1f};desc="{statement_label(self.slowest_statement)}"')
+        return ", ".join(parts)
+
+
+# The request the current thread or task is handling, if any
+current_request: ContextVar[Optional[RequestMetrics]] = ContextVar("current_request", default=None)
+
+
+def statement_label(statement: str) -> str:
+    """
+    Summarize a statement as its verb and first table, e.g. ``SELECT reservations``.
+
+    Keeps the full SQL and its parameters out of response headers.
+    """
+    words = statement.split(None, 1)
+    verb = words[0].upper() if words else ""
+    target = _STATEMENT_TARGET.search(statement)
+    return f"{verb} {target.group(1)}" if target else verb
+
+
+class EndpointStats:
+    """Aggregated request metrics for one endpoint."""
+
+    def __init__(self):
+        self.duration = Histogram()
+        self.db_time = Histogram()
+        self.statements = Histogram(STATEMENT_BUCKETS)
+        self.response_bytes = Histogram(SIZE_BUCKETS)
+        self.responses: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def observe(self, metrics: RequestMetrics, total: float, status: int, size: Optional[int] = None) -> None:
+        self.duration.observe(total)
+        self.db_time.observe(metrics.db_time)
+        self.statements.observe(metrics.statements)
+        if size is not None:
+            self.response_bytes.observe(size)
+        with self._lock:
+            self.responses[status] += 1
+
+
+# Stats per Flask endpoint name
+ENDPOINT_STATS: Dict[str, EndpointStats] = {}
+_endpoint_stats_lock = threading.Lock()
+
+
+def endpoint_stats(endpoint: str) -> EndpointStats:
+    stats = ENDPOINT_STATS.get(endpoint)
+    if stats is None:
+        with _endpoint_stats_lock:
+            stats = ENDPOINT_STATS.setdefault(endpoint, EndpointStats())
+    return stats
+
+
+def instrument_statements(engine: Engine) -> None:
+    """
+    Time every statement sent on an engine and add it to the current request's metrics.
+
+    Statements run outside a request, e.g. from scripts, are not recorded.
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if current_request.get() is not None:
+            conn.info["statement_started"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        metrics = current_request.get()
+        started = conn.info.pop("statement_started", None)
+        if metrics is not None and started is not None:
+            metrics.record_statement(statement, time.perf_counter() - started)
+
+
+class _CountedBody:
+    """
+    A streamed response body that counts its bytes and the SQL run to generate it.
+
+    ``on_done`` is called once, when the server has taken the last chunk or
+    closes the body early, e.g. because the client went away. Both are
+    needed: uvicorn's WSGI adapter never calls close().
+    """
+
+    def __init__(self, body: Iterable, metrics: RequestMetrics, on_done: Callable[["_CountedBody"], None]):
+        self.body = body
+        self.metrics = metrics
+        self.on_done: Optional[Callable[["_CountedBody"], None]] = on_done
+        self.size = 0
+
+    def __iter__(self) -> Iterator:
+        chunks = iter(self.body)
+        while True:
+            # The request's teardown has already cleared current_request by now
+            token = current_request.set(self.metrics)
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                self._done()
+                return
+            finally:
+                current_request.reset(token)
+            self.size += len(chunk if isinstance(chunk, bytes) else chunk.encode())
+            yield chunk
+
+    def close(self) -> None:
+        try:
+            close = getattr(self.body, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self._done()
+
+    def _done(self) -> None:
+        on_done, self.on_done = self.on_done, None
+        if on_done is not None:
+            on_done(self)
+
+
+def record_streamed_response(response: Response, metrics: RequestMetrics, endpoint: str) -> None:
+    """
+    Record a streamed response once the server has taken all of its body.
+
+    The body is generated after the response headers have gone out, and
+    after the request has been torn down, so its duration, SQL and size are
+    only known then; for the same reason a streamed response gets no
+    Server-Timing.
+    """
+    def record(body: _CountedBody) -> None:
+        total = time.perf_counter() - metrics.started
+        endpoint_stats(endpoint).observe(metrics, total, response.status_code, body.size)
+
+    response.response = _CountedBody(response.response, metrics, record)
+
+
+def init_request_metrics(app: Flask) -> None:
+    """Register hooks that time each request, add Server-Timing and feed ENDPOINT_STATS."""
+
+    @app.before_request
+    def start_request_metrics():
+        g.request_metrics = RequestMetrics()
+        g.request_metrics_token = current_request.set(g.request_metrics)
+
+    @app.after_request
+    def finish_request_metrics(response):
+        metrics = g.pop("request_metrics", None)
+        if metrics is None:
+            return response
+        endpoint = request.endpoint or UNMATCHED_ENDPOINT
+        if response.is_streamed:
+            record_streamed_response(response, metrics, endpoint)
+            return response
+        total = time.perf_counter() - metrics.started
+        response.headers["Server-Timing"] = metrics.server_timing(total)
+        endpoint_stats(endpoint).observe(metrics, total, response.status_code, response.content_length)
+        return response
+
+    @app.teardown_request
+    def clear_request_metrics(exc=None):
+        token = g.pop("request_metrics_token", None)
+        if token is not None:
+            current_request.reset(token)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _histogram_lines(name: str, snapshot: dict, **labels) -> List[str]:
+    lines = [f"{name}_bucket{_labels(**labels, le=bound)} {count}" for bound, count in snapshot["buckets"].items()]
+    lines.append(f"{name}_sum{_labels(**labels)} {snapshot['sum']}")
+    lines.append(f"{name}_count{_labels(**labels)} {snapshot['count']}")
+    return lines
+
+
+def render_prometheus(pool_stats: Optional[Dict[str, dict]] = None) -> str:
+    """
+    Render the endpoint histograms, and optionally pool statistics, in the
+    Prometheus text exposition format.
+
+    Args:
+        pool_stats: Output of get_pool_stats(), keyed by pool name
+
+    Returns:
+        The metrics page
+    """
+    histograms: List[Tuple[str, str, str]] = [
+        ("cafe_http_request_duration_seconds", "duration", "Wall time per request"),
+        ("cafe_http_request_db_seconds", "db_time", "Time spent in SQL statements per request"),
+        ("cafe_http_request_statements", "statements", "SQL statements per request"),
+        ("cafe_http_response_size_bytes", "response_bytes", "Response body size"),
+    ]
+    endpoints = sorted(ENDPOINT_STATS.items())
+
+    lines = []
+    for name, attribute, description in histograms:
+        lines += [f"# HELP {name} {description}", f"# TYPE {name} histogram"]
+        for endpoint, stats in endpoints:
+            lines += _histogram_lines(name, getattr(stats, attribute).snapshot(), endpoint=endpoint)
+
+    lines += ["# HELP cafe_http_responses_total Responses by endpoint and status",
+              "# TYPE cafe_http_responses_total counter"]
+    for endpoint, stats in endpoints:
+        with stats._lock:
+            responses = sorted(stats.responses.items())
+        lines += [f"cafe_http_responses_total{_labels(endpoint=endpoint, status=status)} {count}"
+                  for status, count in responses]
+
+    if pool_stats:
+        gauges = [("checked_out", "gauge", "Connections currently checked out"),
+                  ("checkouts", "counter", "Connections handed out"),
+                  ("checkout_errors", "counter", "Checkouts that failed or timed out"),
+                  ("connections_created", "counter", "New database connections opened"),
+                  ("invalidations", "counter", "Connections discarded as broken")]
+        for key, kind, description in gauges:
+            name = f"cafe_db_pool_{key}" + ("_total" if kind == "counter" else "")
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+            lines += [f"{name}{_labels(pool=pool)} {stats[key]}" for pool, stats in sorted(pool_stats.items())]
+        name = "cafe_db_pool_wait_seconds"
+        lines += [f"# HELP {name} Time to check out a connection", f"# TYPE {name} histogram"]
+        for pool, stats in sorted(pool_stats.items()):
+            lines += _histogram_lines(name, stats["wait_time_seconds"], pool=pool)
+
+    return "\n".join(lines) + "\n"
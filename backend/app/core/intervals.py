@@ -0,0 +1,61 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Iterator, List, Tuple
+
+Interval = Tuple[datetime, datetime]
+
+
+class IntervalSet:
+    """
+    Non-overlapping half-open intervals ``[start, end)`` kept sorted by start.
+
+    Because the intervals never overlap, their ends are sorted as well, so an
+    overlap check is one binary search: only the last interval starting before
+    the end of the query can reach into it. Lookups are O(log n) and inserts
+    O(n) with a small constant, against an O(n) scan of every booking.
+
+    This is the per-table structure of the occupancy index. The database
+    guarantees that a table's confirmed seatings never overlap (the
+    excl_reservation_table_seating constraint), so an interval tree, which
+    would also handle overlapping intervals, is not needed.
+    """
+
+    __slots__ = ("_starts", "_ends")
+
+    def __init__(self):
+        self._starts: List[datetime] = []
+        self._ends: List[datetime] = []
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __iter__(self) -> Iterator[Interval]:
+        return zip(self._starts, self._ends)
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        """Whether any interval overlaps ``[start, end)``."""
+        i = bisect_left(self._starts, end)
+        return i > 0 and self._ends[i - 1] > start
+
+    def add(self, start: datetime, end: datetime) -> None:
+        """
+        Insert an interval, dropping any it overlaps.
+
+        Overlapping intervals can only be stale, e.g. a booking cancelled by
+        another worker process, since the newest information wins.
+        """
+        self.remove(start, end)
+        i = bisect_left(self._starts, start)
+        self._starts.insert(i, start)
+        self._ends.insert(i, end)
+
+    def remove(self, start: datetime, end: datetime) -> None:
+        """Drop every interval overlapping ``[start, end)``."""
+        # The first candidate is the last interval starting at or before start
+        lo = max(bisect_right(self._starts, start) - 1, 0)
+        if lo < len(self._ends) and self._ends[lo] <= start:
+            lo += 1
+        hi = bisect_left(self._starts, end)
+        if lo < hi:
+            del self._starts[lo:hi]
+            del self._ends[lo:hi]
@@ -0,0 +1,221 @@
+import logging
+import queue
+import smtplib
+import threading
+from email.message import EmailMessage
+from email.utils import parseaddr
+from typing import Callable, ContextManager, List, Optional
+from sqlalchemy.orm import Session
+from app.crud.outbox import claim_due_emails, mark_failed, mark_sent
+from app.db.config import settings
+from app.models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+# Errors about one message; the SMTP session itself is still usable after RSET
+_MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+
+class SMTPConnectionPool:
+    """
+    Reusable SMTP connections, so a batch of emails pays for one TCP (and TLS)
+    handshake and login instead of one per message.
+
+    Connections are opened lazily, up to ``size`` are kept idle, and one that
+    fails at the connection level is dropped and replaced on next use.
+    """
+
+    def __init__(self, host: str, port: int, size: int = 2, timeout: float = 10.0,
+                 username: Optional[str] = None, password: Optional[str] = None,
+                 starttls: bool = False):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self._idle: "queue.LifoQueue[smtplib.SMTP]" = queue.LifoQueue(maxsize=size)
+        self.connections_opened = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password or "")
+        except Exception:
+            smtp.close()
+            raise
+        self.connections_opened += 1
+        return smtp
+
+    def _acquire(self) -> Optional[smtplib.SMTP]:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return None
+
+    def _release(self, smtp: smtplib.SMTP) -> None:
+        try:
+            self._idle.put_nowait(smtp)
+        except queue.Full:
+            _quit(smtp)
+
+    def send(self, messages: List[EmailMessage]) -> List[Optional[Exception]]:
+        """
+        Send messages over one pooled connection.
+
+        Args:
+            messages: Messages to send, in order
+
+        Returns:
+            One entry per message: None if it was accepted, otherwise the error
+        """
+        errors: List[Optional[Exception]] = []
+        smtp = self._acquire()
+        try:
+            for message in messages:
+                try:
+                    if smtp is None:
+                        smtp = self._connect()
+                    smtp.send_message(message)
+                    errors.append(None)
+                except _MESSAGE_ERRORS as e:
+                    errors.append(e)
+                    try:
+                        smtp.rset()
+                    except OSError:
+                        smtp.close()
+                        smtp = None
+                except OSError as e:
+                    # smtplib errors are OSErrors too; anything else means the
+                    # connection is unusable, the next message opens a new one
+                    errors.append(e)
+                    if smtp is not None:
+                        smtp.close()
+                        smtp = None
+        finally:
+            if smtp is not None:
+                self._release(smtp)
+        return errors
+
+    def close(self) -> None:
+        """Close every idle connection."""
+        while True:
+            smtp = self._acquire()
+            if smtp is None:
+                return
+            _quit(smtp)
+
+
+def _quit(smtp: smtplib.SMTP) -> None:
+    try:
+        smtp.quit()
+    except OSError:
+        smtp.close()
+
+
+def is_permanent(error: Exception) -> bool:
+    """Whether an SMTP error is a 5xx rejection that retrying cannot fix."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+
+def build_message(email: EmailOutbox) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = settings.EMAIL_FROM
+    message["To"] = email.recipient
+    message["Subject"] = email.subject
+    # Stable per outbox row, so a resent email can be recognized as a duplicate
+    domain = parseaddr(settings.EMAIL_FROM)[1].rpartition("@")[2] or "localhost"
+    message["Message-ID"] = f"<outbox-{email.id}@{domain}>"
+    message.set_content(email.body)
+    return message
+
+
+class OutboxWorker:
+    """
+    Drains the email outbox: claims a batch of due emails, sends them over a
+    pooled SMTP connection and records each outcome, in one transaction per batch.
+
+    Several workers, in one process or many, can run at once; each claims
+    different rows.
+    """
+
+    def __init__(self, session_factory: Callable[[], ContextManager[Session]], smtp_pool: SMTPConnectionPool,
+                 batch_size: int = 50, poll_seconds: float = 1.0):
+        self.session_factory = session_factory
+        self.smtp_pool = smtp_pool
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.sent = 0
+        self.failed = 0
+
+    def drain_batch(self) -> int:
+        """
+        Send one batch of due emails.
+
+        Returns:
+            The number of emails attempted, 0 when nothing was due
+        """
+        with self.session_factory() as db:
+            batch = claim_due_emails(db, self.batch_size)
+            if not batch:
+                return 0
+            errors = self.smtp_pool.send([build_message(email) for email in batch])
+            for email, error in zip(batch, errors):
+                if error is None:
+                    mark_sent(email)
+                    self.sent += 1
+                else:
+                    mark_failed(email, f"{type(error).__name__}: {error}", permanent=is_permanent(error))
+                    self.failed += 1
+                    logger.warning("Sending outbox email %s failed: %s", email.id, error)
+        return len(batch)
+
+    def run(self, stop: threading.Event) -> None:
+        """Drain batches until stop is set, sleeping poll_seconds whenever the outbox is empty."""
+        while not stop.is_set():
+            try:
+                attempted = self.drain_batch()
+            except Exception:
+                logger.exception("Outbox batch failed")
+                attempted = 0
+            # A full batch means more are probably due, so go again right away
+            if attempted < self.batch_size:
+                stop.wait(self.poll_seconds)
+
+
+def start_outbox_workers(session_factory: Callable[[], ContextManager[Session]], stop: threading.Event,
+                         workers: Optional[int] = None) -> List[threading.Thread]:
+    """
+    Start a pool of outbox worker threads sharing one SMTP connection pool.
+
+    Args:
+        session_factory: Context manager yielding a session that commits on exit, e.g. get_db
+        stop: Set to make the workers finish their current batch and exit
+        workers: Number of threads, defaults to settings.OUTBOX_WORKERS
+
+    Returns:
+        The started threads; each has its OutboxWorker as its ``worker`` attribute
+    """
+    workers = workers or settings.OUTBOX_WORKERS
+    smtp_pool = SMTPConnectionPool(
+        settings.SMTP_HOST,
+        settings.SMTP_PORT,
+        size=workers,
+        timeout=settings.SMTP_TIMEOUT_SECONDS,
+        username=settings.SMTP_USERNAME,
+        password=settings.SMTP_PASSWORD,
+        starttls=settings.SMTP_STARTTLS,
+    )
+    threads = []
+    for number in range(workers):
+        worker = OutboxWorker(session_factory, smtp_pool, settings.OUTBOX_BATCH_SIZE, settings.OUTBOX_POLL_SECONDS)
+        thread = threading.Thread(target=worker.run, args=(stop,), name=f"outbox-worker-{number}", daemon=True)
+        thread.worker = worker
+        thread.start()
+        threads.append(thread)
+    return threads
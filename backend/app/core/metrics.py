@@ -0,0 +1,48 @@
+import bisect
+import threading
+from typing import Dict, List, Sequence
+
+# Upper bounds in seconds, from sub-millisecond pool checkouts to slow requests
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    Thread-safe cumulative histogram with fixed bucket bounds, in the shape
+    Prometheus expects (per-bucket counts plus a running sum and count).
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Record a single observation."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        """
+        Return cumulative bucket counts keyed by upper bound, plus sum and count.
+
+        The last bucket is keyed "+Inf" and always equals the total count.
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+
+        cumulative: List[int] = []
+        running = 0
+        for bucket_count in counts:
+            running += bucket_count
+            cumulative.append(running)
+
+        buckets = {f"{bound:g}": cumulative[i] for i, bound in enumerate(self.buckets)}
+        buckets["+Inf"] = cumulative[-1]
+        return {"buckets": buckets, "sum": total, "count": count}
@@ -0,0 +1,373 @@
+import threading
+import time
+from datetime import date, datetime, timedelta
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.core.cache import availability_cache
+from app.core.intervals import IntervalSet
+from app.core.tables import TableInventory, get_table_inventory
+from app.db.config import settings
+from app.db.session import is_replica
+from app.models import Reservation
+
+# Key used to stash uncommitted table assignments on a session
+_PENDING_KEY = "occupancy_pending"
+
+# A seating of one table: (start, end, table_number)
+Claim = Tuple[datetime, datetime, int]
+
+
+class OccupancyIndex:
+    """
+    Process-local index of reserved tables over time.
+
+    For every loaded day, each table has an IntervalSet of its confirmed
+    seatings, so whether a table is free for ``[start, end)`` is a binary
+    search however full the night is. A seating that runs past midnight is
+    kept under both days. A day is loaded from the database the first time it
+    is requested and is kept up to date by the commit hooks at the bottom of
+    this module, so repeat lookups do not hit the database. Days loaded more
+    than ``ttl`` seconds ago are reloaded to pick up bookings made by other
+    worker processes. Days read through a replica session answer that lookup
+    but are not kept: bookings allocate tables from this index, and a replica
+    may not have their latest seatings yet.
+
+    Seatings picked by transactions that have not committed yet are tracked as
+    claims, so concurrent requests in the same process never pick the same table.
+    Claims are counted per seating rather than merged: tables picked by SQL can
+    be held by two transactions at once until the database turns one away, and
+    settling one claim must leave the other in place.
+
+    The inventory, ``ttl`` and ``max_duration`` default to the configured
+    layout, OCCUPANCY_TTL_SECONDS and RESERVATION_MAX_DURATION_MINUTES, read
+    when first used rather than when the index is created.
+    """
+
+    def __init__(self, inventory: Optional[TableInventory] = None, ttl: Optional[float] = None,
+                 max_duration: Optional[timedelta] = None):
+        self._inventory = inventory
+        self._ttl = ttl
+        self._max_duration = max_duration
+        self._days: Dict[date, Tuple[List[IntervalSet], float]] = {}
+        # Seatings picked by in-flight transactions in this process, per day, with
+        # how many transactions hold each
+        self._claims: Dict[date, Counter[Claim]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def inventory(self) -> TableInventory:
+        return self._inventory or get_table_inventory()
+
+    @property
+    def table_count(self) -> int:
+        return self.inventory.table_count
+
+    @property
+    def ttl(self) -> float:
+        return settings.OCCUPANCY_TTL_SECONDS if self._ttl is None else self._ttl
+
+    @property
+    def max_duration(self) -> timedelta:
+        """Longest seating, bounds how far back a day's load has to look."""
+        if self._max_duration is None:
+            return timedelta(minutes=settings.RESERVATION_MAX_DURATION_MINUTES)
+        return self._max_duration
+
+    def get_mask(self, db: Session, start: datetime, end: datetime) -> int:
+        """
+        Return the bitmap of tables reserved at any point of ``[start, end)``,
+        loading the days it spans if needed.
+
+        Args:
+            db: Database session used when a day is not cached
+            start: Start of the seating
+            end: End of the seating
+
+        Returns:
+            Bitmap of reserved tables
+        """
+        return self.get_masks(db, [(start, end)])[0]
+
+    def get_masks(self, db: Session, seatings: Sequence[Tuple[datetime, datetime]]) -> List[int]:
+        """Bitmaps of reserved tables for many seatings, loading missing days in one query."""
+        days = {day for start, end in seatings for day in days_of(start, end)}
+        now = time.monotonic()
+        with self._lock:
+            # Held on to, since another thread may invalidate them before the masks are built
+            tables_by_day = {day: self._days[day][0] for day in days
+                             if day in self._days and now - self._days[day][1] < self.ttl}
+        stale = [day for day in days if day not in tables_by_day]
+        if stale:
+            tables_by_day.update(self._load_many(db, stale, keep=not is_replica(db)))
+
+        masks = []
+        with self._lock:
+            for start, end in seatings:
+                mask = 0
+                for day in days_of(start, end):
+                    mask |= _overlapping(tables_by_day[day], start, end)
+                masks.append(mask)
+        return masks
+
+    def cached_mask(self, start: datetime, end: datetime) -> int:
+        """
+        Bitmap of reserved and claimed tables known without querying; days
+        that are not loaded or have expired only contribute their claims.
+        """
+        mask = 0
+        now = time.monotonic()
+        with self._lock:
+            for day in days_of(start, end):
+                entry = self._days.get(day)
+                if entry and now - entry[1] < self.ttl:
+                    mask |= _overlapping(entry[0], start, end)
+                if day in self._claims:
+                    mask |= _claimed(self._claims[day], start, end)
+        return mask
+
+    def load(self, db: Session, day: date | datetime) -> None:
+        """Load the reserved seatings of a single day from the database."""
+        if isinstance(day, datetime):
+            day = day.date()
+        self._load_many(db, [day])
+
+    def free_tables(self, db: Session, start: datetime, end: datetime) -> List[int]:
+        """
+        List the tables that are free for the whole of ``[start, end)``,
+        excluding tables claimed by in-flight transactions.
+
+        Args:
+            db: Database session
+            start: Start of the seating
+            end: End of the seating
+
+        Returns:
+            Table numbers that are free for the seating
+        """
+        mask = self.get_mask(db, start, end) | self._claimed_mask(start, end)
+        return self._unset_bits(mask)
+
+    def free_count(self, db: Session, start: datetime, end: datetime) -> int:
+        """Number of tables free for a seating."""
+        return len(self.free_tables(db, start, end))
+
+    def claim(self, db: Session, start: datetime, end: datetime,
+              guest_count: int) -> Optional[Tuple[int, ...]]:
+        """
+        Pick the best-fitting free tables for a party and hold them for this session.
+
+        The claim becomes a reservation in the index when the session commits
+        and is dropped if it rolls back.
+
+        Args:
+            db: Session that will insert the reservation
+            start: Start of the seating
+            end: End of the seating
+            guest_count: Party size
+
+        Returns:
+            The claimed table numbers, or None if the party cannot be seated
+        """
+        mask = self.get_mask(db, start, end)
+        with self._lock:
+            claims = self._claimed_mask_locked(start, end)
+            tables = self.inventory.best_fit(mask | claims, guest_count)
+            if tables is None:
+                return None
+            for table_number in tables:
+                self._add_claim_locked(start, end, table_number)
+        db.info.setdefault(_PENDING_KEY, []).extend((start, end, n) for n in tables)
+        return tables
+
+    def hold(self, db: Session, start: datetime, end: datetime, table_number: int) -> None:
+        """
+        Claim a table that was picked outside the index, e.g. by a SQL statement.
+
+        Another transaction may hold an overlapping claim on the same table;
+        both are kept until each settles.
+        """
+        with self._lock:
+            self._add_claim_locked(start, end, table_number)
+        db.info.setdefault(_PENDING_KEY, []).append((start, end, table_number))
+
+    def claimed_tables(self, start: datetime, end: datetime) -> List[int]:
+        """Tables claimed during ``[start, end)`` by in-flight transactions in this process."""
+        claims = self._claimed_mask(start, end)
+        return [n for n in range(1, self.table_count + 1) if claims & (1 << (n - 1))]
+
+    def release_claim(self, db: Session, start: datetime, end: datetime, table_number: int) -> None:
+        """Give back a table claimed by this session without reserving it."""
+        pending = db.info.get(_PENDING_KEY, [])
+        if (start, end, table_number) in pending:
+            pending.remove((start, end, table_number))
+        self.settle_claim(start, end, table_number, reserved=False)
+
+    def settle_claim(self, start: datetime, end: datetime, table_number: int, reserved: bool) -> None:
+        """Drop one hold of a claim, marking the seating as reserved if its transaction committed."""
+        key = (start, end, table_number)
+        with self._lock:
+            for day in days_of(start, end):
+                claims = self._claims.get(day)
+                if claims and key in claims:
+                    claims[key] -= 1
+                    if not claims[key]:
+                        del claims[key]
+                    if not claims:
+                        del self._claims[day]
+                entry = self._days.get(day)
+                if reserved and entry:
+                    entry[0][table_number - 1].add(start, end)
+
+    def reserve(self, start: datetime, end: datetime, table_number: int) -> None:
+        """Mark a table as reserved for a seating on loaded days."""
+        with self._lock:
+            for day in days_of(start, end):
+                entry = self._days.get(day)
+                # Unloaded days are read from the database on first use anyway
+                if entry:
+                    entry[0][table_number - 1].add(start, end)
+
+    def release(self, start: datetime, end: datetime, table_number: int) -> None:
+        """Mark a table as free for a seating on loaded days."""
+        with self._lock:
+            for day in days_of(start, end):
+                entry = self._days.get(day)
+                if entry:
+                    entry[0][table_number - 1].remove(start, end)
+
+    def invalidate(self, day: Optional[date | datetime] = None) -> None:
+        """Drop one day, or every day, so it is reloaded on next use."""
+        if isinstance(day, datetime):
+            day = day.date()
+        with self._lock:
+            if day is None:
+                self._days.clear()
+            else:
+                self._days.pop(day, None)
+
+    def reconcile(self, db: Session, before: Optional[datetime] = None) -> Dict[date, int]:
+        """
+        Reload every cached day from the database in a single query.
+
+        Args:
+            db: Database session
+            before: Days ending before this time are evicted instead of reloaded
+                (defaults to now)
+
+        Returns:
+            Dictionary of day to the bitmap of tables whose seatings had drifted
+            from the database. Empty when the index was in sync.
+        """
+        before = before or datetime.now()
+        with self._lock:
+            for day in [d for d in self._days if d < before.date()]:
+                del self._days[day]
+            cached = {day: [list(intervals) for intervals in tables] for day, (tables, _) in self._days.items()}
+
+        if not cached:
+            return {}
+
+        fresh = self._load_many(db, cached.keys())
+        drift = {}
+        for day, tables in cached.items():
+            mask = 0
+            for n, (old, new) in enumerate(zip(tables, fresh[day])):
+                if old != list(new):
+                    mask |= 1 << n
+            if mask:
+                drift[day] = mask
+        return drift
+
+    def _claimed_mask(self, start: datetime, end: datetime) -> int:
+        with self._lock:
+            return self._claimed_mask_locked(start, end)
+
+    def _claimed_mask_locked(self, start: datetime, end: datetime) -> int:
+        mask = 0
+        for day in days_of(start, end):
+            if day in self._claims:
+                mask |= _claimed(self._claims[day], start, end)
+        return mask
+
+    def _add_claim_locked(self, start: datetime, end: datetime, table_number: int) -> None:
+        for day in days_of(start, end):
+            self._claims.setdefault(day, Counter())[(start, end, table_number)] += 1
+
+    def _unset_bits(self, mask: int) -> List[int]:
+        return [n for n in range(1, self.table_count + 1) if not mask & (1 << (n - 1))]
+
+    def _load_many(self, db: Session, days: Iterable[date], keep: bool = True) -> Dict[date, List[IntervalSet]]:
+        days = sorted(days)
+        first = datetime.combine(days[0], datetime.min.time())
+        last = datetime.combine(days[-1], datetime.min.time()) + timedelta(days=1)
+        # Seatings starting up to max_duration before the first day can reach into it
+        rows = db.query(Reservation.reservation_date, Reservation.duration_minutes, Reservation.table_number)\
+            .filter(
+                Reservation.reservation_date > first - self.max_duration,
+                Reservation.reservation_date < last,
+                Reservation.status == "confirmed"
+            ).all()
+
+        loaded = {day: [IntervalSet() for _ in range(self.table_count)] for day in days}
+        for start, duration_minutes, table_number in rows:
+            end = start + timedelta(minutes=duration_minutes)
+            for day in days_of(start, end):
+                if day in loaded:
+                    loaded[day][table_number - 1].add(start, end)
+
+        if not keep:
+            return loaded
+        loaded_at = time.monotonic()
+        with self._lock:
+            for day, tables in loaded.items():
+                self._days[day] = (tables, loaded_at)
+        return loaded
+
+
+def days_of(start: datetime, end: datetime) -> List[date]:
+    """Every day that ``[start, end)`` falls on."""
+    days = []
+    day = start.date()
+    while datetime.combine(day, datetime.min.time()) < end:
+        days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def _overlapping(tables: List[IntervalSet], start: datetime, end: datetime) -> int:
+    """Bitmap of the tables with a seating overlapping ``[start, end)``."""
+    mask = 0
+    for n, intervals in enumerate(tables):
+        if intervals and intervals.overlaps(start, end):
+            mask |= 1 << n
+    return mask
+
+
+def _claimed(claims: Counter[Claim], start: datetime, end: datetime) -> int:
+    """Bitmap of the tables with a claim overlapping ``[start, end)``."""
+    mask = 0
+    for claim_start, claim_end, table_number in claims:
+        if claim_start < end and start < claim_end:
+            mask |= 1 << (table_number - 1)
+    return mask
+
+
+occupancy_index = OccupancyIndex()
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session: Session) -> None:
+    for start, end, table_number in session.info.pop(_PENDING_KEY, ()):
+        occupancy_index.settle_claim(start, end, table_number, reserved=True)
+        for day in days_of(start, end):
+            availability_cache.invalidate(day)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending(session: Session, previous_transaction) -> None:
+    if previous_transaction.nested:
+        return
+    for start, end, table_number in session.info.pop(_PENDING_KEY, ()):
+        occupancy_index.settle_claim(start, end, table_number, reserved=False)
@@ -0,0 +1,152 @@
+"""
+Multi-process production server for the ASGI app.
+
+Runs app.asgi:app under uvicorn's process supervisor. Every worker process
+serves the native async routes on its event loop and the Flask app on
+WEB_THREADS threads, with its own sync and async connection pools. The
+supervisor replaces a worker that exits, whether it crashed or served its
+request budget, restarts every worker one by one on SIGHUP, and adds or
+removes one on SIGTTIN or SIGTTOU.
+"""
+import logging
+import multiprocessing
+import os
+import random
+from typing import Optional, Tuple
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+# Logged alongside uvicorn's own startup and shutdown messages
+logger = logging.getLogger("uvicorn.error")
+
+
+class RecyclingServer(uvicorn.Server):
+    """
+    uvicorn server that stops once its worker has served a request budget.
+
+    uvicorn's own limit_max_requests is the same for every worker, so workers
+    sharing the load evenly would also stop together and leave no one to
+    serve. Each worker here draws its own budget of max_requests plus up to
+    jitter more, and workers retire one at a time: a worker over its budget
+    keeps serving until no other worker is being replaced. Stopping goes
+    through the usual graceful shutdown, so in-flight requests finish first.
+
+    Args:
+        config: uvicorn config
+        max_requests: Requests after which the worker retires, None to never retire
+        jitter: Up to this many more requests, drawn at random per worker
+        retiring: Held by the worker being replaced until its replacement has
+            started; a spawn-context BoundedSemaphore(1) shared by all workers
+    """
+
+    def __init__(self, config: uvicorn.Config, max_requests: Optional[int] = None, jitter: int = 0,
+                 retiring=None):
+        super().__init__(config)
+        self.max_requests = max_requests
+        self.jitter = jitter
+        self.retiring = retiring
+        self.request_budget: Optional[int] = None
+
+    async def startup(self, sockets=None) -> None:
+        await super().startup(sockets=sockets)
+        if self.retiring is not None:
+            # A replacement hands the turn on once it accepts connections; any other
+            # worker finds the semaphore free and over-releasing it raises
+            try:
+                self.retiring.release()
+            except ValueError:
+                pass
+
+    async def on_tick(self, counter: int) -> bool:
+        if await super().on_tick(counter):
+            return True
+        if self.max_requests is None:
+            return False
+        if self.request_budget is None:
+            # Drawn in the worker process, not in the supervisor that pickled this server
+            self.request_budget = self.max_requests + random.randint(0, self.jitter)
+        if self.server_state.total_requests < self.request_budget:
+            return False
+        if self.retiring is not None and not self.retiring.acquire(block=False):
+            return False
+        logger.info("Served %d requests, replacing worker [%d]", self.server_state.total_requests, os.getpid())
+        return True
+
+
+def worker_pool_sizes(workers: int, threads: int, max_connections: Optional[int],
+                      max_overflow: int) -> Tuple[int, int]:
+    """
+    DB_POOL_SIZE and DB_MAX_OVERFLOW for each worker's pools.
+
+    A worker has two pools of that size: the sync one, which needs one
+    connection per Flask thread, and the async one for the native routes.
+    Without a connection budget each pool keeps one connection per thread.
+    With one, every pool gets an equal share of it, kept open up to the
+    thread count and opened on demand beyond that.
+
+    Args:
+        workers: Worker processes
+        threads: Flask threads per worker
+        max_connections: Connections all workers together may open, None for no limit
+        max_overflow: DB_MAX_OVERFLOW to keep when there is no budget
+
+    Returns:
+        (pool_size, max_overflow) per pool
+    """
+    if max_connections is None:
+        return threads, max_overflow
+    share = max_connections // (workers * 2)
+    if share < 1:
+        raise ValueError(f"{max_connections} connections are fewer than two per worker for {workers} workers")
+    pool_size = min(threads, share)
+    return pool_size, share - pool_size
+
+
+def serve(host: str, port: int, workers: int, threads: int, max_requests: Optional[int] = None,
+          max_requests_jitter: int = 0, graceful_timeout: float = 30.0,
+          max_connections: Optional[int] = None, max_overflow: int = 10, warmup: bool = False,
+          log_level: str = "info") -> None:
+    """
+    Serve app.asgi:app until SIGINT or SIGTERM.
+
+    On either signal every worker stops accepting connections, waits up to
+    graceful_timeout seconds for in-flight requests, lets any booking still
+    running on a Flask thread commit, closes its pooled connections and exits.
+
+    Args:
+        host: Address to listen on
+        port: Port to listen on
+        workers: Worker processes
+        threads: Flask threads per worker
+        max_requests: Requests after which a worker is replaced, None to keep workers
+        max_requests_jitter: Up to this many more requests per worker, drawn at random
+        graceful_timeout: Seconds a stopping worker waits for in-flight requests
+        max_connections: Postgres connections all workers together may open
+        max_overflow: DB_MAX_OVERFLOW per pool when max_connections is None
+        warmup: Warm up each worker before it takes requests, see app.main.warm_up
+        log_level: uvicorn log level
+    """
+    pool_size, pool_overflow = worker_pool_sizes(workers, threads, max_connections, max_overflow)
+    if pool_size < threads:
+        logger.warning("%d connections per pool for %d threads per worker: Flask requests will wait for a connection",
+                       pool_size, threads)
+    # Workers are spawned, not forked, and read their settings from the environment they inherit
+    os.environ.update({
+        "WEB_THREADS": str(threads),
+        "DB_POOL_SIZE": str(pool_size),
+        "DB_MAX_OVERFLOW": str(pool_overflow),
+        "WARMUP_ON_START": "true" if warmup else "false",
+    })
+
+    config = uvicorn.Config("app.asgi:app", host=host, port=port, workers=workers,
+                            timeout_graceful_shutdown=graceful_timeout, log_level=log_level)
+    server = RecyclingServer(config, max_requests, max_requests_jitter)
+    logger.info("%d workers x %d threads, up to %d Postgres connections", workers, threads,
+                workers * 2 * (pool_size + pool_overflow))
+    # A single worker runs in this process, unless a supervisor has to replace it after its budget
+    if workers == 1 and max_requests is None:
+        server.run()
+    else:
+        # Pickled into each worker as it is spawned, so all of them share it
+        server.retiring = multiprocessing.get_context("spawn").BoundedSemaphore(1)
+        Multiprocess(config, target=server.run, sockets=[config.bind_socket()]).run()
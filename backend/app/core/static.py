@@ -0,0 +1,221 @@
+import json
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+from flask import Request, Response
+from werkzeug.security import safe_join
+from werkzeug.wsgi import wrap_file
+
+# Not in every platform's mime.types
+mimetypes.add_type("image/webp", ".webp")
+mimetypes.add_type("image/avif", ".avif")
+
+# Content-Encoding -> suffix of the pre-built variant, in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+# Astro fingerprints everything it emits under _astro/, and scripts/optimize_images.py
+# names its variants under _images/ after their content hash, so these URLs never change
+IMMUTABLE_PREFIXES = ("_astro/", "_images/")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Written by scripts/optimize_images.py, relative to the static root
+IMAGE_MANIFEST = "_images/manifest.json"
+
+
+class _CachedFile(NamedTuple):
+    body: bytes
+    mtime_ns: int
+    size: int
+
+
+class StaticFiles:
+    """
+    Serves the built frontend with cache headers and pre-compressed variants.
+
+    Hashed assets under ``_astro/`` are marked immutable, HTML is revalidated
+    with ETag/Last-Modified, and every other file is cached for ``max_age``
+    seconds. When a ``.br`` or ``.gz`` sibling exists (see
+    scripts/precompress_static.py) and the client accepts that encoding, the
+    sibling is sent instead. Images listed in the image manifest are swapped
+    for their smallest AVIF/WebP variant the client's Accept header allows.
+    Files up to ``cache_file_bytes`` are kept in an LRU in memory, keyed by
+    path and checked against the file's mtime.
+    """
+
+    def __init__(self, root: str, max_age: int = 3600,
+                 cache_max_bytes: int = 8 * 1024 * 1024, cache_file_bytes: int = 256 * 1024):
+        self.root = root
+        self.max_age = max_age
+        self.cache_max_bytes = cache_max_bytes
+        self.cache_file_bytes = cache_file_bytes
+        self._cache: "OrderedDict[str, _CachedFile]" = OrderedDict()
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+        self._manifest: Dict[str, dict] = {}
+        self._manifest_mtime_ns: Optional[int] = None
+
+    def resolve(self, path: str) -> Optional[str]:
+        """
+        Map a URL path to a file under the root.
+
+        ``/`` and directories such as ``/menu`` or ``/menu/`` resolve to their
+        own index.html.
+
+        Returns:
+            The relative file path, or None if nothing matches
+        """
+        path = path.strip("/")
+        for candidate in (path, f"{path}/index.html" if path else "index.html"):
+            full_path = safe_join(self.root, candidate)
+            if full_path and os.path.isfile(full_path):
+                return candidate
+        return None
+
+    def serve(self, path: str, request: Request, status: int = 200) -> Optional[Response]:
+        """
+        Build the response for a URL path.
+
+        Args:
+            path: URL path relative to the site root
+            request: The current request, for Accept-Encoding and conditional headers
+            status: Status code for a full response, e.g. 404 for the not-found page
+
+        Returns:
+            The response, or None if the path matches no file
+        """
+        relative_path = self.resolve(path)
+        if relative_path is None:
+            return None
+
+        requested_path = relative_path
+        relative_path, negotiated_image = self._pick_image_variant(relative_path, request)
+        full_path = safe_join(self.root, relative_path)
+        mimetype = mimetypes.guess_type(relative_path)[0] or "application/octet-stream"
+
+        # Pick the best pre-built variant the client accepts
+        variants = []
+        file_path, encoding = full_path, None
+        for candidate_encoding, suffix in ENCODINGS:
+            if os.path.isfile(full_path + suffix):
+                variants.append(candidate_encoding)
+                if encoding is None and request.accept_encodings[candidate_encoding]:
+                    file_path, encoding = full_path + suffix, candidate_encoding
+
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            # Removed between resolving and reading, e.g. during a rebuild
+            return None
+
+        body = self._read(file_path, stat)
+        if body is None:
+            response = Response(wrap_file(request.environ, open(file_path, "rb")),
+                                mimetype=mimetype, direct_passthrough=True)
+            response.content_length = stat.st_size
+        else:
+            response = Response(body, mimetype=mimetype)
+        response.status_code = status
+
+        if encoding:
+            response.content_encoding = encoding
+        if variants:
+            response.vary.add("Accept-Encoding")
+        if negotiated_image:
+            response.vary.add("Accept")
+
+        # Each encoding is a different representation, so it gets its own ETag
+        response.set_etag(f"{stat.st_mtime_ns:x}-{stat.st_size:x}{'-' + encoding if encoding else ''}")
+        response.last_modified = stat.st_mtime
+        if requested_path.startswith(IMMUTABLE_PREFIXES):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        elif mimetype == "text/html":
+            response.cache_control.no_cache = True
+        else:
+            response.cache_control.public = True
+            response.cache_control.max_age = self.max_age
+
+        if status == 200:
+            response.make_conditional(request)
+        return response
+
+    def _pick_image_variant(self, relative_path: str, request: Request) -> Tuple[str, bool]:
+        """
+        Swap an image for its smallest variant in a format the client accepts.
+
+        Formats are only used when named explicitly in Accept, since a bare
+        ``*/*`` does not mean the browser can decode AVIF. A ``w`` query
+        parameter selects the narrowest variant at least that wide.
+
+        Returns:
+            Tuple of (relative path to serve, whether the image has variants)
+        """
+        entry = self._image_manifest().get(relative_path)
+        if not entry:
+            return relative_path, False
+
+        accepted = {value for value, quality in request.accept_mimetypes if quality > 0}
+        candidates = [v for v in entry["variants"] if f"image/{v['format']}" in accepted]
+
+        wanted_width = request.args.get("w", type=int)
+        if wanted_width and candidates:
+            widths = sorted({v["width"] for v in candidates})
+            width = next((w for w in widths if w >= wanted_width), widths[-1])
+        else:
+            width = entry["width"]
+        candidates = [(v["bytes"], v["path"]) for v in candidates if v["width"] == width]
+
+        # The original stays in the running at full width, e.g. a WebP source smaller than its re-encode
+        if width == entry["width"]:
+            candidates.append((entry["bytes"], relative_path))
+        return min(candidates)[1], True
+
+    def _image_manifest(self) -> Dict[str, dict]:
+        """Load the image manifest, reloading it whenever the file changes."""
+        try:
+            mtime_ns = os.stat(os.path.join(self.root, IMAGE_MANIFEST)).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        if mtime_ns != self._manifest_mtime_ns:
+            with open(os.path.join(self.root, IMAGE_MANIFEST)) as f:
+                manifest = json.load(f).get("images", {})
+            with self._lock:
+                self._manifest, self._manifest_mtime_ns = manifest, mtime_ns
+        return self._manifest
+
+    def _read(self, file_path: str, stat: os.stat_result) -> Optional[bytes]:
+        """Return a small file's contents from the memory cache, or None for large files."""
+        if stat.st_size > self.cache_file_bytes:
+            return None
+
+        with self._lock:
+            entry = self._cache.get(file_path)
+            if entry and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                self._cache.move_to_end(file_path)
+                return entry.body
+
+        with open(file_path, "rb") as f:
+            body = f.read()
+
+        with self._lock:
+            old = self._cache.pop(file_path, None)
+            if old:
+                self._cached_bytes -= len(old.body)
+            self._cache[file_path] = _CachedFile(body, stat.st_mtime_ns, stat.st_size)
+            self._cached_bytes += len(body)
+            while self._cached_bytes > self.cache_max_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cached_bytes -= len(evicted.body)
+        return body
+
+    def cache_info(self) -> Dict[str, int]:
+        """Number of files and bytes held in the memory cache."""
+        with self._lock:
+            return {"files": len(self._cache), "bytes": self._cached_bytes}
+
+    def clear(self) -> None:
+        """Empty the memory cache, e.g. after the static directory is rebuilt."""
+        with self._lock:
+            self._cache.clear()
+            self._cached_bytes = 0
@@ -0,0 +1,127 @@
+import json
+import random
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from app.db.config import settings
+
+# Dining room used when TABLE_LAYOUT_PATH is not set: table number -> seats
+DEFAULT_CAPACITIES = {
+    **{n: 2 for n in range(1, 11)},
+    **{n: 4 for n in range(11, 25)},
+    **{n: 6 for n in range(25, 29)},
+    **{n: 8 for n in range(29, 31)},
+}
+# Neighbouring tables that can be pushed together for a larger party
+DEFAULT_COMBINATIONS = [
+    *[(n, n + 1) for n in range(1, 10, 2)],
+    *[(n, n + 1) for n in range(11, 24, 2)],
+    (25, 26),
+    (27, 28),
+    (29, 30),
+]
+
+
+class TableInventory:
+    """
+    The dining room: each table's capacity and the groups of tables that can
+    be combined, seating the sum of their capacities.
+
+    Tables are numbered 1..table_count so a set of tables fits in an integer
+    bitmap, the representation used by the occupancy index.
+    """
+
+    def __init__(self, capacities: Dict[int, int], combinations: Iterable[Sequence[int]] = ()):
+        if sorted(capacities) != list(range(1, len(capacities) + 1)):
+            raise ValueError("Tables must be numbered 1..N without gaps")
+        self.capacities = dict(capacities)
+        self.table_count = len(capacities)
+
+        # Seating options as (capacity, tables, bitmap), single tables first
+        options = [(capacity, (n,)) for n, capacity in self.capacities.items()]
+        for group in combinations:
+            group = tuple(sorted(group))
+            if len(group) < 2 or not set(group) <= set(self.capacities):
+                raise ValueError(f"Invalid table combination: {group}")
+            options.append((sum(self.capacities[n] for n in group), group))
+
+        # Tiers of interchangeable options: by number of tables, then capacity.
+        # Combining tables takes staff time, so a single table is always preferred.
+        tiers: Dict[Tuple[int, int], List[Tuple[Tuple[int, ...], int]]] = {}
+        for capacity, group in options:
+            tiers.setdefault((len(group), capacity), []).append((group, self.mask(group)))
+        self._tiers = [(size, capacity, tiers[(size, capacity)]) for size, capacity in sorted(tiers)]
+        self.max_party = max(capacity for capacity, _ in options)
+
+    @staticmethod
+    def mask(tables: Iterable[int]) -> int:
+        """Bitmap with bit ``n - 1`` set for every table ``n``."""
+        bits = 0
+        for n in tables:
+            bits |= 1 << (n - 1)
+        return bits
+
+    def seats(self, tables: Iterable[int]) -> int:
+        """Total capacity of a set of tables."""
+        return sum(self.capacities[n] for n in tables)
+
+    def best_fit(self, occupied: int, guest_count: int, single_only: bool = False) -> Optional[Tuple[int, ...]]:
+        """
+        Pick the tables for a party, given the bitmap of tables already taken.
+
+        Chooses the smallest single table that seats the party and only
+        combines tables when no single table fits. Ties are broken at random
+        so concurrent bookings for the same slot rarely pick the same table.
+
+        Args:
+            occupied: Bitmap of reserved or claimed tables
+            guest_count: Party size
+            single_only: Never combine tables
+
+        Returns:
+            Table numbers to seat the party at, or None if it cannot be seated
+        """
+        for size, capacity, group_options in self._tiers:
+            if capacity < guest_count or (single_only and size > 1):
+                continue
+            free = [group for group, bits in group_options if not bits & occupied]
+            if free:
+                return random.choice(free)
+        return None
+
+    def single_table_candidates(self, occupied: int, guest_count: int) -> List[int]:
+        """
+        Every free single table that seats the party, in best-fit order.
+
+        Used where the final pick happens in SQL against the database.
+        """
+        candidates = []
+        for size, capacity, group_options in self._tiers:
+            if size > 1 or capacity < guest_count:
+                continue
+            free = [group[0] for group, bits in group_options if not bits & occupied]
+            random.shuffle(free)
+            candidates += free
+        return candidates
+
+    def can_combine_for(self, guest_count: int) -> bool:
+        """Whether some combination of tables seats a party too large for any single table."""
+        return any(size > 1 and capacity >= guest_count for size, capacity, _ in self._tiers)
+
+    @classmethod
+    def from_json(cls, path: str) -> "TableInventory":
+        """
+        Load a layout file shaped like
+        ``{"tables": {"1": 2, "2": 4}, "combinations": [[1, 2]]}``.
+        """
+        with open(path) as f:
+            layout = json.load(f)
+        capacities = {int(n): int(capacity) for n, capacity in layout["tables"].items()}
+        return cls(capacities, layout.get("combinations", []))
+
+
+@lru_cache(maxsize=None)
+def get_table_inventory() -> TableInventory:
+    """The restaurant's tables, loaded from TABLE_LAYOUT_PATH the first time they are needed."""
+    if settings.TABLE_LAYOUT_PATH:
+        return TableInventory.from_json(settings.TABLE_LAYOUT_PATH)
+    return TableInventory(DEFAULT_CAPACITIES, DEFAULT_COMBINATIONS)
@@ -1,14 +1,15 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from app.models import Customer
 
-async def create_customer(db: Session, name: str, email: str, phone: Optional[str] = None, 
+async def create_customer(db: AsyncSession, name: str, email: str, phone: Optional[str] = None, 
                         newsletter_signup: bool = False) -> Customer:
     """
     Create a new customer in the database.
     
     Args:
-        db: SQLAlchemy database session
+        db: SQLAlchemy async database session
         name: Customer's full name
         email: Customer's email address
         phone: Customer's phone number (optional)
@@ -28,15 +29,16 @@ async def create_customer(db: Session, name: str, email: str, phone: Optional[st
     await db.refresh(customer)
     return customer
 
-async def get_customer_by_email(db: Session, email: str) -> Optional[Customer]:
+async def get_customer_by_email(db: AsyncSession, email: str) -> Optional[Customer]:
     """
     Retrieve a customer by their email address.
     
     Args:
-        db: SQLAlchemy database session
+        db: SQLAlchemy async database session
         email: Email address to search for
         
     Returns:
         Optional[Customer]: The customer object if found, None otherwise
     """
-    return await db.query(Customer).filter(Customer.email == email).first() 
\ No newline at end of file
+    result = await db.execute(select(Customer).where(Customer.email == email))
+    return result.scalars().first()
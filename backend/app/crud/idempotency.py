@@ -0,0 +1,155 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from sqlalchemy import delete, event, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.cache import idempotency_cache
+from app.db.config import settings
+from app.models import IdempotencyKey
+
+# First key of the per-Idempotency-Key advisory locks, apart from SLOT_LOCK_NAMESPACE
+IDEMPOTENCY_LOCK_NAMESPACE = 7002
+# Longest Idempotency-Key header accepted
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+# session.info key of responses to cache once the transaction commits
+_PENDING_KEY = "idempotency_pending"
+
+# (request hash, status code, response body) stored for a key
+StoredResponse = Tuple[str, int, dict]
+
+def request_fingerprint(payload: dict) -> str:
+    """SHA-256 of a JSON request body, independent of key order and whitespace."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def cached_response(key: str) -> Optional[StoredResponse]:
+    """The response stored for a key if this process has it in memory, without touching the database."""
+    return idempotency_cache.get(key)
+
+def _lock_statement(key: str):
+    # Transaction-scoped, so a duplicate waits here until the first request commits or rolls back
+    return select(func.pg_advisory_xact_lock(IDEMPOTENCY_LOCK_NAMESPACE, func.hashtext(key)))
+
+def _stored_statement(key: str):
+    return select(
+        IdempotencyKey.request_hash,
+        IdempotencyKey.status_code,
+        IdempotencyKey.response,
+        IdempotencyKey.expires_at,
+    ).where(IdempotencyKey.key == key, IdempotencyKey.expires_at > datetime.utcnow())
+
+def _remember(key: str, row) -> Optional[StoredResponse]:
+    if row is None:
+        return None
+    stored = (row.request_hash, row.status_code, row.response)
+    idempotency_cache.set(key, stored, (row.expires_at - datetime.utcnow()).total_seconds())
+    return stored
+
+def lock_idempotency_key(db: Session, key: str) -> Optional[StoredResponse]:
+    """
+    Take the key's lock for the rest of the transaction and return its stored response.
+
+    A request still in flight with the same key holds the lock until it
+    commits, so a concurrent duplicate waits here and then finds the first
+    request's response instead of booking again. This works across worker
+    processes since the lock lives in Postgres. Only the idempotency_key table
+    is read; the reservation tables are not touched.
+
+    Args:
+        db: Session of the request's transaction
+        key: Idempotency-Key header value
+
+    Returns:
+        The stored (request hash, status code, body), or None if the key is
+        new or expired and the caller should handle the request
+    """
+    db.execute(_lock_statement(key))
+    return _remember(key, db.execute(_stored_statement(key)).first())
+
+async def lock_idempotency_key_async(db: AsyncSession, key: str) -> Optional[StoredResponse]:
+    """Async counterpart of lock_idempotency_key."""
+    await db.execute(_lock_statement(key))
+    return _remember(key, (await db.execute(_stored_statement(key))).first())
+
+def _save_statement(key: str, request_hash: str, status_code: int, body: dict):
+    now = datetime.utcnow()
+    values = dict(
+        request_hash=request_hash,
+        status_code=status_code,
+        response=body,
+        created_at=now,
+        expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS),
+    )
+    # Under the key's lock the only row that can exist is an expired one
+    return insert(IdempotencyKey).values(key=key, **values).on_conflict_do_update(
+        index_elements=[IdempotencyKey.key],
+        set_=values,
+    )
+
+def _hold(db: Session | AsyncSession, key: str, stored: StoredResponse) -> StoredResponse:
+    # Cached only once the transaction commits, like the occupancy index
+    db.info.setdefault(_PENDING_KEY, []).append((key, stored))
+    return stored
+
+def save_idempotent_response(db: Session, key: str, request_hash: str,
+                             status_code: int, body: dict) -> StoredResponse:
+    """
+    Store the response for a key in the caller's transaction.
+
+    The response commits together with the booking it describes, and is
+    replayed for repeats of the key until IDEMPOTENCY_KEY_TTL_SECONDS pass.
+
+    Args:
+        db: Session of the request's transaction, holding the key's lock
+        key: Idempotency-Key header value
+        request_hash: request_fingerprint of the request body
+        status_code: HTTP status of the response
+        body: JSON response body
+
+    Returns:
+        The stored (request hash, status code, body)
+    """
+    db.execute(_save_statement(key, request_hash, status_code, body))
+    return _hold(db, key, (request_hash, status_code, body))
+
+async def save_idempotent_response_async(db: AsyncSession, key: str, request_hash: str,
+                                         status_code: int, body: dict) -> StoredResponse:
+    """Async counterpart of save_idempotent_response."""
+    await db.execute(_save_statement(key, request_hash, status_code, body))
+    return _hold(db, key, (request_hash, status_code, body))
+
+def purge_expired_keys(db: Session, batch_size: int = 5000) -> int:
+    """
+    Delete expired idempotency keys in batches, so no single statement holds many row locks.
+
+    Returns:
+        Number of keys deleted
+    """
+    deleted = 0
+    while True:
+        expired = (
+            select(IdempotencyKey.key)
+            .where(IdempotencyKey.expires_at <= datetime.utcnow())
+            .order_by(IdempotencyKey.expires_at)
+            .limit(batch_size)
+        )
+        count = db.execute(delete(IdempotencyKey).where(IdempotencyKey.key.in_(expired))).rowcount
+        db.commit()
+        deleted += count
+        if count < batch_size:
+            return deleted
+
+@event.listens_for(Session, "after_commit")
+def _cache_pending(session: Session) -> None:
+    ttl = settings.IDEMPOTENCY_KEY_TTL_SECONDS
+    for key, stored in session.info.pop(_PENDING_KEY, ()):
+        idempotency_cache.set(key, stored, ttl)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_pending(session: Session, previous_transaction) -> None:
+    if not previous_transaction.nested:
+        session.info.pop(_PENDING_KEY, None)
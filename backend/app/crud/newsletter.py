@@ -1,6 +1,102 @@
+import csv
+import io
+import re
+import tempfile
+from datetime import datetime
+from functools import lru_cache
+from typing import IO, Iterable, Iterator, Optional, Tuple
+from pydantic import EmailStr, TypeAdapter, ValidationError
+from sqlalchemy import literal_column, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from app.core.serialization import dumps
 from app.models import Newsletter
 
+# Rows fetched per round trip from the server-side cursor when exporting
+EXPORT_BATCH_SIZE = 5000
+EXPORT_FORMATS = ("csv", "ndjson")
+
+# Validated with the same rules as schemas.NewsletterSubscribe.email
+_email_adapter = TypeAdapter(EmailStr)
+# Plain ASCII dot-atom local parts, which EmailStr always accepts
+_DOT_ATOM_LOCAL = re.compile(r"[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+(?:\.[A-Za-z0-9!#$%&'*+/=?^_`{|}~-]+)*\Z")
+# Bulk imports spill validated emails to disk past this size before COPY
+IMPORT_SPOOL_BYTES = 16 * 1024 * 1024
+
+# Set-based merge of the staging table: new rows are inserted, inactive ones
+# reactivated, active ones left alone (and not returned)
+_IMPORT_MERGE_SQL = text("""
+    WITH staged AS (
+        SELECT DISTINCT email FROM newsletter_import
+    ),
+    merged AS (
+        INSERT INTO newsletter (email, subscribed_at, is_active)
+        SELECT email, :now, true FROM staged
+        ON CONFLICT (email) DO UPDATE SET is_active = true, subscribed_at = EXCLUDED.subscribed_at
+        WHERE newsletter.is_active IS NOT TRUE
+        RETURNING (xmax = 0) AS inserted
+    )
+    SELECT
+        (SELECT count(*) FROM staged) AS distinct_emails,
+        count(*) FILTER (WHERE inserted) AS inserted,
+        count(*) FILTER (WHERE NOT inserted) AS reactivated
+    FROM merged
+""")
+
+# Outcomes of upsert_subscription
+SUBSCRIBED = "subscribed"
+REACTIVATED = "reactivated"
+ALREADY_SUBSCRIBED = "already_subscribed"
+INVALID_EMAIL = "invalid_email"
+
+def _upsert_subscription_statement(email: str):
+    # Inactive rows are reactivated; active rows fail the WHERE, so nothing is
+    # updated and nothing is returned. xmax is 0 only for freshly inserted rows.
+    now = datetime.utcnow()
+    statement = insert(Newsletter).values(email=email, subscribed_at=now, is_active=True)
+    return statement.on_conflict_do_update(
+        index_elements=[Newsletter.email],
+        set_={"is_active": True, "subscribed_at": now},
+        where=Newsletter.is_active.isnot(True),
+    ).returning(literal_column("xmax = 0").label("inserted"))
+
+def _subscription_outcome(row) -> str:
+    if row is None:
+        return ALREADY_SUBSCRIBED
+    return SUBSCRIBED if row.inserted else REACTIVATED
+
+def upsert_subscription(db: Session, email: str) -> Tuple[str, Optional[str]]:
+    """
+    Subscribe or reactivate an email address in a single statement.
+
+    The address is validated and normalized with normalize_email first, as
+    bulk imports are, so variants of one address share a subscription.
+    
+    Args:
+        db: SQLAlchemy database session (the caller commits)
+        email: Email address to subscribe, as entered
+        
+    Returns:
+        tuple: The outcome and the normalized address. The outcome is
+        SUBSCRIBED for a new subscriber, REACTIVATED for a previously
+        unsubscribed one, ALREADY_SUBSCRIBED if the email is already active,
+        or INVALID_EMAIL, with no address and nothing written
+    """
+    email = normalize_email(email)
+    if email is None:
+        return INVALID_EMAIL, None
+    row = db.execute(_upsert_subscription_statement(email)).first()
+    return _subscription_outcome(row), email
+
+async def upsert_subscription_async(db: AsyncSession, email: str) -> Tuple[str, Optional[str]]:
+    """Async counterpart of upsert_subscription."""
+    email = normalize_email(email)
+    if email is None:
+        return INVALID_EMAIL, None
+    row = (await db.execute(_upsert_subscription_statement(email))).first()
+    return _subscription_outcome(row), email
+
 def subscribe_to_newsletter(db: Session, email: str) -> Newsletter:
     """
     Subscribe an email address to the newsletter.
@@ -23,20 +119,21 @@ def unsubscribe_from_newsletter(db: Session, email: str) -> bool:
     Unsubscribe an email address from the newsletter by setting is_active to False.
     
     Args:
-        db: SQLAlchemy database session
-        email: Email address to unsubscribe
+        db: SQLAlchemy database session (the caller commits)
+        email: Email address to unsubscribe, normalized like upsert_subscription's
         
     Returns:
         bool: True if unsubscription was successful, False if email not found
     """
-    subscriber = db.query(Newsletter)\
-        .filter(Newsletter.email == email)\
-        .first()
-    if subscriber:
-        subscriber.is_active = False
-        db.commit()
-        return True
-    return False 
+    email = normalize_email(email)
+    if email is None:
+        return False
+    result = db.execute(
+        update(Newsletter)
+        .where(Newsletter.email == email)
+        .values(is_active=False)
+    )
+    return result.rowcount > 0
 
 def is_email_subscribed(db: Session, email: str) -> bool:
     """
@@ -52,4 +149,210 @@ def is_email_subscribed(db: Session, email: str) -> bool:
     subscriber = db.query(Newsletter)\
         .filter(Newsletter.email == email)\
         .first()
-    return subscriber is not None and subscriber.is_active
\ No newline at end of file
+    return subscriber is not None and subscriber.is_active
+
+async def subscribe_to_newsletter_async(db: AsyncSession, email: str) -> Newsletter:
+    """
+    Subscribe an email address to the newsletter using an async session.
+    
+    Args:
+        db: SQLAlchemy async database session
+        email: Email address to subscribe
+        
+    Returns:
+        Newsletter: The created newsletter subscription object
+    """
+    subscriber = Newsletter(email=email)
+    db.add(subscriber)
+    await db.commit()
+    await db.refresh(subscriber)
+    return subscriber
+
+async def is_email_subscribed_async(db: AsyncSession, email: str) -> bool:
+    """
+    Check if an email address is currently subscribed, using an async session.
+    
+    Args:
+        db: SQLAlchemy async database session
+        email: Email address to check
+        
+    Returns:
+        bool: True if email is subscribed and active, False otherwise
+    """
+    result = await db.execute(select(Newsletter.is_active).where(Newsletter.email == email))
+    return bool(result.scalar())
+
+def iter_active_subscribers(db: Session, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[list]:
+    """
+    Stream active subscribers in batches through a server-side cursor.
+
+    Only one batch of rows is held in memory at a time, however large the
+    table is.
+    
+    Args:
+        db: SQLAlchemy database session
+        batch_size: Rows fetched from the cursor per round trip
+        
+    Yields:
+        list: Batches of (email, subscribed_at) rows
+    """
+    result = db.execute(
+        select(Newsletter.email, Newsletter.subscribed_at)
+        .where(Newsletter.is_active.is_(True))
+        .order_by(Newsletter.id)
+        .execution_options(yield_per=batch_size)
+    )
+    for partition in result.partitions():
+        yield partition
+
+def export_active_subscribers(db: Session, export_format: str = "csv",
+                              batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    """
+    Render active subscribers as CSV or NDJSON, one text chunk per batch.
+    
+    Args:
+        db: SQLAlchemy database session
+        export_format: "csv" (with a header row) or "ndjson"
+        batch_size: Rows fetched from the cursor per round trip
+        
+    Yields:
+        str: Chunks of the export
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {export_format}")
+
+    if export_format == "csv":
+        yield "email,subscribed_at\r\n"
+
+    for rows in iter_active_subscribers(db, batch_size):
+        buffer = io.StringIO()
+        if export_format == "csv":
+            writer = csv.writer(buffer)
+            writer.writerows(
+                (email, subscribed_at.isoformat() if subscribed_at else "")
+                for email, subscribed_at in rows
+            )
+        else:
+            for email, subscribed_at in rows:
+                # Datetimes are encoded as ISO 8601, like isoformat()
+                buffer.write(dumps({"email": email, "subscribed_at": subscribed_at}).decode())
+                buffer.write("\n")
+        yield buffer.getvalue()
+
+@lru_cache(maxsize=65536)
+def _validated_domain(domain: str) -> Optional[str]:
+    # Domain checks dominate EmailStr's cost and subscriber lists repeat a few
+    # domains, so each distinct domain is validated once
+    try:
+        return _email_adapter.validate_python(f"postmaster@{domain}").rpartition("@")[2]
+    except ValidationError:
+        return None
+
+def normalize_email(value: str) -> Optional[str]:
+    """
+    Validate an email address with the EmailStr rules and normalize it.
+
+    Plain ASCII addresses take a fast path that validates each domain once;
+    anything else goes through EmailStr in full.
+    
+    Args:
+        value: Raw email address
+        
+    Returns:
+        Optional[str]: The normalized address, or None if it is invalid
+    """
+    if not isinstance(value, str):
+        return None
+    value = value.strip()
+    local, at, domain = value.rpartition("@")
+    if at and domain.isascii() and len(local) <= 64 and _DOT_ATOM_LOCAL.match(local):
+        normalized_domain = _validated_domain(domain)
+        if normalized_domain and len(local) + 1 + len(normalized_domain) <= 254:
+            return f"{local}@{normalized_domain}"
+    try:
+        return _email_adapter.validate_python(value)
+    except ValidationError:
+        return None
+
+def iter_csv_emails(source: IO[str]) -> Iterator[str]:
+    """
+    Yield the email column of a CSV file.
+
+    Uses the column headed "email" if there is a header row, otherwise the
+    first column. Blank rows are skipped.
+    
+    Args:
+        source: Text file object opened with newline=""
+        
+    Yields:
+        str: Raw email values
+    """
+    reader = csv.reader(source)
+    first = next(reader, None)
+    if first is None:
+        return
+
+    headers = [cell.strip().lower() for cell in first]
+    column = headers.index("email") if "email" in headers else 0
+    if "email" not in headers and first and first[0].strip():
+        yield first[0]
+
+    for row in reader:
+        if len(row) > column and row[column].strip():
+            yield row[column]
+
+def bulk_import_subscribers(db: Session, emails: Iterable[str], sample_size: int = 20) -> dict:
+    """
+    Import many subscribers at once through a COPY-loaded staging table.
+
+    Emails are validated and normalized while being spooled to a temporary
+    file, loaded with COPY into a temporary table, then deduplicated and
+    merged into newsletter by a single INSERT ... ON CONFLICT statement.
+    
+    Args:
+        db: SQLAlchemy database session on the psycopg2 engine (the caller commits)
+        emails: Raw email values, e.g. from iter_csv_emails
+        sample_size: Number of rejected values to include in the report
+        
+    Returns:
+        dict: Counts of rows, inserted, reactivated, already subscribed,
+        duplicate and rejected emails, plus a sample of rejected rows
+    """
+    rows = valid = rejected = 0
+    rejected_samples = []
+
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES, mode="w+") as staging:
+        for row_number, value in enumerate(emails, start=1):
+            rows += 1
+            email = normalize_email(value)
+            if email is None:
+                rejected += 1
+                if len(rejected_samples) < sample_size:
+                    rejected_samples.append({"row": row_number, "value": value})
+                continue
+            valid += 1
+            # Valid addresses never contain tabs, newlines or backslashes,
+            # so they need no escaping in COPY text format
+            staging.write(email)
+            staging.write("\n")
+
+        staging.seek(0)
+        db.execute(text("CREATE TEMPORARY TABLE newsletter_import (email text NOT NULL) ON COMMIT DROP"))
+        cursor = db.connection().connection.cursor()
+        try:
+            cursor.copy_expert("COPY newsletter_import (email) FROM STDIN", staging)
+        finally:
+            cursor.close()
+
+    result = db.execute(_IMPORT_MERGE_SQL, {"now": datetime.utcnow()}).one()
+    db.execute(text("DROP TABLE newsletter_import"))
+
+    return {
+        "rows": rows,
+        "inserted": result.inserted,
+        "reactivated": result.reactivated,
+        "already_subscribed": result.distinct_emails - result.inserted - result.reactivated,
+        "duplicates": valid - result.distinct_emails,
+        "rejected": rejected,
+        "rejected_samples": rejected_samples,
+    }
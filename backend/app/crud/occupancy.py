@@ -0,0 +1,199 @@
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional
+from sqlalchemy import Date, Time, cast, func, select, text
+from sqlalchemy.orm import Session
+from app.core.tables import get_table_inventory
+from app.crud.reservation import get_bookable_slots
+from app.db.config import settings
+from app.models import ReservationOccupancy
+
+# The summary rows the reservations imply, through the same function the
+# triggers use. {range} is empty for the whole history or limits both the
+# reservations read and the slots kept to :start - :end.
+_EXPECTED_SQL = """
+    SELECT d.slot, r.table_number,
+           sum(d.bookings) AS bookings, sum(d.guests) AS guests, sum(d.tables_held) AS tables_held
+    FROM reservations r
+    CROSS JOIN LATERAL reservation_occupancy_rows(r.reservation_date, r.duration_minutes,
+                                                  r.parent_id IS NULL, r.guest_count) d
+    WHERE r.status IS DISTINCT FROM 'cancelled' {range}
+    GROUP BY d.slot, r.table_number
+"""
+_RANGE_SQL = """
+      AND r.reservation_date >= :earliest_start AND r.reservation_date < :end
+      AND d.slot >= :start AND d.slot < :end
+"""
+
+def _expected(start_date: Optional[date], end_date: Optional[date]):
+    """The expected-summary query and its parameters for a range of days, or everything if both are None."""
+    if start_date is None and end_date is None:
+        return _EXPECTED_SQL.format(range=""), "", {}
+    if start_date is None or end_date is None:
+        # Never widen a half-open range to the whole history, which the rebuild locks bookings for
+        raise ValueError("Give both the first and the last day, or neither")
+    start = datetime.combine(start_date, time.min)
+    params = {
+        "start": start,
+        "end": datetime.combine(end_date + timedelta(days=1), time.min),
+        # A booking that started before the range can still hold tables in it
+        "earliest_start": start - timedelta(minutes=settings.RESERVATION_MAX_DURATION_MINUTES),
+    }
+    return _EXPECTED_SQL.format(range=_RANGE_SQL), "WHERE slot >= :start AND slot < :end", params
+
+def rebuild_occupancy(db: Session, start_date: Optional[date] = None, end_date: Optional[date] = None) -> int:
+    """
+    Recompute the occupancy summary from the reservations.
+
+    Only needed if the summary was changed by hand or the triggers were
+    disabled, e.g. during a bulk load. Writes to reservations wait until the
+    caller's transaction commits, so no booking lands between the delete and
+    the insert; reports keep reading the old rows meanwhile.
+
+    Args:
+        db: Database session
+        start_date: First day to rebuild, the whole history if both days are None
+        end_date: Last day to rebuild (inclusive)
+
+    Returns:
+        Number of summary rows written
+    """
+    expected, summary_range, params = _expected(start_date, end_date)
+    db.execute(text("LOCK TABLE reservations IN SHARE MODE"))
+    db.execute(text(f"DELETE FROM reservation_occupancy {summary_range}"), params)
+    result = db.execute(text(f"""
+        INSERT INTO reservation_occupancy (slot, table_number, bookings, guests, tables_held)
+        SELECT slot, table_number, bookings, guests, tables_held FROM ({expected}) AS expected
+    """), params)
+    return result.rowcount
+
+def occupancy_drift(db: Session, start_date: Optional[date] = None, end_date: Optional[date] = None) -> List[dict]:
+    """
+    Compare the occupancy summary with the reservations without changing anything.
+
+    Args:
+        db: Database session
+        start_date: First day to check, the whole history if both days are None
+        end_date: Last day to check (inclusive)
+
+    Returns:
+        One dictionary per slot and table whose summary differs, with the
+        stored and the expected (bookings, guests, tables_held); empty if
+        they all match
+    """
+    expected, summary_range, params = _expected(start_date, end_date)
+    rows = db.execute(text(f"""
+        SELECT coalesce(e.slot, o.slot) AS slot, coalesce(e.table_number, o.table_number) AS table_number,
+               o.bookings, o.guests, o.tables_held,
+               e.bookings AS expected_bookings, e.guests AS expected_guests, e.tables_held AS expected_tables_held
+        FROM ({expected}) AS e
+        FULL JOIN (SELECT * FROM reservation_occupancy {summary_range}) AS o
+            ON o.slot = e.slot AND o.table_number = e.table_number
+        WHERE (o.bookings, o.guests, o.tables_held) IS DISTINCT FROM (e.bookings, e.guests, e.tables_held)
+        ORDER BY 1, 2
+    """), params)
+    return [
+        {
+            "slot": row.slot,
+            "table_number": row.table_number,
+            "stored": (row.bookings, row.guests, row.tables_held),
+            "expected": (row.expected_bookings, row.expected_guests, row.expected_tables_held),
+        }
+        for row in rows
+    ]
+
+def get_nightly_occupancy(db: Session, start_date: date, end_date: date) -> List[dict]:
+    """
+    Bookings, covers and the busiest slot of every night with bookings between two dates (inclusive).
+
+    Reads only the occupancy summary, at most one row per table and slot.
+
+    Args:
+        db: Database session
+        start_date: First night
+        end_date: Last night
+
+    Returns:
+        One dictionary per night in date order
+    """
+    slots = (
+        select(
+            ReservationOccupancy.slot,
+            func.sum(ReservationOccupancy.bookings).label("bookings"),
+            func.sum(ReservationOccupancy.guests).label("guests"),
+            func.sum(ReservationOccupancy.tables_held).label("tables_held"),
+        )
+        .where(
+            ReservationOccupancy.slot >= datetime.combine(start_date, time.min),
+            ReservationOccupancy.slot < datetime.combine(end_date + timedelta(days=1), time.min),
+        )
+        .group_by(ReservationOccupancy.slot)
+        .subquery()
+    )
+    night = cast(slots.c.slot, Date)
+    rows = db.execute(
+        select(
+            night.label("night"),
+            func.sum(slots.c.bookings).label("bookings"),
+            func.sum(slots.c.guests).label("covers"),
+            func.max(slots.c.tables_held).label("peak_tables_held"),
+        )
+        .group_by(night)
+        .order_by(night)
+    )
+    return [
+        {
+            "date": row.night.strftime("%Y-%m-%d"),
+            "bookings": row.bookings,
+            "covers": row.covers,
+            "peak_tables_held": row.peak_tables_held,
+            "peak_utilization": round(row.peak_tables_held / get_table_inventory().table_count, 4),
+        }
+        for row in rows
+    ]
+
+def get_slot_utilization(db: Session, start_date: date, end_date: date) -> List[dict]:
+    """
+    Bookings, covers and table utilization per time of day between two dates (inclusive).
+
+    A slot's utilization is the share of table time used on the days it was
+    bookable: held tables summed over the range, over the table count times
+    those days. Slots outside opening hours, only ever held by late bookings
+    running on, are left out.
+
+    Args:
+        db: Database session
+        start_date: First day
+        end_date: Last day
+
+    Returns:
+        One dictionary per bookable time of day, in time order
+    """
+    # Days in the range each time of day could be booked
+    open_days = Counter(slot.time() for slot in get_bookable_slots(start_date, end_date))
+
+    slot_time = cast(ReservationOccupancy.slot, Time)
+    rows = db.execute(
+        select(
+            slot_time.label("slot_time"),
+            func.sum(ReservationOccupancy.bookings).label("bookings"),
+            func.sum(ReservationOccupancy.guests).label("covers"),
+            func.sum(ReservationOccupancy.tables_held).label("tables_held"),
+        )
+        .where(
+            ReservationOccupancy.slot >= datetime.combine(start_date, time.min),
+            ReservationOccupancy.slot < datetime.combine(end_date + timedelta(days=1), time.min),
+        )
+        .group_by(slot_time)
+    )
+    used = {row.slot_time: row for row in rows}
+    report = []
+    for start, days in sorted(open_days.items()):
+        row = used.get(start)
+        report.append({
+            "time": start.strftime("%H:%M"),
+            "bookings": row.bookings if row else 0,
+            "covers": row.covers if row else 0,
+            "utilization": round(row.tables_held / (get_table_inventory().table_count * days), 4) if row else 0.0,
+        })
+    return report
@@ -0,0 +1,105 @@
+import random
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core import emails
+from app.db.config import settings
+from app.models import EmailOutbox
+
+def enqueue_email(db: Session | AsyncSession, kind: str, recipient: str, subject: str, body: str) -> EmailOutbox:
+    """
+    Add an email to the outbox as part of the caller's transaction.
+
+    Nothing is sent here: the email is only written when the session commits,
+    together with the booking or subscription it belongs to, and is delivered
+    later by the outbox worker. Works with sync and async sessions alike since
+    it does not flush.
+
+    Args:
+        db: Session of the transaction the email belongs to
+        kind: One of the kinds in app.core.emails
+        recipient: Email address to send to
+        subject: Subject line
+        body: Plain text body
+
+    Returns:
+        The pending outbox row
+    """
+    email = EmailOutbox(
+        kind=kind,
+        recipient=recipient,
+        subject=subject,
+        body=body,
+        status="pending",
+        attempts=0,
+        next_attempt_at=datetime.utcnow(),
+    )
+    db.add(email)
+    return email
+
+def enqueue_reservation_confirmation(db: Session | AsyncSession, response: dict) -> Optional[EmailOutbox]:
+    """Queue the confirmation for a successful create_reservation response, if it booked or updated anything."""
+    if not response.get("success"):
+        return None
+    data = response["data"]
+    # New bookings list their tables, a guest count update of an existing one does not
+    subject, body = emails.reservation_confirmation(data, updated="tables" not in data)
+    return enqueue_email(db, emails.RESERVATION_CONFIRMATION, data["email"], subject, body)
+
+def enqueue_newsletter_welcome(db: Session | AsyncSession, email: str) -> EmailOutbox:
+    """Queue the welcome email for a new or reactivated subscriber."""
+    subject, body = emails.newsletter_welcome(email)
+    return enqueue_email(db, emails.NEWSLETTER_WELCOME, email, subject, body)
+
+def claim_due_emails(db: Session, limit: int) -> List[EmailOutbox]:
+    """
+    Lock a batch of pending emails that are due, oldest first.
+
+    Rows locked by another worker are skipped rather than waited for, so any
+    number of workers can drain the outbox without sending an email twice.
+    The locks are held until the caller's transaction ends.
+
+    Args:
+        db: Database session
+        limit: Most emails to claim
+
+    Returns:
+        The claimed outbox rows
+    """
+    return list(db.scalars(
+        select(EmailOutbox)
+        .where(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= datetime.utcnow())
+        .order_by(EmailOutbox.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ))
+
+def mark_sent(email: EmailOutbox) -> None:
+    email.status = "sent"
+    email.attempts += 1
+    email.sent_at = datetime.utcnow()
+    email.last_error = None
+
+def mark_failed(email: EmailOutbox, error: str, permanent: bool = False) -> None:
+    """
+    Record a failed attempt and schedule the next one with exponential backoff.
+
+    The delay doubles with every attempt from OUTBOX_BACKOFF_SECONDS up to
+    OUTBOX_BACKOFF_MAX_SECONDS, with jitter so emails that failed together are
+    not all retried at the same moment. After OUTBOX_MAX_ATTEMPTS, or on a
+    permanent failure such as a rejected address, the email is given up on.
+
+    Args:
+        email: The claimed outbox row
+        error: Description of the failure
+        permanent: Whether retrying cannot help
+    """
+    email.attempts += 1
+    email.last_error = error
+    if permanent or email.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        email.status = "failed"
+        return
+    delay = min(settings.OUTBOX_BACKOFF_SECONDS * 2 ** (email.attempts - 1), settings.OUTBOX_BACKOFF_MAX_SECONDS)
+    email.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay * random.uniform(0.5, 1.0))
@@ -1,14 +1,98 @@
-import random
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from datetime import datetime, timedelta
-from typing import List, Optional
+from sqlalchemy import and_, func, select, text, tuple_
+from datetime import date, datetime, time, timedelta
+from typing import Iterator, List, Optional, Tuple
 from flask import abort
 from app.models import Reservation, Customer
-from sqlalchemy.exc import SQLAlchemyError
+from app.core.cache import availability_cache
+from app.core.occupancy import occupancy_index
+from app.core.tables import get_table_inventory
+from app.db.config import settings
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
+# Reservations start on the hour or half hour
+SLOT_MINUTES = 30
 
-TABLE_COUNT = 30
+# Rows fetched per round trip from the server-side cursor when listing reservations
+LISTING_BATCH_SIZE = 500
+
+# First key of the per-slot advisory locks, keeps them apart from other lock users
+SLOT_LOCK_NAMESPACE = 7001
+
+
+class SlotContentionError(Exception):
+    """Raised when every allocation attempt for a slot lost a race for its table."""
+
+# Customer upsert, duplicate check, table selection and insert in one statement.
+# Data-modifying CTEs all run against the same snapshot, so the customer lookup
+# and the insert cannot see each other; UNION ALL yields exactly one customer row.
+# :candidate_tables lists the single tables that seat the party in best-fit
+# order, and :capacities maps table number (1-based) to seats. A table is free
+# when none of its confirmed seatings overlaps the requested one, which the
+# GiST index behind excl_reservation_table_seating answers directly.
+_BOOKING_SQL = text("""
+    WITH new_customer AS (
+        INSERT INTO customers (name, email, phone, newsletter_signup, created_at)
+        SELECT :name, :email, :phone, false, :now
+        WHERE :name <> ''
+        ON CONFLICT (email) DO NOTHING
+        RETURNING id, email, name, phone
+    ),
+    customer AS (
+        SELECT id, email, name, phone FROM new_customer
+        UNION ALL
+        SELECT id, email, name, phone FROM customers WHERE email = :email
+    ),
+    existing AS (
+        SELECT r.id, r.reservation_date, r.table_number, r.guest_count,
+               (SELECT sum((CAST(:capacities AS integer[]))[j.table_number])
+                FROM reservations j WHERE j.id = r.id OR j.parent_id = r.id) AS seats
+        FROM reservations r JOIN customer c ON r.customer_id = c.id
+        WHERE r.seating && tsrange(:reservation_date, :reservation_end)
+          AND r.status IN ('confirmed', 'seated')
+          AND r.parent_id IS NULL
+        ORDER BY r.reservation_date = :reservation_date DESC
+        LIMIT 1
+    ),
+    updated AS (
+        UPDATE reservations SET guest_count = :guest_count
+        FROM existing
+        WHERE reservations.id = existing.id AND existing.guest_count <> :guest_count
+          AND existing.reservation_date = :reservation_date
+          AND existing.seats >= :guest_count
+        RETURNING reservations.id
+    ),
+    free_table AS (
+        SELECT t.n AS table_number
+        FROM unnest(CAST(:candidate_tables AS integer[])) WITH ORDINALITY AS t(n, position)
+        WHERE NOT EXISTS (SELECT 1 FROM existing)
+          AND NOT EXISTS (
+              SELECT 1 FROM reservations r
+              WHERE int4range(r.table_number, r.table_number, '[]') = int4range(t.n, t.n, '[]')
+                AND r.seating && tsrange(:reservation_date, :reservation_end)
+                AND r.status = 'confirmed'
+          )
+        ORDER BY t.position
+        LIMIT 1
+    ),
+    inserted AS (
+        INSERT INTO reservations (customer_id, reservation_date, duration_minutes, table_number, guest_count,
+                                  status, created_at)
+        SELECT c.id, :reservation_date, :duration_minutes, f.table_number, :guest_count, 'confirmed', :now
+        FROM customer c CROSS JOIN free_table f
+        ON CONFLICT DO NOTHING
+        RETURNING table_number
+    )
+    SELECT c.email, c.name, c.phone,
+           e.reservation_date AS existing_date,
+           e.table_number AS existing_table,
+           e.guest_count AS existing_guest_count,
+           e.seats AS existing_seats,
+           (SELECT table_number FROM free_table) AS candidate_table,
+           (SELECT table_number FROM inserted) AS new_table
+    FROM customer c LEFT JOIN existing e ON true
+""")
 
 def create_reservation(
     db: Session, 
@@ -17,9 +101,14 @@ def create_reservation(
     guest_count: int,
     name: str = None,
     phone: str = None,
+    strategy: Optional[str] = None,
+    duration_minutes: Optional[int] = None,
 ) -> dict:
     """
     Create a reservation with automatic customer lookup/creation.
+
+    The booking holds its tables from reservation_date for duration_minutes, so
+    it cannot share a table with any other booking overlapping that time.
     
     Args:
         db: Database session
@@ -28,9 +117,14 @@ def create_reservation(
         guest_count: Number of guests
         name: Customer name (required for new customers)
         phone: Customer phone number (optional)
+        strategy: Table allocation strategy, defaults to settings.TABLE_ALLOCATION_STRATEGY
+        duration_minutes: How long the tables are held, defaults to
+            settings.RESERVATION_DURATION_MINUTES
         
     Returns:
-        Dictionary with reservation details and success status
+        Dictionary with reservation details and success status. Failures that
+        are not about the booking (a lost race, a database error) also have
+        ``retryable`` set; the session must be rolled back after them.
     """
     try:
         # Validate reservation is within opening hours
@@ -40,6 +134,26 @@ def create_reservation(
                 "success": False
             }
 
+        max_party = get_table_inventory().max_party
+        if guest_count > max_party:
+            return {
+                "message": f"Parties of more than {max_party} guests must contact the restaurant",
+                "success": False
+            }
+
+        duration_minutes = duration_minutes or settings.RESERVATION_DURATION_MINUTES
+        if not 0 < duration_minutes <= settings.RESERVATION_MAX_DURATION_MINUTES:
+            return {
+                "message": f"Reservations can last at most {settings.RESERVATION_MAX_DURATION_MINUTES} minutes",
+                "success": False
+            }
+
+        if (strategy or settings.TABLE_ALLOCATION_STRATEGY) == "single_statement":
+            return create_reservation_single_statement(
+                db, email, reservation_date, guest_count, name=name, phone=phone,
+                duration_minutes=duration_minutes
+            )
+
         # Look up existing customer
         customer = db.query(Customer).filter(Customer.email == email).first()
         
@@ -59,15 +173,27 @@ def create_reservation(
             db.add(customer)
             db.flush()  # Get the ID without committing yet
         
-        # Check if customer already has a reservation at this time
+        # Check if customer already has a reservation overlapping this time, the
+        # same way tables are checked; one starting at this time comes first
+        reservation_end = reservation_date + timedelta(minutes=duration_minutes)
         existing_reservation = db.query(Reservation)\
             .filter(Reservation.customer_id == customer.id)\
             .filter(Reservation.status.in_(["confirmed", "seated"]))\
-            .filter(Reservation.reservation_date == reservation_date)\
+            .filter(Reservation.seating.overlaps(func.tsrange(reservation_date, reservation_end)))\
+            .filter(Reservation.parent_id.is_(None))\
+            .order_by((Reservation.reservation_date == reservation_date).desc())\
             .first()
-            
+
+        if existing_reservation and existing_reservation.reservation_date != reservation_date:
+            return overlapping_reservation_response(customer.email, customer.name, existing_reservation.table_number,
+                                                    existing_reservation.reservation_date,
+                                                    existing_reservation.guest_count)
         if existing_reservation:
             # Customer already has a reservation at this time
+            tables = [existing_reservation.table_number] + [r.table_number for r in existing_reservation.joined_tables]
+            if guest_count > get_table_inventory().seats(tables):
+                return party_too_large_response(customer.email, customer.name, existing_reservation.table_number,
+                                                reservation_date, existing_reservation.guest_count)
             if existing_reservation.guest_count != guest_count:
                 # Update the guest count if it's different
                 existing_reservation.guest_count = guest_count
@@ -99,30 +225,21 @@ def create_reservation(
                     }
                 }
 
-        # Check if a table is available
-        available_table = find_available_table(
-            db, 
-            reservation_date, 
-            guest_count
+        # Pick the best-fitting free tables and insert the reservation
+        new_reservation = allocate_table(
+            db,
+            customer.id,
+            reservation_date,
+            guest_count,
+            strategy=strategy,
+            duration_minutes=duration_minutes,
         )
         
-        if not available_table:
+        if not new_reservation:
             return {
                 "message": "Sorry, no tables are available for this time slot",
                 "success": False,
             }
-            
-        # Create the reservation with the available table
-        new_reservation = Reservation(
-            customer_id=customer.id,
-            table_number=available_table,
-            reservation_date=reservation_date,
-            guest_count=guest_count,
-            status="confirmed"
-        )
-        
-        db.add(new_reservation)
-        db.flush()  # To get the ID and other generated values
         
         # Return the reservation confirmation
         return {
@@ -133,23 +250,231 @@ def create_reservation(
                 "name": customer.name,
                 "phone": customer.phone,
                 "table_number": new_reservation.table_number,
+                "tables": [new_reservation.table_number] + [r.table_number for r in new_reservation.joined_tables],
                 "date": reservation_date.strftime("%Y-%m-%d"),
                 "time": reservation_date.strftime("%H:%M"),
+                "duration_minutes": duration_minutes,
                 "guest_count": guest_count,
             }
         }
         
+    # Failures that say nothing about the booking itself are marked retryable: the
+    # caller must roll back, since the transaction may be aborted, and may try again
+    except SlotContentionError:
+        return {
+            "message": "This time slot is in high demand, please try again",
+            "success": False,
+            "retryable": True
+        }
+    except IntegrityError as e:
+        # The index was stale (e.g. another worker booked the table), reload the slot next time
+        occupancy_index.invalidate(reservation_date)
+        return {
+            "message": f"Database error: {str(e)}",
+            "success": False,
+            "retryable": True
+        }
     except SQLAlchemyError as e:
         return {
             "message": f"Database error: {str(e)}",
-            "success": False
+            "success": False,
+            "retryable": True
         }
     except Exception as e:
         return {
             "message": f"Error creating reservation: {str(e)}",
-            "success": False
+            "success": False,
+            "retryable": True
         }
 
+async def create_reservation_async(db: AsyncSession, **kwargs) -> dict:
+    """
+    Create a reservation through an async session.
+
+    Runs create_reservation on the session's greenlet bridge, so every query is
+    awaited on the event loop while the booking logic, allocation strategies and
+    occupancy index stay shared with the sync path.
+
+    Args:
+        db: SQLAlchemy async database session
+        **kwargs: Arguments for create_reservation
+
+    Returns:
+        Dictionary with reservation details and success status
+    """
+    return await db.run_sync(create_reservation, **kwargs)
+
+async def get_availability_async(db: AsyncSession, start_date: date, end_date: date) -> List[dict]:
+    """Async counterpart of get_availability, sharing its cache."""
+    return await db.run_sync(get_availability, start_date, end_date)
+
+def create_reservation_single_statement(
+    db: Session,
+    email: str,
+    reservation_date: datetime,
+    guest_count: int,
+    name: str = None,
+    phone: str = None,
+    duration_minutes: Optional[int] = None,
+) -> dict:
+    """
+    Book a reservation in a single round trip to the database.
+
+    Performs the same customer lookup/creation, duplicate check, table selection
+    and insert as create_reservation, but as one CTE statement. The statement is
+    only repeated when a concurrent booking wins the race for the chosen table.
+    Opening hours and party size must already have been checked by the caller.
+
+    Only single tables are considered; when none seats the party and tables can
+    be combined for it, the booking falls back to create_reservation's retry path.
+
+    Args:
+        db: Database session
+        email: Customer email
+        reservation_date: Start time of the reservation
+        guest_count: Number of guests
+        name: Customer name (required for new customers)
+        phone: Customer phone number (optional)
+        duration_minutes: How long the table is held, defaults to
+            settings.RESERVATION_DURATION_MINUTES
+
+    Returns:
+        Dictionary with reservation details and success status, in the same
+        shape as create_reservation
+    """
+    duration_minutes = duration_minutes or settings.RESERVATION_DURATION_MINUTES
+    reservation_end = reservation_date + timedelta(minutes=duration_minutes)
+    inventory = get_table_inventory()
+    params = {
+        "name": name or "",
+        "email": email,
+        "phone": phone,
+        "now": datetime.utcnow(),
+        "reservation_date": reservation_date,
+        "reservation_end": reservation_end,
+        "duration_minutes": duration_minutes,
+        "guest_count": guest_count,
+        "capacities": [inventory.capacities[n] for n in range(1, inventory.table_count + 1)],
+    }
+
+    # Only a lost race needs another round trip, each retry sees the winner's commit
+    for _ in range(settings.TABLE_ALLOCATION_MAX_ATTEMPTS):
+        # Best-fit order over the tables that are free as far as this process
+        # knows without a query; the statement itself has the final say
+        params["candidate_tables"] = inventory.single_table_candidates(
+            occupancy_index.cached_mask(reservation_date, reservation_end), guest_count
+        )
+        row = db.execute(_BOOKING_SQL, params).first()
+
+        if not row and not name:
+            return {
+                "message": "Name is required for new customers",
+                "success": False
+            }
+        # No row means a concurrent request created the customer after our
+        # snapshot; no new table means it took the table we picked
+        if row and (row.existing_table is not None or row.candidate_table is None
+                    or row.new_table is not None):
+            break
+    else:
+        raise SlotContentionError(f"Could not allocate a table for {reservation_date}")
+
+    if row.existing_table is not None and row.existing_date != reservation_date:
+        return overlapping_reservation_response(row.email, row.name, row.existing_table,
+                                                row.existing_date, row.existing_guest_count)
+    if row.existing_table is not None:
+        # Customer already has a reservation at this time
+        if guest_count > row.existing_seats:
+            return party_too_large_response(row.email, row.name, row.existing_table,
+                                            reservation_date, row.existing_guest_count)
+        if row.existing_guest_count != guest_count:
+            return {
+                "message": "You already have a reservation at this time. We've updated your guest count.",
+                "success": True,
+                "data": {
+                    "email": row.email,
+                    "name": row.name,
+                    "phone": row.phone,
+                    "table_number": row.existing_table,
+                    "date": reservation_date.strftime("%Y-%m-%d"),
+                    "time": reservation_date.strftime("%H:%M"),
+                    "guest_count": guest_count,
+                }
+            }
+        return {
+            "message": "You already have a reservation at this time.",
+            "success": False,
+            "data": {
+                "email": row.email,
+                "name": row.name,
+                "table_number": row.existing_table,
+                "date": reservation_date.strftime("%Y-%m-%d"),
+                "time": reservation_date.strftime("%H:%M"),
+                "guest_count": row.existing_guest_count,
+            }
+        }
+
+    if row.candidate_table is None:
+        if inventory.can_combine_for(guest_count):
+            # No single table is free, try seating the party at combined tables
+            return create_reservation(db, email, reservation_date, guest_count, name=name, phone=phone,
+                                      strategy="retry", duration_minutes=duration_minutes)
+        return {
+            "message": "Sorry, no tables are available for this time slot",
+            "success": False,
+        }
+
+    # Publish the table to the occupancy index once the session commits
+    occupancy_index.hold(db, reservation_date, reservation_end, row.new_table)
+
+    return {
+        "message": "Reservation confirmed",
+        "success": True,
+        "data": {
+            "email": row.email,
+            "name": row.name,
+            "phone": row.phone,
+            "table_number": row.new_table,
+            "tables": [row.new_table],
+            "date": reservation_date.strftime("%Y-%m-%d"),
+            "time": reservation_date.strftime("%H:%M"),
+            "duration_minutes": duration_minutes,
+            "guest_count": guest_count,
+        }
+    }
+
+def party_too_large_response(email: str, name: str, table_number: int,
+                             reservation_date: datetime, guest_count: int) -> dict:
+    """Response for a guest count update that no longer fits the booked tables"""
+    return {
+        "message": "Your table cannot seat that many guests. Please contact the restaurant to change your booking.",
+        "success": False,
+        "data": {
+            "email": email,
+            "name": name,
+            "table_number": table_number,
+            "date": reservation_date.strftime("%Y-%m-%d"),
+            "time": reservation_date.strftime("%H:%M"),
+            "guest_count": guest_count,
+        }
+    }
+
+def overlapping_reservation_response(email: str, name: str, table_number: int,
+                                     reservation_date: datetime, guest_count: int) -> dict:
+    """Response for a booking that overlaps one the customer already has at another time"""
+    return {
+        "message": f"You already have a reservation at {reservation_date.strftime('%H:%M')} that overlaps this time.",
+        "success": False,
+        "data": {
+            "email": email,
+            "name": name,
+            "table_number": table_number,
+            "date": reservation_date.strftime("%Y-%m-%d"),
+            "time": reservation_date.strftime("%H:%M"),
+            "guest_count": guest_count,
+        }
+    }
+
 def is_within_opening_hours(reservation_date: datetime) -> bool:
     # Convert to local time for hour checking (assuming reservation_date is in UTC)
     weekday = reservation_date.weekday()  # Monday is 0, Sunday is 6
@@ -165,40 +490,263 @@ def is_within_opening_hours(reservation_date: datetime) -> bool:
         
     return True
 
+def get_bookable_slots(start_date: date, end_date: date) -> List[datetime]:
+    """
+    List every reservation slot between two dates (inclusive) that falls
+    within opening hours.
+
+    Args:
+        start_date: First day of the range
+        end_date: Last day of the range
+
+    Returns:
+        Slot start times in chronological order
+    """
+    slots = []
+    day = start_date
+    while day <= end_date:
+        slot = datetime.combine(day, time(0, 0))
+        end_of_day = slot + timedelta(days=1)
+        while slot < end_of_day:
+            if is_within_opening_hours(slot):
+                slots.append(slot)
+            slot += timedelta(minutes=SLOT_MINUTES)
+        day += timedelta(days=1)
+    return slots
+
+def get_availability(db: Session, start_date: date, end_date: date) -> List[dict]:
+    """
+    Count free tables for every bookable slot between two dates (inclusive).
+
+    A table is free for a slot when a booking of the default length starting
+    then would not overlap any of its seatings. Seatings come from the occupancy
+    index, which loads the days it does not hold in a single query, and the
+    result is cached until a booking in the range commits.
+
+    Args:
+        db: Database session
+        start_date: First day of the range
+        end_date: Last day of the range
+
+    Returns:
+        List of dictionaries with the slot date, time and free table count
+    """
+    cached = availability_cache.get(start_date, end_date)
+    if cached is not None:
+        return cached
+
+    duration = timedelta(minutes=settings.RESERVATION_DURATION_MINUTES)
+    slots = get_bookable_slots(start_date, end_date)
+    masks = occupancy_index.get_masks(db, [(slot, slot + duration) for slot in slots])
+
+    availability = [
+        {
+            "date": slot.strftime("%Y-%m-%d"),
+            "time": slot.strftime("%H:%M"),
+            "free_tables": occupancy_index.table_count - mask.bit_count(),
+        }
+        for slot, mask in zip(slots, masks)
+    ]
+    availability_cache.set(start_date, end_date, availability)
+    return availability
+
+def list_reservations(
+    db: Session,
+    start_date: date,
+    end_date: date,
+    status: Optional[str] = None,
+    table_number: Optional[int] = None,
+    after: Optional[Tuple[datetime, int]] = None,
+    limit: int = 100,
+    batch_size: int = LISTING_BATCH_SIZE,
+) -> Iterator[list]:
+    """
+    Page through reservations in (reservation_date, id) order, with their customers.
+
+    Keyset pagination: a page starts right after the (reservation_date, id) of
+    the previous page's last row, which ix_reservation_date_id finds directly,
+    so the thousandth page costs the same as the first, unlike OFFSET. The
+    customer is joined into the same statement rather than lazy-loaded per
+    row, and rows arrive through a server-side cursor, so a large page is
+    never held in memory at once.
+
+    Args:
+        db: Database session, kept open while the batches are consumed
+        start_date: First day of the range
+        end_date: Last day of the range (inclusive)
+        status: Only reservations with this status, e.g. "confirmed"
+        table_number: Only reservations at this table
+        after: (reservation_date, id) of the last row already seen
+        limit: Most rows to return
+        batch_size: Rows fetched from the cursor per round trip
+
+    Yields:
+        list: Batches of rows with the reservation columns plus the
+        customer's name, email and phone
+    """
+    statement = (
+        select(
+            Reservation.id,
+            Reservation.reservation_date,
+            Reservation.duration_minutes,
+            Reservation.table_number,
+            Reservation.guest_count,
+            Reservation.status,
+            Reservation.parent_id,
+            Reservation.created_at,
+            Reservation.customer_id,
+            Customer.name,
+            Customer.email,
+            Customer.phone,
+        )
+        .join(Customer, Reservation.customer_id == Customer.id)
+        .where(
+            Reservation.reservation_date >= datetime.combine(start_date, time.min),
+            Reservation.reservation_date < datetime.combine(end_date + timedelta(days=1), time.min),
+        )
+        .order_by(Reservation.reservation_date, Reservation.id)
+        .limit(limit)
+        .execution_options(yield_per=batch_size)
+    )
+    if status is not None:
+        statement = statement.where(Reservation.status == status)
+    if table_number is not None:
+        statement = statement.where(Reservation.table_number == table_number)
+    if after is not None:
+        statement = statement.where(tuple_(Reservation.reservation_date, Reservation.id) > tuple_(*after))
+
+    for partition in db.execute(statement).partitions():
+        yield partition
+
+def day_lock_key(reservation_date: datetime) -> int:
+    """
+    Advisory lock key for the day of a reservation: days since the epoch.
+
+    Bookings of different lengths overlap across slots, so the whole day is locked.
+    """
+    return (reservation_date.date() - date(1970, 1, 1)).days
+
+def allocate_table(
+    db: Session,
+    customer_id: int,
+    reservation_date: datetime,
+    guest_count: int,
+    strategy: Optional[str] = None,
+    duration_minutes: Optional[int] = None,
+) -> Optional[Reservation]:
+    """
+    Assign the best-fitting free tables and insert a confirmed reservation.
+
+    The smallest single table that seats the party is used; tables are only
+    combined when no single table fits. A combined booking gets one reservation
+    per table, the extra ones linked to the returned reservation by parent_id.
+
+    Strategies:
+        index: trust the occupancy index and insert once. Fastest, but a stale
+            index in another worker can double book or fail on the unique constraint.
+        retry: insert inside a savepoint; if the table was taken meanwhile,
+            reload the slot and try another table, up to
+            settings.TABLE_ALLOCATION_MAX_ATTEMPTS times.
+        advisory_lock: serialize bookings for the day with a transaction-scoped
+            Postgres advisory lock and re-read the day under the lock.
+
+    Args:
+        db: Database session
+        customer_id: ID of the customer making the booking
+        reservation_date: Start time of the reservation
+        guest_count: Number of guests
+        strategy: One of the strategies above, defaults to settings.TABLE_ALLOCATION_STRATEGY
+        duration_minutes: How long the tables are held, defaults to
+            settings.RESERVATION_DURATION_MINUTES
+
+    Returns:
+        The flushed reservation, or None if the party cannot be seated
+
+    Raises:
+        SlotContentionError: If every retry attempt hit a taken table
+    """
+    strategy = strategy or settings.TABLE_ALLOCATION_STRATEGY
+    duration_minutes = duration_minutes or settings.RESERVATION_DURATION_MINUTES
+    reservation_end = reservation_date + timedelta(minutes=duration_minutes)
+
+    if strategy == "advisory_lock":
+        db.execute(select(func.pg_advisory_xact_lock(SLOT_LOCK_NAMESPACE, day_lock_key(reservation_date))))
+        # Other workers may have booked the day, so re-read it while holding the lock
+        occupancy_index.load(db, reservation_date)
+
+    if strategy != "retry":
+        tables = occupancy_index.claim(db, reservation_date, reservation_end, guest_count)
+        if tables is None:
+            return None
+        reservation = _new_reservation(customer_id, tables, reservation_date, guest_count, duration_minutes)
+        db.add(reservation)
+        db.flush()  # To get the ID and other generated values
+        return reservation
+
+    for _ in range(settings.TABLE_ALLOCATION_MAX_ATTEMPTS):
+        tables = occupancy_index.claim(db, reservation_date, reservation_end, guest_count)
+        if tables is None:
+            return None
+        try:
+            # Leaving the savepoint flushes the insert
+            with db.begin_nested():
+                reservation = _new_reservation(customer_id, tables, reservation_date, guest_count,
+                                               duration_minutes)
+                db.add(reservation)
+            return reservation
+        except IntegrityError:
+            # Another worker took a table, re-read the day before the next attempt
+            for table_number in tables:
+                occupancy_index.release_claim(db, reservation_date, reservation_end, table_number)
+            occupancy_index.load(db, reservation_date)
+
+    raise SlotContentionError(f"Could not allocate a table for {reservation_date}")
+
+def _new_reservation(customer_id: int, tables: Tuple[int, ...], reservation_date: datetime,
+                     guest_count: int, duration_minutes: int) -> Reservation:
+    reservation = Reservation(
+        customer_id=customer_id,
+        table_number=tables[0],
+        reservation_date=reservation_date,
+        duration_minutes=duration_minutes,
+        guest_count=guest_count,
+        status="confirmed"
+    )
+    # Extra tables hold no guests of their own
+    reservation.joined_tables = [
+        Reservation(
+            customer_id=customer_id,
+            table_number=table_number,
+            reservation_date=reservation_date,
+            duration_minutes=duration_minutes,
+            guest_count=0,
+            status="confirmed"
+        )
+        for table_number in tables[1:]
+    ]
+    return reservation
+
 def find_available_table(db: Session, reservation_date: datetime, 
-                        guest_count: int) -> Optional[int]:
+                        guest_count: int, duration_minutes: Optional[int] = None) -> Optional[Tuple[int, ...]]:
     """
-    Find an available table for the given reservation parameters.
-    Tables are considered unavailable if there's a reservation at the exact same time.
-    All tables can accommodate any party size.
+    Find the best-fitting available tables for the given reservation parameters.
+    Tables are considered unavailable if any of their reservations overlaps the requested time.
+    The smallest single table that seats the party wins; tables are only combined
+    when no single table fits. Reserved tables are read from the process-wide
+    occupancy index rather than queried on every call, and nothing is claimed.
     
     Args:
         db: Database session
         reservation_date: Start time of the requested reservation
         guest_count: Number of guests
+        duration_minutes: How long the tables are needed, defaults to
+            settings.RESERVATION_DURATION_MINUTES
         
     Returns:
-        An available table number (random) or None if no tables are available
-    """
-    # Get all tables that are already reserved for this time
-    reserved_tables = db.query(Reservation.table_number)\
-        .filter(
-            and_(
-                Reservation.reservation_date == reservation_date,
-                Reservation.status == "confirmed"
-            )
-        ).all()
-    
-    # Convert to a set of table numbers
-    reserved_table_numbers = {table[0] for table in reserved_tables}
-    
-    # Find available tables (all tables from 1 to TABLE_COUNT that aren't reserved)
-    available_tables = [i for i in range(1, TABLE_COUNT + 1) 
-                       if i not in reserved_table_numbers]
-    
-    # If no tables are available, return None
-    if not available_tables:
-        return None
-        
-    # Return the first available table
-    return random.choice(available_tables)
+        The table numbers to seat the party at, or None if it cannot be seated
+    """
+    duration = timedelta(minutes=duration_minutes or settings.RESERVATION_DURATION_MINUTES)
+    # Occupied tables come from the in-memory occupancy index, which only queries
+    # the database the first time a day is seen or after its entry expires
+    occupied = occupancy_index.get_mask(db, reservation_date, reservation_date + duration)
+    return get_table_inventory().best_fit(occupied, guest_count)
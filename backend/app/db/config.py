@@ -1,9 +1,13 @@
-from pydantic_settings import BaseSettings, SettingsConfigDict
+from functools import lru_cache
+from typing import Annotated, List, Literal
+from pydantic_settings import BaseSettings, NoDecode, SettingsConfigDict
 from pydantic import PostgresDsn, field_validator, ValidationInfo
 
 class Settings(BaseSettings):
     # Core settings
     API_STR: str = "/api"
+    # Bearer token for admin endpoints such as exports; they are disabled when unset
+    ADMIN_API_TOKEN: str | None = None
     # Database settings
     POSTGRES_USER: str
     POSTGRES_PASSWORD: str
@@ -12,6 +16,99 @@ class Settings(BaseSettings):
     POSTGRES_PORT: int = 5432
     SQLALCHEMY_DATABASE_URI: str | None = None
     DB_ECHO: bool = False
+    # Connection pool, per engine and per worker process
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    # Seconds after which a connection is replaced, -1 to never recycle
+    DB_POOL_RECYCLE: int = 1800
+    # "always" pings on every checkout, "idle" only after DB_POOL_PRE_PING_IDLE_SECONDS in the pool
+    DB_POOL_PRE_PING: Literal["always", "idle", "never"] = "idle"
+    DB_POOL_PRE_PING_IDLE_SECONDS: float = 60.0
+    # Read replicas for reads that may trail the primary (availability, listings,
+    # reports, exports), comma-separated postgresql:// URIs, used in turn. A replica
+    # is rechecked every DB_REPLICA_CHECK_SECONDS and skipped while it is unreachable
+    # or more than DB_REPLICA_MAX_LAG_SECONDS behind; with none usable reads go to the primary
+    DB_REPLICA_URIS: Annotated[List[str], NoDecode] = []
+    DB_REPLICA_CHECK_SECONDS: float = 5.0
+    DB_REPLICA_MAX_LAG_SECONDS: float = 30.0
+    # Seconds before a cached slot in the occupancy index is reloaded
+    OCCUPANCY_TTL_SECONDS: float = 30.0
+    # Seconds an availability response is cached when no local booking invalidates it
+    AVAILABILITY_CACHE_TTL_SECONDS: float = 30.0
+    # How concurrent bookings for the same slot are kept from sharing a table.
+    # "single_statement" books the whole reservation in one SQL round trip.
+    TABLE_ALLOCATION_STRATEGY: Literal["index", "retry", "advisory_lock", "single_statement"] = "retry"
+    TABLE_ALLOCATION_MAX_ATTEMPTS: int = 5
+    # Minutes a table is held for a booking that does not ask for a duration, and the
+    # longest duration that can be asked for
+    RESERVATION_DURATION_MINUTES: int = 90
+    RESERVATION_MAX_DURATION_MINUTES: int = 240
+    # JSON file with table capacities and combinable groups, see app/core/tables.py
+    TABLE_LAYOUT_PATH: str | None = None
+    # Outgoing mail, sent by scripts/outbox_worker.py and never on the request path
+    SMTP_HOST: str = "localhost"
+    SMTP_PORT: int = 25
+    SMTP_USERNAME: str | None = None
+    SMTP_PASSWORD: str | None = None
+    SMTP_STARTTLS: bool = False
+    SMTP_TIMEOUT_SECONDS: float = 10.0
+    EMAIL_FROM: str = "Café Fausse <reservations@cafefausse.com>"
+    # Outbox worker threads, each holding one pooled SMTP connection, and emails per batch
+    OUTBOX_WORKERS: int = 2
+    OUTBOX_BATCH_SIZE: int = 50
+    OUTBOX_POLL_SECONDS: float = 1.0
+    # Failed sends are retried after OUTBOX_BACKOFF_SECONDS, doubling up to the max
+    OUTBOX_MAX_ATTEMPTS: int = 8
+    OUTBOX_BACKOFF_SECONDS: float = 30.0
+    OUTBOX_BACKOFF_MAX_SECONDS: float = 3600.0
+    # Seconds a reservation response is replayed for repeats of its Idempotency-Key,
+    # and how many of them each worker process keeps in memory in front of the database
+    IDEMPOTENCY_KEY_TTL_SECONDS: int = 24 * 3600
+    IDEMPOTENCY_CACHE_ENTRIES: int = 1024
+    # Admission control for the reservation and newsletter APIs, see app/core/admission.py.
+    # Requests per minute per client address and API, and how many may come at once.
+    ADMISSION_CONTROL_ENABLED: bool = True
+    API_RATE_LIMIT_PER_MINUTE: float = 60.0
+    API_RATE_LIMIT_BURST: int = 20
+    # Concurrent requests per endpoint and worker process (DB_POOL_SIZE + DB_MAX_OVERFLOW
+    # when unset), and seconds a request may wait for one before it gets a 503
+    API_CONCURRENCY_LIMIT: int | None = None
+    API_QUEUE_TIMEOUT_SECONDS: float = 0.1
+    # "shared_memory" shares the rate limits between the worker processes of a host
+    RATE_LIMIT_BACKEND: Literal["memory", "shared_memory"] = "memory"
+    RATE_LIMIT_SHM_NAME: str = "cafe_fausse_rate_limits"
+    RATE_LIMIT_SLOTS: int = 4096
+    # Reverse proxies in front of the app; the client address is then read from X-Forwarded-For
+    TRUSTED_PROXY_COUNT: int = 0
+    # Browser cache lifetime for unhashed static files; hashed _astro/ assets never expire
+    STATIC_MAX_AGE_SECONDS: int = 3600
+    # In-memory cache for static files no larger than STATIC_CACHE_FILE_BYTES
+    STATIC_CACHE_MAX_BYTES: int = 8 * 1024 * 1024
+    STATIC_CACHE_FILE_BYTES: int = 256 * 1024
+    # Open the connection pool and load the occupancy index and availability for
+    # the next WARMUP_DAYS days when the app starts, before the first request
+    WARMUP_ON_START: bool = False
+    WARMUP_DAYS: int = 14
+    # Production server, see scripts/serve.py: worker processes (one per CPU when unset)
+    # and threads each worker runs Flask requests on. A worker is replaced after
+    # WEB_MAX_REQUESTS plus up to WEB_MAX_REQUESTS_JITTER requests, so they are not all
+    # replaced at once, and waits WEB_GRACEFUL_TIMEOUT_SECONDS for in-flight requests when stopped
+    WEB_WORKERS: int | None = None
+    WEB_THREADS: int = 10
+    WEB_MAX_REQUESTS: int | None = None
+    WEB_MAX_REQUESTS_JITTER: int = 0
+    WEB_GRACEFUL_TIMEOUT_SECONDS: float = 30.0
+    # Postgres connections all workers together may open; the server sizes each
+    # worker's pools to its share when set
+    DB_MAX_CONNECTIONS: int | None = None
+
+    @field_validator("DB_REPLICA_URIS", mode="before")
+    @classmethod
+    def split_replica_uris(cls, v: str | List[str]) -> List[str]:
+        if isinstance(v, str):
+            return [uri.strip() for uri in v.split(",") if uri.strip()]
+        return v
 
     @field_validator("SQLALCHEMY_DATABASE_URI", mode="before")
     @classmethod
@@ -30,4 +127,23 @@ class Settings(BaseSettings):
 
     model_config = SettingsConfigDict(case_sensitive=True, env_file=".env")
 
-settings = Settings()
\ No newline at end of file
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """The process-wide settings, read from the environment and .env the first time they are needed."""
+    return Settings()
+
+class LazySettings:
+    """
+    Stands in for the Settings instance until it is first used.
+
+    Attribute reads and writes go to get_settings(), so modules can import
+    ``settings`` at the top without importing them reading .env.
+    """
+
+    def __getattr__(self, name: str):
+        return getattr(get_settings(), name)
+
+    def __setattr__(self, name: str, value) -> None:
+        setattr(get_settings(), name, value)
+
+settings = LazySettings()
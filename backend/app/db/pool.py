@@ -0,0 +1,120 @@
+import threading
+import time
+from typing import Dict
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DisconnectionError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from app.core.metrics import Histogram
+
+
+class PoolStats:
+    """Live counters for one connection pool, fed by SQLAlchemy pool events."""
+
+    def __init__(self):
+        self.checked_out = 0
+        self.checkouts = 0
+        self.checkout_errors = 0
+        self.connections_created = 0
+        self.invalidations = 0
+        self.pings = 0
+        self.wait_time = Histogram()
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def as_dict(self, pool=None) -> dict:
+        """Counters, wait time histogram and, if given, the pool's own gauges."""
+        with self._lock:
+            stats = {
+                "checked_out": self.checked_out,
+                "checkouts": self.checkouts,
+                "checkout_errors": self.checkout_errors,
+                "connections_created": self.connections_created,
+                "invalidations": self.invalidations,
+                "pings": self.pings,
+            }
+        stats["wait_time_seconds"] = self.wait_time.snapshot()
+        if isinstance(pool, QueuePool):
+            stats.update({
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "overflow": pool.overflow(),
+            })
+        return stats
+
+
+# Stats per pool logging name, shared by a pool and the pools it is recreated as
+POOL_STATS: Dict[str, PoolStats] = {}
+
+
+class _TimedCheckoutMixin:
+    """Times every checkout, including waiting for a free connection, and counts failures."""
+
+    def connect(self):
+        stats = POOL_STATS.setdefault(self.logging_name, PoolStats())
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except Exception:
+            stats.increment("checkout_errors")
+            raise
+        stats.wait_time.observe(time.perf_counter() - started)
+        return connection
+
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_engine(engine: Engine, name: str, ping_after_idle: float = -1) -> PoolStats:
+    """
+    Attach pool event listeners that feed the engine's PoolStats.
+
+    Args:
+        engine: Engine whose pool was created with ``pool_logging_name=name``
+        name: Key in POOL_STATS
+        ping_after_idle: Ping connections that sat idle in the pool longer than
+            this many seconds before handing them out; negative disables
+
+    Returns:
+        The PoolStats for the engine
+    """
+    stats = POOL_STATS.setdefault(name, PoolStats())
+
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        stats.increment("connections_created")
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        idle_since = connection_record.info.pop("checked_in_at", None)
+        if ping_after_idle >= 0 and idle_since and time.monotonic() - idle_since > ping_after_idle:
+            stats.increment("pings")
+            try:
+                # The dialect's own ping, as pool_pre_ping uses; psycopg2's runs in
+                # autocommit so it leaves no transaction open on the connection
+                engine.dialect.do_ping(dbapi_connection)
+            except Exception as e:
+                # The pool discards the connection and retries with a fresh one
+                raise DisconnectionError(str(e)) from e
+        with stats._lock:
+            stats.checked_out += 1
+            stats.checkouts += 1
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+        stats.increment("checked_out", -1)
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        stats.increment("invalidations")
+
+    return stats
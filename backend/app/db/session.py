@@ -1,29 +1,242 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import itertools
+import os
+import threading
+import time
+from typing import List
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
 from .config import settings
-from contextlib import contextmanager
-
-# Create sync engine for Flask
-engine = create_engine(
-    # If your connection string is currently using asyncpg, convert it to standard postgresql
-    settings.SQLALCHEMY_DATABASE_URI.replace("postgresql+asyncpg://", "postgresql://"),
-    echo=settings.DB_ECHO,
-    future=True,
-    pool_pre_ping=True,
-)
+from .pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool, POOL_STATS, instrument_engine
+from app.core.instrumentation import instrument_statements
+from contextlib import asynccontextmanager, contextmanager
+
+# Engines are created on first use rather than at import, so importing the app
+# connects nothing, reads no settings, and loads asyncpg only for the ASGI app
+_engine: Engine | None = None
+_async_engine: AsyncEngine | None = None
+_replicas: "ReplicaSet | None" = None
+_engine_lock = threading.Lock()
+
+# Session.info key marking sessions bound to a read replica
+REPLICA_INFO_KEY = "replica"
+
+# Seconds a replica may take to accept a connection, so a dead one cannot hold up
+# the request that happens to check it
+REPLICA_CONNECT_TIMEOUT_SECONDS = 2
+
+# Seconds a standby's replay trails the primary: 0 while it streams and has replayed
+# everything received, otherwise the age of the last transaction it replayed.
+# A server that is not in recovery is not behind anything.
+_REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()
+             AND EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+def _pool_options() -> dict:
+    """Pool options shared by the sync and async engines"""
+    return dict(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING == "always",
+    )
+
+def _ping_after_idle() -> float:
+    # Idle pings are done by the pool instrumentation instead of pool_pre_ping
+    return settings.DB_POOL_PRE_PING_IDLE_SECONDS if settings.DB_POOL_PRE_PING == "idle" else -1
+
+def _create_sync_engine(uri: str, name: str, **options) -> Engine:
+    """A psycopg2 engine with the shared pool options, instrumented under ``name``."""
+    engine = create_engine(
+        # If your connection string is currently using asyncpg, convert it to standard postgresql
+        uri.replace("postgresql+asyncpg://", "postgresql://"),
+        echo=settings.DB_ECHO,
+        future=True,
+        poolclass=InstrumentedQueuePool,
+        pool_logging_name=name,
+        **_pool_options(),
+        **options,
+    )
+    instrument_engine(engine, name, ping_after_idle=_ping_after_idle())
+    # Per-request statement counts and timings for Server-Timing and /api/metrics
+    instrument_statements(engine)
+    return engine
+
+def get_engine() -> Engine:
+    """The sync engine used by Flask and the scripts, created on first use."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = _create_sync_engine(settings.SQLALCHEMY_DATABASE_URI, "primary")
+    return _engine
+
+class ReplicaSet:
+    """
+    Read replica engines, used in turn and skipped while unhealthy.
+
+    A replica is health checked when it comes up in turn and was last checked
+    more than ``check_interval`` seconds ago: it must accept a connection and
+    be at most ``max_lag`` seconds behind the primary. Other threads keep
+    using the last result meanwhile. A connection error in one of its
+    sessions marks it down until its next check.
+
+    Args:
+        engines: One engine per replica
+        names: Their pool names, as shown by /api/pool
+        check_interval: Seconds between health checks of a replica
+        max_lag: Seconds of replication lag after which a replica is skipped
+    """
+
+    def __init__(self, engines: List[Engine], names: List[str], check_interval: float, max_lag: float):
+        self.engines = engines
+        self.names = names
+        self.check_interval = check_interval
+        self.max_lag = max_lag
+        self._turn = itertools.count()
+        self.reset_after_fork()
+        for index, engine in enumerate(engines):
+            event.listen(engine, "handle_error", self._error_handler(index))
+
+    def pick(self) -> Engine | None:
+        """The next healthy replica in turn, or None if there is none."""
+        first = next(self._turn)
+        for offset in range(len(self.engines)):
+            index = (first + offset) % len(self.engines)
+            if self._healthy_now(index):
+                return self.engines[index]
+        return None
+
+    def health(self) -> List[bool]:
+        """Whether each replica passed its last health check."""
+        with self._lock:
+            return list(self._healthy)
+
+    def lag(self, engine: Engine) -> float | None:
+        """Seconds one replica trails the primary by, or None if it cannot be reached."""
+        try:
+            with engine.connect() as connection:
+                return float(connection.execute(_REPLICA_LAG_SQL).scalar())
+        except SQLAlchemyError:
+            return None
+
+    def check(self, engine: Engine) -> bool:
+        """Check one replica now: reachable and no more than max_lag seconds behind."""
+        lag = self.lag(engine)
+        return lag is not None and lag <= self.max_lag
+
+    def reset_after_fork(self) -> None:
+        """Forget health and locks inherited from the parent; every replica is checked again on first use."""
+        self._lock = threading.Lock()
+        self._healthy = [True] * len(self.engines)
+        self._checked_at = [float("-inf")] * len(self.engines)
+        self._checking = [False] * len(self.engines)
+
+    def _healthy_now(self, index: int) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            # Only one thread checks a replica at a time
+            if self._checking[index] or now - self._checked_at[index] < self.check_interval:
+                return self._healthy[index]
+            self._checking[index] = True
+        healthy = False
+        try:
+            healthy = self.check(self.engines[index])
+        finally:
+            with self._lock:
+                self._healthy[index] = healthy
+                self._checked_at[index] = time.monotonic()
+                self._checking[index] = False
+        return healthy
+
+    def _error_handler(self, index: int):
+        def mark_down(context) -> None:
+            # Lost connections and failed connects; errors in the SQL itself say nothing about the replica
+            if context.is_disconnect or context.connection is None:
+                with self._lock:
+                    self._healthy[index] = False
+                    self._checked_at[index] = time.monotonic()
+        return mark_down
+
+def get_replicas() -> ReplicaSet:
+    """The configured read replicas, possibly none, with their engines created on first use."""
+    global _replicas
+    if _replicas is None:
+        with _engine_lock:
+            if _replicas is None:
+                names = [f"replica-{n}" for n in range(1, len(settings.DB_REPLICA_URIS) + 1)]
+                engines = [
+                    _create_sync_engine(uri, name, connect_args={"connect_timeout": REPLICA_CONNECT_TIMEOUT_SECONDS})
+                    for uri, name in zip(settings.DB_REPLICA_URIS, names)
+                ]
+                _replicas = ReplicaSet(engines, names, settings.DB_REPLICA_CHECK_SECONDS,
+                                       settings.DB_REPLICA_MAX_LAG_SECONDS)
+    return _replicas
+
+def get_read_engine() -> Engine:
+    """A healthy read replica in turn, or the primary when none is configured or healthy."""
+    return get_replicas().pick() or get_engine()
+
+def is_replica(db: Session) -> bool:
+    """Whether a session reads from a replica, and so may trail the primary."""
+    return bool(db.info.get(REPLICA_INFO_KEY))
+
+def get_async_engine() -> AsyncEngine:
+    """The async engine used by the ASGI entry point, with the asyncpg URI as configured."""
+    global _async_engine
+    if _async_engine is None:
+        with _engine_lock:
+            if _async_engine is None:
+                engine = create_async_engine(
+                    settings.SQLALCHEMY_DATABASE_URI,
+                    echo=settings.DB_ECHO,
+                    poolclass=InstrumentedAsyncQueuePool,
+                    pool_logging_name="async",
+                    **_pool_options(),
+                )
+                instrument_engine(engine.sync_engine, "async", ping_after_idle=_ping_after_idle())
+                instrument_statements(engine.sync_engine)
+                _async_engine = engine
+    return _async_engine
+
+def __getattr__(name: str):
+    # ``from app.db.session import engine`` still works, creating the engine then
+    if name == "engine":
+        return get_engine()
+    if name == "async_engine":
+        return get_async_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# Create sync session factory
+# Create sync session factory, bound to the engine per session
 SessionLocal = sessionmaker(
-    engine,
     expire_on_commit=False,
     autocommit=False,
     autoflush=False,
 )
 
 @contextmanager
-def get_db():
-    """Provides a synchronous database session as a context manager."""
-    session = SessionLocal()
+def get_db(readonly: bool = False):
+    """
+    Provides a synchronous database session as a context manager.
+
+    Args:
+        readonly: Use a read replica, or the primary when none is usable. Only
+            for reads that may trail the primary by the replication lag; writes,
+            and reads of what was just written, keep the default.
+    """
+    if not readonly:
+        session = SessionLocal(bind=get_engine())
+    else:
+        engine = get_read_engine()
+        session = SessionLocal(bind=engine, info={REPLICA_INFO_KEY: engine is not _engine})
     try:
         yield session
         session.commit()
@@ -31,4 +244,101 @@ def get_db():
         session.rollback()
         raise
     finally:
-        session.close() 
\ No newline at end of file
+        session.close()
+
+# Create async session factory, bound to the async engine per session
+AsyncSessionLocal = async_sessionmaker(
+    expire_on_commit=False,
+    autoflush=False,
+)
+
+def get_pool_stats() -> dict:
+    """Live statistics for every instrumented engine's connection pool."""
+    pools = {}
+    if _engine is not None:
+        pools["primary"] = _engine.pool
+    if _async_engine is not None:
+        pools["async"] = _async_engine.sync_engine.pool
+    if _replicas is not None:
+        pools.update((name, engine.pool) for name, engine in zip(_replicas.names, _replicas.engines))
+    pool_stats = {name: stats.as_dict(pools.get(name)) for name, stats in POOL_STATS.items()}
+    if _replicas is not None:
+        for name, healthy in zip(_replicas.names, _replicas.health()):
+            pool_stats[name]["healthy"] = healthy
+    return pool_stats
+
+@asynccontextmanager
+async def get_async_db():
+    """Provides an asynchronous database session as an async context manager."""
+    session = AsyncSessionLocal(bind=get_async_engine())
+    try:
+        yield session
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
+
+def warm_pool(connections: int | None = None) -> int:
+    """
+    Open the sync pool's connections ahead of the first requests.
+
+    The connections are checked out together, so the pool really opens that
+    many rather than handing the same one back each time, then returned.
+
+    Args:
+        connections: How many to open, DB_POOL_SIZE by default
+
+    Returns:
+        The number of connections opened or already open
+    """
+    engine = get_engine()
+    opened = []
+    try:
+        for _ in range(connections or settings.DB_POOL_SIZE):
+            opened.append(engine.raw_connection())
+    finally:
+        for connection in opened:
+            connection.close()
+    return len(opened)
+
+async def warm_async_pool(connections: int | None = None) -> int:
+    """Async counterpart of warm_pool, for the ASGI app's lifespan startup."""
+    engine = get_async_engine()
+    opened = []
+    try:
+        for _ in range(connections or settings.DB_POOL_SIZE):
+            opened.append(await engine.connect())
+    finally:
+        for connection in opened:
+            await connection.close()
+    return len(opened)
+
+def dispose_engine() -> None:
+    """Close the sync and replica engines' pooled connections on shutdown, if they were ever created."""
+    if _engine is not None:
+        _engine.dispose()
+    if _replicas is not None:
+        for engine in _replicas.engines:
+            engine.dispose()
+
+async def dispose_async_engine() -> None:
+    """Close the async engine's pooled connections on shutdown, if it was ever created."""
+    if _async_engine is not None:
+        await _async_engine.dispose()
+
+def _dispose_after_fork() -> None:
+    # A forked worker must never use the pooled connections it inherited: the
+    # parent and every sibling hold the same sockets. close=False drops them
+    # from the child's pools without closing them under the parent's feet.
+    if _engine is not None:
+        _engine.dispose(close=False)
+    if _async_engine is not None:
+        _async_engine.sync_engine.dispose(close=False)
+    if _replicas is not None:
+        for engine in _replicas.engines:
+            engine.dispose(close=False)
+        _replicas.reset_after_fork()
+
+os.register_at_fork(after_in_child=_dispose_after_fork)
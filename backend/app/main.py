@@ -1,29 +1,126 @@
-from flask import Flask, jsonify, send_from_directory, request
+import os
+from datetime import date, timedelta
+from typing import Optional
+from flask import Flask, jsonify, request
 from flask_cors import CORS
-from api.reservations import reservations_bp
-from api.newsletter import newsletter_bp
-app = Flask(__name__, static_folder='static', static_url_path='/')
-
-# Register the API controllers
-app.register_blueprint(reservations_bp)
-app.register_blueprint(newsletter_bp)
-
-CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True)
-
-# Register custom 404 error handler
-@app.errorhandler(404)
-def page_not_found(e):
-    # Return the 404.html page from your static folder
-    return send_from_directory(app.static_folder, '404.html'), 404
-
-# Serve static files for all other routes
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve_static(path):
-    # Don't handle API routes here to avoid redirection
-    if path.startswith('api/'):
-        return jsonify({"error": "API endpoint not found"}), 404
-    return app.send_static_file('index.html')
 
+
+def create_app(warmup: Optional[bool] = None) -> Flask:
+    """
+    Build the Flask app.
+
+    Importing this module is cheap: blueprints, models and settings are
+    imported by the first call, and the database engines are created by the
+    first request that needs one, or by warm_up.
+
+    Args:
+        warmup: Run warm_up before returning, settings.WARMUP_ON_START if None.
+            Warm up each worker after it is forked: the pooled connections a
+            worker inherits are dropped, while primed caches carry over.
+
+    Returns:
+        The configured app
+    """
+    from app.api.monitoring import monitoring_bp
+    from app.api.newsletter import newsletter_bp
+    from app.api.reservations import reservations_bp
+    from app.core.admission import get_admission_controller
+    from app.core.instrumentation import init_request_metrics
+    from app.core.serialization import init_json
+    from app.core.static import StaticFiles
+    from app.db.config import settings
+
+    # Static files are served by StaticFiles below instead of Flask's static route
+    app = Flask(__name__, static_folder=None)
+    # Encode every JSON response with pydantic-core rather than the stdlib json module
+    init_json(app)
+
+    static_files = StaticFiles(
+        os.path.join(app.root_path, 'static'),
+        max_age=settings.STATIC_MAX_AGE_SECONDS,
+        cache_max_bytes=settings.STATIC_CACHE_MAX_BYTES,
+        cache_file_bytes=settings.STATIC_CACHE_FILE_BYTES,
+    )
+
+    # Rate limit and cap the concurrency of the database-backed APIs
+    admission_controller = get_admission_controller()
+    admission_controller.protect(reservations_bp)
+    admission_controller.protect(newsletter_bp)
+
+    # Register the API controllers
+    app.register_blueprint(reservations_bp)
+    app.register_blueprint(newsletter_bp)
+    app.register_blueprint(monitoring_bp)
+
+    # Time every request and its SQL for Server-Timing and /api/metrics
+    init_request_metrics(app)
+
+    CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True)
+
+    # Register custom 404 error handler
+    @app.errorhandler(404)
+    def page_not_found(e):
+        if request.path.startswith('/api/'):
+            return jsonify({"error": "API endpoint not found"}), 404
+        # Return the 404.html page from the static folder, or the home page if the build has none
+        response = static_files.serve('404.html', request, status=404) \
+            or static_files.serve('index.html', request, status=404)
+        return response or (jsonify({"error": "Not found"}), 404)
+
+    # Serve static files for all other routes
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve_static(path):
+        # Don't handle API routes here to avoid redirection
+        if path.startswith('api/'):
+            return jsonify({"error": "API endpoint not found"}), 404
+        # Pages like /menu resolve to their own menu/index.html
+        response = static_files.serve(path, request)
+        if response is None:
+            return page_not_found(None)
+        return response
+
+    if settings.WARMUP_ON_START if warmup is None else warmup:
+        warm_up()
+    return app
+
+
+def warm_up(days: Optional[int] = None) -> None:
+    """
+    Do the work the first requests of a fresh worker would otherwise wait for.
+
+    Opens DB_POOL_SIZE pooled connections, then loads the occupancy index and
+    caches availability for each of the next ``days`` days with a single
+    query, so the first availability lookups and bookings find their days in
+    memory.
+
+    Args:
+        days: Days from today to prime, settings.WARMUP_DAYS by default
+    """
+    from app.crud.reservation import get_availability
+    from app.db.config import settings
+    from app.db.session import get_db, warm_pool
+
+    warm_pool()
+    first = date.today()
+    last = first + timedelta(days=(days or settings.WARMUP_DAYS) - 1)
+    with get_db() as db:
+        # Loads every day into the occupancy index at once; the per-day calls then only read it
+        get_availability(db, first, last)
+        day = first
+        while day <= last:
+            get_availability(db, day, day)
+            day += timedelta(days=1)
+
+
+def __getattr__(name: str):
+    # ``from app.main import app``, as WSGI servers and asgi.py do, builds the app on first use
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Development server with the debugger and reloader; scripts/serve.py runs the app in production
 if __name__ == '__main__':
-    app.run(debug=True, port=8080)
\ No newline at end of file
+    create_app().run(debug=True, port=8080)
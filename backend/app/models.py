@@ -1,10 +1,9 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Time, UniqueConstraint
+from sqlalchemy import Column, Computed, Integer, String, Text, DateTime, Boolean, ForeignKey, Time, Index, text
+from sqlalchemy.dialects.postgresql import JSON, TSRANGE, ExcludeConstraint
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 
-print("Loading models.py module - ID:", id(Base))
-
 class Customer(Base):
     __tablename__ = "customers"
     
@@ -26,15 +25,39 @@ class Reservation(Base):
     reservation_date = Column(DateTime, nullable=False)
     table_number = Column(Integer, nullable=False)
     guest_count = Column(Integer, nullable=False)
+    # How long the table is held, from reservation_date
+    duration_minutes = Column(Integer, nullable=False, server_default="90")
+    seating = Column(TSRANGE, Computed(
+        "tsrange(reservation_date, reservation_date + make_interval(mins => duration_minutes))"
+    ))
     status = Column(String, default="confirmed")  # confirmed, cancelled, completed
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Set on the extra tables of a party seated at combined tables, pointing at
+    # the reservation that holds the guest count
+    parent_id = Column(Integer, ForeignKey("reservations.id"), nullable=True)
     
     # Relationship
     customer = relationship("Customer", back_populates="reservations")
+    parent = relationship("Reservation", back_populates="joined_tables", remote_side=[id])
+    joined_tables = relationship("Reservation", back_populates="parent")
     
-    # Add uniqueness constraint to prevent double booking
     __table_args__ = (
-        UniqueConstraint('table_number', 'reservation_date', name='uix_reservation_table_date'),
+        # Prevent double booking: a table's confirmed seatings never overlap.
+        # The table number is wrapped in a range so plain GiST can compare it
+        # without the btree_gist extension; cancelled reservations release their table
+        ExcludeConstraint(
+            (text("int4range(table_number, table_number, '[]')"), "="),
+            (text("seating"), "&&"),
+            name='excl_reservation_table_seating',
+            using='gist',
+            where=text("status = 'confirmed'"),
+        ),
+        # Slot occupancy/availability and the duplicate booking check
+        Index('ix_reservation_date_status', 'reservation_date', 'status'),
+        # Keyset pagination of the admin listing
+        Index('ix_reservation_date_id', 'reservation_date', 'id'),
+        Index('ix_reservation_customer_date', 'customer_id', 'reservation_date'),
+        Index('ix_reservation_parent', 'parent_id', postgresql_where=text("parent_id IS NOT NULL")),
     )
 
 class Newsletter(Base):
@@ -43,4 +66,52 @@ class Newsletter(Base):
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, nullable=False, index=True)
     subscribed_at = Column(DateTime, default=datetime.utcnow)
-    is_active = Column(Boolean, default=True) 
\ No newline at end of file
+    is_active = Column(Boolean, default=True) 
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)  # reservation_confirmation, newsletter_welcome
+    recipient = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    status = Column(String, nullable=False, default="pending")  # pending, sent, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime)
+
+    __table_args__ = (
+        # Workers only ever look for pending emails that are due
+        Index('ix_email_outbox_pending', 'next_attempt_at', postgresql_where=text("status = 'pending'")),
+    )
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_key"
+
+    key = Column(String, primary_key=True)  # Idempotency-Key header sent by the client
+    request_hash = Column(String, nullable=False)  # SHA-256 of the request body
+    status_code = Column(Integer, nullable=False)
+    response = Column(JSON, nullable=False)  # json, not jsonb, so replays keep the key order
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        # Expired keys are purged oldest first
+        Index('ix_idempotency_key_expires_at', 'expires_at'),
+    )
+
+# Bookings, guests and held tables per 30 minute slot and table, for reporting.
+# Kept up to date by triggers on reservations (see the e7f1b4c9d2a8 and
+# b3d9f0a7e215 migrations) in the writing transaction; the application only
+# reads it. Keyed by table so bookings of one slot never wait on each other.
+class ReservationOccupancy(Base):
+    __tablename__ = "reservation_occupancy"
+
+    slot = Column(DateTime, primary_key=True)  # Slot start
+    table_number = Column(Integer, primary_key=True)
+    bookings = Column(Integer, nullable=False, server_default="0")  # Parties starting in the slot
+    guests = Column(Integer, nullable=False, server_default="0")  # Covers starting in the slot
+    tables_held = Column(Integer, nullable=False, server_default="0")  # Tables seated during the slot
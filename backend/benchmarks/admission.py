@@ -0,0 +1,174 @@
+"""
+Admission control benchmark: a booking burst against a small connection pool.
+
+1. Token bucket cost: time per take() with the in-process and the shared
+   memory bucket stores.
+2. Burst: starts the sync server with a deliberately small pool and sends
+   --requests bookings from --concurrency threads, spread over many client
+   addresses (X-Forwarded-For behind one trusted proxy) plus one hot address
+   sending --hot-share of them. A prober fetches the home page throughout.
+   Runs once without and once with admission control and prints booking
+   statuses and latencies next to the static page latency.
+
+Run from the backend directory against a disposable, migrated database:
+
+    python -m benchmarks.admission --requests 600 --concurrency 32 --pool-size 2
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import date, timedelta
+from typing import Iterator, List, Tuple
+from sqlalchemy import delete, select
+from app.core.admission import MemoryBucketStore, SharedMemoryBucketStore
+from app.db.session import get_db
+from app.models import Customer, EmailOutbox, Reservation
+from benchmarks.loadgen import percentile, start_server, stop_server
+
+EMAIL_DOMAIN = "admission-bench.example.com"
+FIRST_DAY = date(2099, 4, 1)
+HOT_CLIENT = "203.0.113.7"
+TIMES = ["05:00 PM", "05:30 PM", "06:00 PM", "06:30 PM", "07:00 PM", "07:30 PM", "08:00 PM"]
+
+
+def bucket_cost(takes: int) -> None:
+    """Print the time per token bucket update for each store."""
+    name = f"admission_bench_{os.getpid()}"
+    stores = [("memory", MemoryBucketStore()), ("shared_memory", SharedMemoryBucketStore(name))]
+    try:
+        for label, store in stores:
+            keys = [f"reservations|10.0.{n // 256}.{n % 256}" for n in range(1000)]
+            started = time.perf_counter()
+            for key in itertools.islice(itertools.cycle(keys), takes):
+                store.take(key, 1.0, 20)
+            print(f"{label:<14} {(time.perf_counter() - started) / takes * 1e6:.2f} us per take")
+    finally:
+        stores[1][1]._shm.unlink()
+
+
+def bookings(count: int, hot_share: float) -> Iterator[Tuple[str, dict]]:
+    """(client address, booking body) pairs, every booking on its own slot."""
+    hot_every = round(1 / hot_share) if hot_share else 0
+    for number in range(count):
+        client = HOT_CLIENT if hot_every and number % hot_every == 0 else f"10.1.{number // 200 % 256}.{number % 200}"
+        yield client, {
+            "email": f"guest-{number}@{EMAIL_DOMAIN}",
+            "name": f"Bench Guest {number}",
+            "date": (FIRST_DAY + timedelta(days=number // len(TIMES) % 300)).strftime("%Y-%m-%d"),
+            "time": TIMES[number % len(TIMES)],
+            "guests": 2,
+        }
+
+
+def burst(port: int, requests: int, concurrency: int, hot_share: float) -> dict:
+    """Send the booking burst while probing the home page; return statuses and latencies."""
+    source = bookings(requests, hot_share)
+    source_lock = threading.Lock()
+    api_latencies: List[float] = []
+    statuses: Counter = Counter()
+    static_latencies: List[float] = []
+    done = threading.Event()
+
+    def client() -> None:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+        while True:
+            with source_lock:
+                item = next(source, None)
+            if item is None:
+                break
+            address, body = item
+            started = time.perf_counter()
+            conn.request("POST", "/api/reservations", body=json.dumps(body), headers={
+                "Content-Type": "application/json",
+                "X-Forwarded-For": address,
+            })
+            response = conn.getresponse()
+            response.read()
+            api_latencies.append(time.perf_counter() - started)
+            statuses[response.status] += 1
+        conn.close()
+
+    def prober() -> None:
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+        while not done.is_set():
+            started = time.perf_counter()
+            conn.request("GET", "/")
+            conn.getresponse().read()
+            static_latencies.append(time.perf_counter() - started)
+            time.sleep(0.01)
+        conn.close()
+
+    probe = threading.Thread(target=prober)
+    probe.start()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    probe.join()
+    return {
+        "elapsed": elapsed,
+        "statuses": dict(sorted(statuses.items())),
+        "api_p50_ms": percentile(api_latencies, 50) * 1000,
+        "api_p99_ms": percentile(api_latencies, 99) * 1000,
+        "static_p50_ms": percentile(static_latencies, 50) * 1000,
+        "static_p99_ms": percentile(static_latencies, 99) * 1000,
+    }
+
+
+def cleanup() -> None:
+    with get_db() as db:
+        customers = select(Customer.id).where(Customer.email.like(f"%@{EMAIL_DOMAIN}"))
+        db.execute(delete(Reservation).where(Reservation.customer_id.in_(customers)))
+        db.execute(delete(Customer).where(Customer.email.like(f"%@{EMAIL_DOMAIN}")))
+        db.execute(delete(EmailOutbox).where(EmailOutbox.recipient.like(f"%@{EMAIL_DOMAIN}")))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=600, help="Bookings per run")
+    parser.add_argument("--concurrency", type=int, default=32, help="Client threads")
+    parser.add_argument("--hot-share", type=float, default=0.25, help="Share of bookings from one address")
+    parser.add_argument("--pool-size", type=int, default=2, help="DB_POOL_SIZE of the server, without overflow")
+    parser.add_argument("--takes", type=int, default=200000, help="Token bucket updates timed per store")
+    parser.add_argument("--port", type=int, default=8097)
+    args = parser.parse_args()
+
+    bucket_cost(args.takes)
+
+    env = {
+        "DB_POOL_SIZE": str(args.pool_size),
+        "DB_MAX_OVERFLOW": "0",
+        "TRUSTED_PROXY_COUNT": "1",
+        # Each run starts with empty buckets shared by nobody else
+        "RATE_LIMIT_BACKEND": "shared_memory",
+    }
+    print(f"{'admission':<10} {'req/s':>7} {'api p50':>8} {'api p99':>8} {'static p50':>11} {'static p99':>11}  statuses")
+    for enabled in (False, True):
+        cleanup()
+        env["ADMISSION_CONTROL_ENABLED"] = str(enabled).lower()
+        env["RATE_LIMIT_SHM_NAME"] = f"admission_bench_{uuid.uuid4().hex[:8]}"
+        server = start_server(["benchmarks.server", "--stack", "sync", "--port", str(args.port)], args.port, env)
+        try:
+            result = burst(args.port, args.requests, args.concurrency, args.hot_share)
+        finally:
+            stop_server(server)
+            if enabled:
+                SharedMemoryBucketStore(env["RATE_LIMIT_SHM_NAME"], 1)._shm.unlink()
+        print(f"{'on' if enabled else 'off':<10} {args.requests / result['elapsed']:>7.0f} "
+              f"{result['api_p50_ms']:>8.1f} {result['api_p99_ms']:>8.1f} "
+              f"{result['static_p50_ms']:>11.1f} {result['static_p99_ms']:>11.1f}  {result['statuses']}")
+    cleanup()
+
+
+if __name__ == "__main__":
+    main()
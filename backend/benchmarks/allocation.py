@@ -0,0 +1,150 @@
+"""
+Concurrent same-slot booking benchmark for the table allocation strategies.
+
+Fires N bookings at one slot from a thread pool (optionally spread over several
+processes, each with its own occupancy index, to mimic separate workers) and
+reports throughput, conflict rate, p99 latency and double bookings per strategy.
+
+Run from the backend directory against a disposable database:
+
+    python -m benchmarks.allocation --bookings 30 --threads 10 --processes 2
+"""
+import argparse
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Tuple
+from sqlalchemy import delete, event, func, select
+from sqlalchemy.exc import IntegrityError
+from app.core.occupancy import occupancy_index
+from app.crud.reservation import create_reservation
+from app.db.session import engine, get_db
+from app.models import Customer, Reservation
+from benchmarks.loadgen import percentile
+
+STRATEGIES = ["index", "retry", "advisory_lock", "single_statement"]
+EMAIL_DOMAIN = "alloc-bench.example.com"
+
+_conflicts = 0
+_conflicts_lock = threading.Lock()
+
+
+@event.listens_for(engine, "handle_error")
+def _count_conflicts(context) -> None:
+    global _conflicts
+    if isinstance(context.sqlalchemy_exception, IntegrityError):
+        with _conflicts_lock:
+            _conflicts += 1
+
+
+def reset_slot(slot: datetime) -> None:
+    """Delete benchmark reservations and customers left by a previous run."""
+    with get_db() as db:
+        db.execute(delete(Reservation).where(Reservation.reservation_date == slot))
+        db.execute(delete(Customer).where(Customer.email.like(f"%@{EMAIL_DOMAIN}")))
+    occupancy_index.invalidate(slot)
+
+
+def book(strategy: str, slot: datetime, number: int) -> Tuple[float, str]:
+    """Make one booking in its own session and return its latency and outcome."""
+    started = time.perf_counter()
+    try:
+        with get_db() as db:
+            response = create_reservation(
+                db=db,
+                email=f"{strategy}-{number}@{EMAIL_DOMAIN}",
+                name=f"Bench Guest {number}",
+                reservation_date=slot,
+                guest_count=2,
+                strategy=strategy,
+            )
+            if not response.get("success"):
+                # Mirror the endpoint, whose session is discarded on a failed booking
+                db.rollback()
+        # Keep the first line only, database errors carry the full statement
+        outcome = "confirmed" if response.get("success") else response["message"].splitlines()[0][:60]
+    except Exception as e:
+        outcome = f"error: {type(e).__name__}"
+    return time.perf_counter() - started, outcome
+
+
+def run_worker(strategy: str, slot: datetime, numbers: List[int], threads: int,
+               start_at: float) -> Tuple[List[Tuple[float, str]], int]:
+    """Book a share of the slot from one process once the shared start time is reached."""
+    global _conflicts
+    # Connections inherited from the parent process must not be reused
+    engine.dispose(close=False)
+    _conflicts = 0
+    time.sleep(max(start_at - time.time(), 0))
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(lambda n: book(strategy, slot, n), numbers))
+    return results, _conflicts
+
+
+def run_strategy(strategy: str, slot: datetime, bookings: int, threads: int,
+                 processes: int) -> dict:
+    """Run one strategy and summarize the results."""
+    reset_slot(slot)
+    shares = [list(range(bookings))[i::processes] for i in range(processes)]
+    start_at = time.time() + 0.5
+
+    started = time.perf_counter()
+    if processes == 1:
+        outputs = [run_worker(strategy, slot, shares[0], threads, start_at)]
+    else:
+        with multiprocessing.get_context("fork").Pool(processes) as pool:
+            outputs = pool.starmap(
+                run_worker,
+                [(strategy, slot, share, threads, start_at) for share in shares]
+            )
+    elapsed = time.perf_counter() - started - 0.5
+
+    results = [result for output, _ in outputs for result in output]
+    conflicts = sum(count for _, count in outputs)
+    latencies = [latency for latency, _ in results]
+    outcomes = {}
+    for _, outcome in results:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+    with get_db() as db:
+        booked, tables = db.execute(
+            select(func.count(), func.count(func.distinct(Reservation.table_number)))
+            .where(Reservation.reservation_date == slot, Reservation.status == "confirmed")
+        ).one()
+    reset_slot(slot)
+
+    return {
+        "strategy": strategy,
+        "throughput": bookings / elapsed if elapsed > 0 else 0.0,
+        "conflict_rate": conflicts / bookings,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "double_booked": booked - tables,
+        "outcomes": outcomes,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bookings", type=int, default=30, help="Bookings fired at the slot per strategy")
+    parser.add_argument("--threads", type=int, default=10, help="Concurrent threads per process")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes, each with its own index")
+    parser.add_argument("--slot", default="2099-01-05 19:00", help="Slot to book, YYYY-MM-DD HH:MM")
+    parser.add_argument("--strategy", action="append", choices=STRATEGIES,
+                        help="Strategy to run, may be repeated (default: all)")
+    args = parser.parse_args()
+
+    slot = datetime.strptime(args.slot, "%Y-%m-%d %H:%M")
+    print(f"{'strategy':<14} {'book/s':>8} {'conflicts':>10} {'p50 ms':>8} {'p99 ms':>8} {'double':>7}  outcomes")
+    for strategy in args.strategy or STRATEGIES:
+        result = run_strategy(strategy, slot, args.bookings, args.threads, args.processes)
+        print(
+            f"{result['strategy']:<14} {result['throughput']:>8.1f} {result['conflict_rate']:>10.1%} "
+            f"{result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} {result['double_booked']:>7}  {result['outcomes']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
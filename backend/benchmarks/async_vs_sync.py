@@ -0,0 +1,102 @@
+"""
+Requests/sec of the sync Flask stack against the async ASGI stack.
+
+Starts uvicorn twice from the app directory, once serving the Flask app through
+its WSGI interface (sync psycopg2 engine) and once serving app.asgi:app (asyncpg
+AsyncSession), then drives POST /api/reservations and
+POST /api/newsletter/subscribe at each concurrency level.
+
+Run from the backend directory against a disposable database:
+
+    python -m benchmarks.async_vs_sync --requests 2000 --concurrency 16 --concurrency 64
+"""
+import argparse
+import itertools
+from datetime import date, timedelta
+from typing import Iterator
+from sqlalchemy import delete
+from app.crud.reservation import SLOT_MINUTES
+from app.db.session import get_db
+from app.models import Customer, Newsletter, Reservation
+from benchmarks.loadgen import Request, run_load, start_server, stop_server
+
+EMAIL_DOMAIN = "async-bench.example.com"
+# Times that are within opening hours on every day of the week
+SLOT_TIMES = ["5:00 PM", "5:30 PM", "6:00 PM", "6:30 PM", "7:00 PM", "7:30 PM", "8:00 PM", "8:30 PM"]
+FIRST_DAY = date(2098, 1, 5)
+TABLES_PER_SLOT = 30
+
+STACKS = {
+    "sync": ["uvicorn", "app.main:app", "--interface", "wsgi"],
+    "async": ["uvicorn", "app.asgi:app"],
+}
+
+
+def booking_requests(run: str, first_day: date) -> Iterator[Request]:
+    """
+    Endless stream of bookings from first_day onwards that never overfill a slot,
+    each one slot long so the next slot starts with every table free.
+    """
+    for number in itertools.count():
+        slot_index = number // TABLES_PER_SLOT
+        day = first_day + timedelta(days=slot_index // len(SLOT_TIMES))
+        yield "POST", "/api/reservations", {
+            "email": f"{run}-{number}@{EMAIL_DOMAIN}",
+            "name": f"Bench Guest {number}",
+            "date": day.strftime("%Y-%m-%d"),
+            "time": SLOT_TIMES[slot_index % len(SLOT_TIMES)],
+            "guests": 2,
+            "duration": SLOT_MINUTES,
+        }
+
+
+def subscribe_requests(run: str, first_day: date) -> Iterator[Request]:
+    """Endless stream of new newsletter subscriptions."""
+    for number in itertools.count():
+        yield "POST", "/api/newsletter/subscribe", {"email": f"{run}-{number}@{EMAIL_DOMAIN}"}
+
+
+def cleanup() -> None:
+    """Delete everything the benchmark created."""
+    with get_db() as db:
+        db.execute(delete(Reservation).where(Reservation.reservation_date >= FIRST_DAY))
+        db.execute(delete(Customer).where(Customer.email.like(f"%@{EMAIL_DOMAIN}")))
+        db.execute(delete(Newsletter).where(Newsletter.email.like(f"%@{EMAIL_DOMAIN}")))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per endpoint, stack and concurrency")
+    parser.add_argument("--concurrency", type=int, action="append", help="Client threads, may be repeated (default: 8, 32, 64)")
+    parser.add_argument("--port", type=int, default=8090)
+    args = parser.parse_args()
+
+    # Every run books its own days so no server sees a slot another run filled
+    days_per_run = args.requests // (TABLES_PER_SLOT * len(SLOT_TIMES)) + 1
+    first_day = FIRST_DAY
+
+    cleanup()
+    print(f"{'stack':<6} {'endpoint':<10} {'conc':>5} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}  statuses")
+    for stack, command in STACKS.items():
+        server = start_server([*command, "--port", str(args.port), "--log-level", "warning"], args.port)
+        try:
+            for concurrency in args.concurrency or [8, 32, 64]:
+                for endpoint, requests in (("booking", booking_requests), ("subscribe", subscribe_requests)):
+                    run = f"{stack}-{endpoint}-{concurrency}"
+                    result = run_load(
+                        "127.0.0.1", args.port,
+                        itertools.islice(requests(run, first_day), args.requests),
+                        concurrency,
+                    )
+                    first_day += timedelta(days=days_per_run)
+                    print(
+                        f"{stack:<6} {endpoint:<10} {concurrency:>5} {result['throughput']:>8.1f} "
+                        f"{result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f}  {result['statuses']}"
+                    )
+        finally:
+            stop_server(server)
+            cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+End-to-end load test of the booking, newsletter and static page endpoints.
+
+Seeds customers, booking history and newsletter subscribers, starts the app
+under uvicorn (benchmarks.server, which also counts SQL statements), then
+drives each scenario at each concurrency level:
+
+    reservations  POST /api/reservations, new guests filling future slots
+    subscribe     POST /api/newsletter/subscribe, new addresses
+    static        GET of every page and the assets it links, gzip accepted
+
+Prints throughput, p50/p95/p99 latency and SQL statements per request, and
+writes the results as JSON (default: benchmarks/results/) to diff across
+commits.
+
+Run from the backend directory against a disposable, migrated database:
+
+    python -m benchmarks.e2e --requests 1000 --concurrency 8 --concurrency 32
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import re
+import subprocess
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterator, List
+from sqlalchemy import delete, text
+from app.core.cache import availability_cache
+from app.core.tables import get_table_inventory
+from app.crud.reservation import SLOT_MINUTES
+from app.db.session import get_db
+from app.models import Customer, Newsletter, Reservation
+from benchmarks.loadgen import Request, run_load, start_server, stop_server
+from benchmarks.server import STATS_PATH
+
+EMAIL_DOMAIN = "e2e-bench.example.com"
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+# Times that are within opening hours on every day of the week
+SLOT_TIMES = ["5:00 PM", "5:30 PM", "6:00 PM", "6:30 PM", "7:00 PM", "7:30 PM", "8:00 PM", "8:30 PM"]
+FIRST_DAY = date(2098, 1, 5)
+PAGES = ["/", "/menu", "/gallery", "/about", "/reservations"]
+BROWSER_HEADERS = {"Accept-Encoding": "gzip, br", "Accept": "text/html,image/avif,image/webp,*/*"}
+
+# Customers, a confirmed booking for most tables of every evening slot in the
+# days before FIRST_DAY, and newsletter subscribers, one in ten unsubscribed
+_SEED_SQL = [
+    text("""
+        INSERT INTO customers (name, email, phone, newsletter_signup, created_at)
+        SELECT 'Regular ' || n, 'regular-' || n || '@' || :domain, '555-0100', n % 3 = 0, now()
+        FROM generate_series(1, :customers) AS n
+    """),
+    text("""
+        INSERT INTO reservations (customer_id, reservation_date, duration_minutes, table_number, guest_count,
+                                  status, created_at)
+        SELECT c.id, s.slot, :slot_minutes, t.n, 1 + (s.i + t.n) % (CAST(:capacities AS integer[]))[t.n],
+               'confirmed', now()
+        FROM generate_series(CAST(:history_start AS timestamp), CAST(:history_end AS timestamp),
+                             interval '30 minutes') WITH ORDINALITY AS s(slot, i)
+        CROSS JOIN generate_series(1, :tables) AS t(n)
+        JOIN customers c ON c.email = 'regular-' || (1 + (s.i * :tables + t.n) % :customers) || '@' || :domain
+        WHERE s.slot::time >= '17:00' AND s.slot::time < '21:00' AND (s.i + t.n) % 4 <> 0
+    """),
+    text("""
+        INSERT INTO newsletter (email, subscribed_at, is_active)
+        SELECT 'reader-' || n || '@' || :domain, now(), n % 10 <> 0
+        FROM generate_series(1, :subscribers) AS n
+    """),
+]
+
+
+def seed(customers: int, history_days: int, subscribers: int) -> None:
+    """Insert the seeded data set and refresh planner statistics."""
+    inventory = get_table_inventory()
+    params = {
+        "domain": EMAIL_DOMAIN,
+        "customers": customers,
+        "subscribers": subscribers,
+        "tables": inventory.table_count,
+        "slot_minutes": SLOT_MINUTES,
+        "capacities": [inventory.capacities[n] for n in range(1, inventory.table_count + 1)],
+        "history_start": datetime.combine(FIRST_DAY - timedelta(days=history_days), datetime.min.time()),
+        "history_end": datetime.combine(FIRST_DAY - timedelta(days=1), datetime.max.time()),
+    }
+    with get_db() as db:
+        for statement in _SEED_SQL:
+            db.execute(statement, params)
+    with get_db() as db:
+        db.execute(text("ANALYZE customers"))
+        db.execute(text("ANALYZE reservations"))
+        db.execute(text("ANALYZE newsletter"))
+
+
+def cleanup() -> None:
+    """Delete everything the benchmark seeded or created."""
+    with get_db() as db:
+        customer_ids = db.query(Customer.id).filter(Customer.email.like(f"%@{EMAIL_DOMAIN}"))
+        db.execute(delete(Reservation).where(Reservation.customer_id.in_(customer_ids.scalar_subquery())))
+        db.execute(delete(Customer).where(Customer.email.like(f"%@{EMAIL_DOMAIN}")))
+        db.execute(delete(Newsletter).where(Newsletter.email.like(f"%@{EMAIL_DOMAIN}")))
+    availability_cache.invalidate()
+
+
+def reservation_requests(run: str, first_day: date) -> Iterator[Request]:
+    """
+    Endless stream of bookings from first_day onwards that never overfill a slot:
+    each slot gets one party per table, no larger than that table seats, for
+    one slot's length so the next slot starts with every table free.
+    """
+    inventory = get_table_inventory()
+    for number in itertools.count():
+        slot_index = number // inventory.table_count
+        capacity = inventory.capacities[number % inventory.table_count + 1]
+        day = first_day + timedelta(days=slot_index // len(SLOT_TIMES))
+        yield "POST", "/api/reservations", {
+            "email": f"{run}-{number}@{EMAIL_DOMAIN}",
+            "name": f"Bench Guest {number}",
+            "phone": "555-0199",
+            "date": day.strftime("%Y-%m-%d"),
+            "time": SLOT_TIMES[slot_index % len(SLOT_TIMES)],
+            "guests": 1 + slot_index % capacity,
+            "duration": SLOT_MINUTES,
+        }
+
+
+def subscribe_requests(run: str, first_day: date) -> Iterator[Request]:
+    """Endless stream of new newsletter subscriptions."""
+    for number in itertools.count():
+        yield "POST", "/api/newsletter/subscribe", {"email": f"{run}-{number}@{EMAIL_DOMAIN}"}
+
+
+def page_assets(port: int) -> List[str]:
+    """Every page plus the _astro/ and images/ files each one links, as a browser would fetch them."""
+    paths = []
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    for page in PAGES:
+        connection.request("GET", page)
+        html = connection.getresponse().read().decode("utf-8", errors="replace")
+        paths.append(page)
+        for asset in re.findall(r'(?:href|src)="(/(?:_astro|images)/[^"]+)"', html):
+            if asset not in paths:
+                paths.append(asset)
+    connection.close()
+    return paths
+
+
+def statement_count(port: int) -> int:
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    connection.request("GET", STATS_PATH)
+    count = json.loads(connection.getresponse().read())["statements"]
+    connection.close()
+    return count
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per scenario and concurrency")
+    parser.add_argument("--concurrency", type=int, action="append", help="Client threads, may be repeated (default: 8, 32)")
+    parser.add_argument("--scenario", choices=["reservations", "subscribe", "static"], action="append",
+                        help="Scenarios to run, may be repeated (default: all)")
+    parser.add_argument("--stack", choices=["sync", "async"], default="sync",
+                        help="Flask through WSGI, or the asgi.py entry point")
+    parser.add_argument("--customers", type=int, default=5000)
+    parser.add_argument("--history-days", type=int, default=90)
+    parser.add_argument("--subscribers", type=int, default=20000)
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--output", help="JSON results file (default: benchmarks/results/e2e-<time>-<commit>.json)")
+    args = parser.parse_args()
+
+    concurrencies = args.concurrency or [8, 32]
+    scenarios = args.scenario or ["reservations", "subscribe", "static"]
+    revision = git_revision()
+    started_at = datetime.now()
+
+    cleanup()
+    seed(args.customers, args.history_days, args.subscribers)
+    server = start_server(["benchmarks.server", "--stack", args.stack, "--port", str(args.port)], args.port)
+
+    # Every reservations run books its own days so it never sees a slot another run filled
+    days_per_run = args.requests // (get_table_inventory().table_count * len(SLOT_TIMES)) + 1
+    first_day = FIRST_DAY
+    generators: Dict[str, Callable[[str, date], Iterator[Request]]] = {
+        "reservations": reservation_requests,
+        "subscribe": subscribe_requests,
+    }
+
+    results = []
+    print(f"{'scenario':<13} {'conc':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'sql/req':>8}  statuses")
+    try:
+        static_paths = page_assets(args.port)
+        for scenario in scenarios:
+            for concurrency in concurrencies:
+                if scenario == "static":
+                    requests = (("GET", path, None) for path in itertools.cycle(static_paths))
+                else:
+                    requests = generators[scenario](f"{scenario}-{concurrency}", first_day)
+                    first_day += timedelta(days=days_per_run)
+
+                statements_before = statement_count(args.port)
+                result = run_load(
+                    "127.0.0.1", args.port,
+                    itertools.islice(requests, args.requests),
+                    concurrency,
+                    headers=BROWSER_HEADERS,
+                )
+                result["sql_per_request"] = (statement_count(args.port) - statements_before) / result["requests"]
+                result.update({"scenario": scenario, "concurrency": concurrency})
+                results.append(result)
+                print(
+                    f"{scenario:<13} {concurrency:>5} {result['throughput']:>8.1f} {result['p50_ms']:>8.1f} "
+                    f"{result['p95_ms']:>8.1f} {result['p99_ms']:>8.1f} {result['sql_per_request']:>8.2f}  "
+                    f"{result['statuses']}"
+                )
+    finally:
+        stop_server(server)
+        cleanup()
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"e2e-{started_at.strftime('%Y%m%d-%H%M%S')}-{revision}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "commit": revision,
+            "started_at": started_at.isoformat(timespec="seconds"),
+            "stack": args.stack,
+            "requests": args.requests,
+            "seed": {
+                "customers": args.customers,
+                "history_days": args.history_days,
+                "subscribers": args.subscribers,
+            },
+            "results": results,
+        }, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
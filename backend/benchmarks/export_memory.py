@@ -0,0 +1,97 @@
+"""
+Peak memory of the newsletter export against the number of subscribers.
+
+For each row count, seeds that many active benchmark subscribers with one
+INSERT ... SELECT generate_series, then exports them in a fresh child process
+and records the child's peak RSS. The streaming export (server-side cursor)
+is compared with loading every ORM object through db.query(Newsletter).all().
+
+Run from the backend directory against a disposable database:
+
+    python -m benchmarks.export_memory --rows 10000 --rows 100000 --rows 1000000
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import time
+from sqlalchemy import delete, text
+from app.db.session import get_db
+from app.models import Newsletter
+
+EMAIL_DOMAIN = "export-bench.example.com"
+MODES = ["stream", "all"]
+
+
+def seed(rows: int) -> None:
+    """Replace the benchmark subscribers with ``rows`` fresh ones."""
+    with get_db() as db:
+        db.execute(delete(Newsletter).where(Newsletter.email.like(f"%@{EMAIL_DOMAIN}")))
+        db.execute(
+            text(
+                "INSERT INTO newsletter (email, subscribed_at, is_active) "
+                "SELECT 'guest-' || g || :domain, now(), true FROM generate_series(1, :rows) AS g"
+            ),
+            {"domain": f"@{EMAIL_DOMAIN}", "rows": rows},
+        )
+
+
+def cleanup() -> None:
+    with get_db() as db:
+        db.execute(delete(Newsletter).where(Newsletter.email.like(f"%@{EMAIL_DOMAIN}")))
+
+
+def export_in_child(mode: str) -> None:
+    """Body of the child process: export every active subscriber to /dev/null."""
+    from app.crud.newsletter import export_active_subscribers
+
+    with open(os.devnull, "w") as output, get_db() as db:
+        if mode == "stream":
+            for chunk in export_active_subscribers(db, "csv"):
+                output.write(chunk)
+        else:
+            for subscriber in db.query(Newsletter).filter(Newsletter.is_active.is_(True)).all():
+                output.write(f"{subscriber.email},{subscriber.subscribed_at.isoformat()}\r\n")
+
+
+def measure(mode: str) -> tuple:
+    """Run one export in a child process and return (seconds, peak RSS in MB)."""
+    before = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks.export_memory", "--child", mode],
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+    elapsed = time.perf_counter() - started
+    # ru_maxrss is the largest child so far (kilobytes on Linux), so a smaller
+    # run after a larger one reports the larger value; rows are measured ascending
+    peak = max(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss, before)
+    return elapsed, peak / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, action="append", help="Subscriber count, may be repeated")
+    parser.add_argument("--mode", choices=MODES, action="append", help="Export mode (default: both)")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        export_in_child(args.child)
+        return
+
+    print(f"{'rows':>10} {'mode':<7} {'seconds':>8} {'rows/s':>10} {'peak RSS MB':>12}")
+    try:
+        for rows in sorted(args.rows or [10_000, 100_000]):
+            seed(rows)
+            for mode in args.mode or MODES:
+                elapsed, peak_mb = measure(mode)
+                print(f"{rows:>10} {mode:<7} {elapsed:>8.2f} {rows / elapsed:>10.0f} {peak_mb:>12.1f}")
+    finally:
+        cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Idempotency-Key benchmark for POST /api/reservations.
+
+Starts two server processes, like two workers behind a load balancer, and:
+
+1. Retry storm: sends every key from --clients concurrent clients split across
+   both servers, so duplicates arrive while the first request is in flight.
+   Each key must book exactly one reservation and every client must get the
+   same response.
+2. Latency: for each new key, times the first request, a replay from the same
+   process (in-memory LRU) and a replay from the other process (database),
+   with the SQL statements each one sent.
+
+Exits non-zero if any key booked more or less than once or answered differently.
+
+Run from the backend directory against a disposable, migrated database:
+
+    python -m benchmarks.idempotency --keys 50 --clients 8 --stack sync
+"""
+import argparse
+import http.client
+import json
+import sys
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+from typing import List, Tuple
+from sqlalchemy import delete, func, select
+from app.db.session import get_db
+from app.models import Customer, EmailOutbox, IdempotencyKey, Reservation
+from benchmarks.loadgen import percentile, start_server, stop_server
+from benchmarks.server import STATS_PATH
+
+EMAIL_DOMAIN = "idempotency-bench.example.com"
+KEY_PREFIX = "idempotency-bench-"
+# Far enough ahead that real bookings are never touched
+FIRST_DAY = date(2099, 3, 1)
+
+
+def booking(number: int) -> dict:
+    """A two-guest booking on its own day, so bookings never compete for tables."""
+    return {
+        "email": f"guest-{number}@{EMAIL_DOMAIN}",
+        "name": f"Bench Guest {number}",
+        "date": (FIRST_DAY + timedelta(days=number)).strftime("%Y-%m-%d"),
+        "time": "07:00 PM",
+        "guests": 2,
+    }
+
+
+def post(conn: http.client.HTTPConnection, body: dict, key: str) -> Tuple[int, dict]:
+    conn.request("POST", "/api/reservations", body=json.dumps(body),
+                 headers={"Content-Type": "application/json", "Idempotency-Key": key})
+    response = conn.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def statements(conn: http.client.HTTPConnection) -> int:
+    conn.request("GET", STATS_PATH)
+    return json.loads(conn.getresponse().read())["statements"]
+
+
+def cleanup() -> None:
+    with get_db() as db:
+        customers = select(Customer.id).where(Customer.email.like(f"%@{EMAIL_DOMAIN}"))
+        db.execute(delete(Reservation).where(Reservation.customer_id.in_(customers)))
+        db.execute(delete(Customer).where(Customer.email.like(f"%@{EMAIL_DOMAIN}")))
+        db.execute(delete(EmailOutbox).where(EmailOutbox.recipient.like(f"%@{EMAIL_DOMAIN}")))
+        db.execute(delete(IdempotencyKey).where(IdempotencyKey.key.like(f"{KEY_PREFIX}%")))
+
+
+def retry_storm(ports: List[int], keys: int, clients: int) -> bool:
+    """Send each key from every client at once; True if all of them agreed."""
+    ok = True
+    for number in range(keys):
+        key = f"{KEY_PREFIX}{uuid.uuid4()}"
+        body = booking(number)
+        results = []
+        start = threading.Barrier(clients)
+
+        def client(port: int) -> None:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            start.wait()
+            results.append(post(conn, body, key))
+            conn.close()
+
+        threads = [threading.Thread(target=client, args=(ports[n % len(ports)],)) for n in range(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if {status for status, _ in results} != {201} or len({json.dumps(r, sort_keys=True) for r in results}) != 1:
+            print(f"key {key}: clients got different responses {results}")
+            ok = False
+    return ok
+
+
+def latency(ports: List[int], keys: int, offset: int) -> None:
+    """Time first requests and replays from the same and the other process."""
+    first, other = (http.client.HTTPConnection("127.0.0.1", port, timeout=60) for port in ports)
+    timings = {"first request": [], "replay, same process": [], "replay, other process": []}
+    counts = {name: [] for name in timings}
+    for number in range(offset, offset + keys):
+        key = f"{KEY_PREFIX}{uuid.uuid4()}"
+        body = booking(number)
+        for name, conn in zip(timings, (first, first, other)):
+            before = statements(conn)
+            started = time.perf_counter()
+            status, _ = post(conn, body, key)
+            timings[name].append(time.perf_counter() - started)
+            counts[name].append(statements(conn) - before)
+            assert status == 201, status
+    print(f"{'request':<22} {'p50 ms':>8} {'p95 ms':>8} {'statements':>11}")
+    for name, latencies in timings.items():
+        print(f"{name:<22} {percentile(latencies, 50) * 1000:>8.2f} {percentile(latencies, 95) * 1000:>8.2f} "
+              f"{sum(counts[name]) / len(counts[name]):>11.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, default=50, help="Keys per phase")
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent clients sending each key")
+    parser.add_argument("--stack", choices=["sync", "async"], default="sync")
+    parser.add_argument("--port", type=int, default=8095, help="First of the two server ports")
+    args = parser.parse_args()
+
+    ports = [args.port, args.port + 1]
+    cleanup()
+    servers = [start_server(["benchmarks.server", "--stack", args.stack, "--port", str(port)], port)
+               for port in ports]
+    try:
+        ok = retry_storm(ports, args.keys, args.clients)
+        latency(ports, args.keys, offset=args.keys)
+        with get_db() as db:
+            booked = db.scalar(
+                select(func.count()).select_from(Reservation).join(Customer)
+                .where(Customer.email.like(f"%@{EMAIL_DOMAIN}"))
+            )
+        print(f"{2 * args.keys} keys, {args.clients} clients per storm key: {booked} reservations booked")
+        ok = ok and booked == 2 * args.keys
+    finally:
+        for server in servers:
+            stop_server(server)
+        cleanup()
+    if not ok:
+        print("Some keys were booked more than once or answered differently")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
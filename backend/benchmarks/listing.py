@@ -0,0 +1,129 @@
+"""
+Admin listing benchmark: keyset pages against OFFSET pages and lazy-loaded customers.
+
+Seeds --days of booking history (about 360 reservations a day, so --days 3000
+is a million rows), then fetches one --page-size page at the start, middle and
+end of the history three ways:
+
+* keyset: list_reservations, starting after the previous page's last
+  (reservation_date, id), customers joined into the same statement
+* offset: the same joined select with OFFSET instead of a cursor
+* offset + lazy: ORM reservations with OFFSET, each customer lazy-loaded
+  when the row is rendered, the way a naive listing would
+
+Prints the median page time and the statements sent per page.
+
+Run from the backend directory against a disposable, migrated database:
+
+    python -m benchmarks.listing --days 365 --page-size 100
+"""
+import argparse
+import statistics
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, List, Tuple
+from sqlalchemy import select
+from app.crud.reservation import list_reservations
+from app.db.session import get_db
+from app.models import Customer, Reservation
+from benchmarks.query_plans import StatementRecorder, reset, seed
+
+
+def keyset_page(start: date, end: date, after: Tuple[datetime, int], size: int) -> Callable[[], int]:
+    def fetch() -> int:
+        with get_db() as db:
+            return sum(len(batch) for batch in list_reservations(db, start, end, after=after, limit=size))
+    return fetch
+
+
+def offset_page(start: date, end: date, offset: int, size: int) -> Callable[[], int]:
+    def fetch() -> int:
+        with get_db() as db:
+            rows = db.execute(
+                select(Reservation.id, Reservation.reservation_date, Reservation.duration_minutes,
+                       Reservation.table_number, Reservation.guest_count, Reservation.status,
+                       Reservation.parent_id, Reservation.created_at, Reservation.customer_id,
+                       Customer.name, Customer.email, Customer.phone)
+                .join(Customer, Reservation.customer_id == Customer.id)
+                .where(Reservation.reservation_date >= datetime.combine(start, datetime.min.time()),
+                       Reservation.reservation_date < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+                .order_by(Reservation.reservation_date, Reservation.id)
+                .offset(offset).limit(size)
+            ).all()
+            return len(rows)
+    return fetch
+
+
+def lazy_page(start: date, end: date, offset: int, size: int) -> Callable[[], int]:
+    def fetch() -> int:
+        with get_db() as db:
+            reservations = db.scalars(
+                select(Reservation)
+                .where(Reservation.reservation_date >= datetime.combine(start, datetime.min.time()),
+                       Reservation.reservation_date < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+                .order_by(Reservation.reservation_date, Reservation.id)
+                .offset(offset).limit(size)
+            ).all()
+            return len([(r.id, r.customer.name, r.customer.email) for r in reservations])
+    return fetch
+
+
+def cursor_at(start: date, end: date, offset: int) -> Tuple[datetime, int]:
+    """The (reservation_date, id) of the row just before ``offset``, i.e. the cursor a client would hold there."""
+    if offset == 0:
+        return datetime.combine(start, datetime.min.time()) - timedelta(microseconds=1), 0
+    with get_db() as db:
+        row = db.execute(
+            select(Reservation.reservation_date, Reservation.id)
+            .where(Reservation.reservation_date >= datetime.combine(start, datetime.min.time()),
+                   Reservation.reservation_date < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+            .order_by(Reservation.reservation_date, Reservation.id)
+            .offset(offset - 1).limit(1)
+        ).one()
+    return row.reservation_date, row.id
+
+
+def measure(fetch: Callable[[], int], repeats: int) -> Tuple[float, float, int]:
+    """(median ms, statements per page, rows per page) over ``repeats`` fetches."""
+    timings: List[float] = []
+    recorder = StatementRecorder()
+    rows = 0
+    for _ in range(repeats):
+        started = time.perf_counter()
+        with recorder:
+            rows = fetch()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000, len(recorder.statements) / repeats, rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=365, help="Days of booking history to seed")
+    parser.add_argument("--customers", type=int, default=20000)
+    parser.add_argument("--start", default="2098-01-01", help="First seeded day, YYYY-MM-DD")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=5, help="Fetches per measurement")
+    args = parser.parse_args()
+
+    start = datetime.strptime(args.start, "%Y-%m-%d").date()
+    end = start + timedelta(days=args.days - 1)
+    reset()
+    try:
+        rows = seed(start, args.days, args.customers)
+        print(f"Seeded {rows} reservations over {args.days} days")
+        print(f"{'position':<10} {'listing':<14} {'rows':>5} {'ms/page':>9} {'statements':>11}")
+        for label, fraction in (("start", 0.0), ("middle", 0.5), ("end", 0.999)):
+            offset = int(rows * fraction)
+            for name, fetch in (
+                ("keyset", keyset_page(start, end, cursor_at(start, end, offset), args.page_size)),
+                ("offset", offset_page(start, end, offset, args.page_size)),
+                ("offset + lazy", lazy_page(start, end, offset, args.page_size)),
+            ):
+                elapsed, statements, count = measure(fetch, args.repeats)
+                print(f"{label:<10} {name:<14} {count:>5} {elapsed:>9.2f} {statements:>11.1f}")
+    finally:
+        reset()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Threaded HTTP load generator and server helpers shared by the benchmarks.
+"""
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# Directory the app package and the benchmarks are run from
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (method, path, JSON body or None)
+Request = Tuple[str, str, Optional[dict]]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(int(round(pct / 100 * len(ordered))) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def summarize(latencies: List[float], elapsed: float) -> dict:
+    """Throughput and latency percentiles (in milliseconds) for a run."""
+    return {
+        "requests": len(latencies),
+        "throughput": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def run_load(host: str, port: int, requests: Iterable[Request], concurrency: int,
+             headers: Optional[dict] = None) -> dict:
+    """
+    Send requests from ``concurrency`` threads, each on its own keep-alive connection.
+
+    Args:
+        host: Server host
+        port: Server port
+        requests: Requests to send, consumed once across all threads
+        concurrency: Number of client threads
+        headers: Extra headers sent with every request, e.g. Accept-Encoding
+
+    Returns:
+        Summary with throughput, latency percentiles and status code counts
+    """
+    source: Iterator[Request] = iter(requests)
+    source_lock = threading.Lock()
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    results_lock = threading.Lock()
+
+    def worker() -> None:
+        conn = http.client.HTTPConnection(host, port, timeout=60)
+        local_latencies, local_statuses = [], Counter()
+        while True:
+            with source_lock:
+                item = next(source, None)
+            if item is None:
+                break
+            method, path, body = item
+            request_headers = dict(headers or {})
+            if body is not None:
+                request_headers["Content-Type"] = "application/json"
+            payload = json.dumps(body) if body is not None else None
+            started = time.perf_counter()
+            try:
+                conn.request(method, path, body=payload, headers=request_headers)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=60)
+                status = 0
+            local_latencies.append(time.perf_counter() - started)
+            local_statuses[status] += 1
+        conn.close()
+        with results_lock:
+            latencies.extend(local_latencies)
+            statuses.update(local_statuses)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    summary = summarize(latencies, elapsed)
+    summary["statuses"] = {str(code): count for code, count in sorted(statuses.items())}
+    return summary
+
+
+def wait_for_port(host: str, port: int, timeout: float = 30.0) -> None:
+    """Block until a TCP port accepts connections."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f"Server on {host}:{port} did not start within {timeout}s")
+
+
+def start_server(args: List[str], port: int, env: Optional[dict] = None) -> subprocess.Popen:
+    """
+    Start a server process from the backend directory and wait for it to listen.
+
+    Args:
+        args: Command line, e.g. ["uvicorn", "app.asgi:app", "--port", "8081"]
+        port: Port the server listens on
+        env: Extra environment variables
+
+    Returns:
+        The running server process
+    """
+    process_env = dict(os.environ)
+    process_env["PYTHONPATH"] = os.pathsep.join(filter(None, [BACKEND_DIR, process_env.get("PYTHONPATH")]))
+    # Load from one address would trip the per-client rate limits; the admission
+    # benchmark turns admission control back on through env
+    process_env["ADMISSION_CONTROL_ENABLED"] = "false"
+    process_env.update(env or {})
+    process = subprocess.Popen(
+        [sys.executable, "-m", *args],
+        cwd=BACKEND_DIR,
+        env=process_env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port("127.0.0.1", port)
+    except TimeoutError:
+        process.kill()
+        raise
+    return process
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    """Terminate a server process started by start_server."""
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
@@ -0,0 +1,89 @@
+"""
+Throughput of the bulk newsletter import against one-at-a-time subscribes.
+
+Generates a CSV of N rows spread over a few hundred domains, with a share of
+invalid addresses, in-file duplicates and previously unsubscribed emails, then
+imports it with bulk_import_subscribers. A sample of rows is also pushed
+through subscribe_to_newsletter one by one for comparison.
+
+Run from the backend directory against a disposable database:
+
+    python -m benchmarks.newsletter_import --rows 100000 --rows 500000
+"""
+import argparse
+import io
+import random
+import time
+from sqlalchemy import delete, text
+from app.crud.newsletter import bulk_import_subscribers, iter_csv_emails, subscribe_to_newsletter
+from app.db.session import get_db
+from app.models import Newsletter
+
+EMAIL_DOMAIN = "import-bench.example.com"
+DOMAINS = [f"mail{n}.{EMAIL_DOMAIN}" for n in range(300)]
+
+
+def generate_csv(rows: int, seed: int = 7) -> str:
+    """CSV with an email header, ~3% invalid rows and ~5% duplicates."""
+    rng = random.Random(seed)
+    lines = ["email,name"]
+    for number in range(rows):
+        roll = rng.random()
+        if roll < 0.03:
+            lines.append(f"not-an-email-{number},Guest")
+        elif roll < 0.08 and number:
+            lines.append(f"guest{rng.randrange(number)}@{DOMAINS[0]},Guest")
+        else:
+            lines.append(f"guest{number}@{rng.choice(DOMAINS)},Guest")
+    return "\n".join(lines) + "\n"
+
+
+def cleanup() -> None:
+    with get_db() as db:
+        db.execute(delete(Newsletter).where(Newsletter.email.like(f"%{EMAIL_DOMAIN}")))
+
+
+def seed_unsubscribed(rows: int) -> None:
+    """Pre-create inactive subscribers so part of the import reactivates rows."""
+    with get_db() as db:
+        db.execute(
+            text(
+                "INSERT INTO newsletter (email, subscribed_at, is_active) "
+                "SELECT 'guest' || g || '@' || :domain, now(), false "
+                "FROM generate_series(0, :rows, 10) AS g ON CONFLICT DO NOTHING"
+            ),
+            {"domain": DOMAINS[0], "rows": rows},
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, action="append", help="CSV rows, may be repeated")
+    parser.add_argument("--baseline-rows", type=int, default=2000, help="Rows for the one-at-a-time baseline")
+    args = parser.parse_args()
+
+    try:
+        cleanup()
+        started = time.perf_counter()
+        for number in range(args.baseline_rows):
+            with get_db() as db:
+                subscribe_to_newsletter(db, f"baseline{number}@{DOMAINS[1]}")
+        elapsed = time.perf_counter() - started
+        print(f"one-at-a-time: {args.baseline_rows} rows in {elapsed:.2f}s = {args.baseline_rows / elapsed:,.0f} rows/s")
+
+        for rows in args.rows or [100_000]:
+            cleanup()
+            seed_unsubscribed(rows)
+            source = io.StringIO(generate_csv(rows), newline="")
+            started = time.perf_counter()
+            with get_db() as db:
+                report = bulk_import_subscribers(db, iter_csv_emails(source))
+            elapsed = time.perf_counter() - started
+            report.pop("rejected_samples")
+            print(f"bulk import:   {rows} rows in {elapsed:.2f}s = {rows / elapsed:,.0f} rows/s  {report}")
+    finally:
+        cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Occupancy summary benchmark: reports from the summary table against scanning reservations.
+
+1. Seeds --days of booking history (the triggers fill the summary as rows are
+   inserted) and checks the summary against the reservations.
+2. Times the nightly report over the whole history and the slot utilization
+   report over its last quarter, read from the summary, next to the same
+   numbers aggregated from the reservations table. Exits non-zero if they differ.
+3. Times --bookings single-statement bookings with the summary triggers
+   enabled and disabled, the cost a booking pays for keeping the summary.
+
+Run from the backend directory against a disposable, migrated database:
+
+    python -m benchmarks.occupancy --days 365
+"""
+import argparse
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, List
+from sqlalchemy import text
+from app.crud.occupancy import get_nightly_occupancy, get_slot_utilization, occupancy_drift, rebuild_occupancy
+from app.crud.reservation import create_reservation
+from app.db.session import get_db
+from benchmarks.query_plans import EMAIL_DOMAIN, reset, seed
+
+# The nightly report straight from reservations, the way it was answered before the summary
+_NIGHTLY_SCAN_SQL = text("""
+    SELECT CAST(d.slot AS date) AS night, sum(d.bookings) AS bookings, sum(d.guests) AS covers,
+           max(d.tables_held) AS peak_tables_held
+    FROM (
+        SELECT s.slot, sum(s.bookings) AS bookings, sum(s.guests) AS guests, sum(s.tables_held) AS tables_held
+        FROM reservations r
+        CROSS JOIN LATERAL reservation_occupancy_rows(r.reservation_date, r.duration_minutes,
+                                                      r.parent_id IS NULL, r.guest_count) s
+        WHERE r.status IS DISTINCT FROM 'cancelled'
+          AND r.reservation_date >= :start AND r.reservation_date < :end
+        GROUP BY s.slot
+    ) AS d
+    GROUP BY 1
+    ORDER BY 1
+""")
+
+_TRIGGERS = ["trg_reservation_occupancy_insert", "trg_reservation_occupancy_delete", "trg_reservation_occupancy_update"]
+
+
+def timed(run: Callable[[], object], repeats: int) -> float:
+    """Median milliseconds over ``repeats`` runs."""
+    timings: List[float] = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def nightly_scan(start: date, end: date) -> List[dict]:
+    with get_db() as db:
+        rows = db.execute(_NIGHTLY_SCAN_SQL, {
+            "start": datetime.combine(start, datetime.min.time()),
+            "end": datetime.combine(end + timedelta(days=1), datetime.min.time()),
+        })
+        return [
+            {"date": row.night.strftime("%Y-%m-%d"), "bookings": row.bookings, "covers": row.covers,
+             "peak_tables_held": row.peak_tables_held}
+            for row in rows
+        ]
+
+
+def nightly_summary(start: date, end: date) -> List[dict]:
+    with get_db() as db:
+        return get_nightly_occupancy(db, start, end)
+
+
+def slot_summary(start: date, end: date) -> List[dict]:
+    with get_db() as db:
+        return get_slot_utilization(db, start, end)
+
+
+def set_triggers(enabled: bool) -> None:
+    with get_db() as db:
+        for trigger in _TRIGGERS:
+            db.execute(text(f"ALTER TABLE reservations {'ENABLE' if enabled else 'DISABLE'} TRIGGER {trigger}"))
+
+
+def booking_cost(first_day: date, bookings: int) -> float:
+    """Median milliseconds per booking, each on its own slot of days from ``first_day``."""
+    slots = [
+        # 17:00 to 20:30, open every day of the week
+        datetime.combine(first_day + timedelta(days=n // 8), datetime.min.time()) + timedelta(hours=17, minutes=30 * (n % 8))
+        for n in range(bookings)
+    ]
+    timings: List[float] = []
+    for n, slot in enumerate(slots):
+        started = time.perf_counter()
+        with get_db() as db:
+            response = create_reservation(db, f"trigger-{n}-{slot:%Y%m%d}@{EMAIL_DOMAIN}", slot, 2,
+                                          name="Trigger Guest", strategy="single_statement")
+        timings.append(time.perf_counter() - started)
+        assert response["success"], response
+    return statistics.median(timings) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=365, help="Days of booking history to seed")
+    parser.add_argument("--customers", type=int, default=20000)
+    parser.add_argument("--start", default="2098-01-01", help="First seeded day, YYYY-MM-DD")
+    parser.add_argument("--bookings", type=int, default=200, help="Bookings timed per trigger setting")
+    parser.add_argument("--repeats", type=int, default=5, help="Runs per report timing")
+    args = parser.parse_args()
+
+    start = datetime.strptime(args.start, "%Y-%m-%d").date()
+    end = start + timedelta(days=args.days - 1)
+    quarter = max(start, end - timedelta(days=90))
+    ok = True
+    reset()
+    try:
+        started = time.perf_counter()
+        rows = seed(start, args.days, args.customers)
+        print(f"Seeded {rows} reservations over {args.days} days in {time.perf_counter() - started:.1f}s")
+        with get_db() as db:
+            drift = occupancy_drift(db, start, end)
+        print(f"Summary check: {len(drift)} summary rows differ")
+        ok = not drift
+
+        scanned = nightly_scan(start, end)
+        summarized = [{k: v for k, v in row.items() if k != "peak_utilization"} for row in nightly_summary(start, end)]
+        if scanned != summarized:
+            print("The nightly report from the summary differs from the reservations")
+            ok = False
+
+        print(f"{'report':<34} {'scan ms':>9} {'summary ms':>11}")
+        print(f"{f'nightly, {args.days} days':<34} {timed(lambda: nightly_scan(start, end), args.repeats):>9.1f} "
+              f"{timed(lambda: nightly_summary(start, end), args.repeats):>11.1f}")
+        print(f"{'slot utilization, last 91 days':<34} {'':>9} "
+              f"{timed(lambda: slot_summary(quarter, end), args.repeats):>11.1f}")
+
+        with get_db() as db:
+            started = time.perf_counter()
+            rebuilt = rebuild_occupancy(db, start, end)
+        print(f"Rebuilt {rebuilt} summary rows in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+        # Bookings after the seeded history, so every slot is free
+        after = end + timedelta(days=7)
+        with_triggers = booking_cost(after, args.bookings)
+        set_triggers(False)
+        try:
+            without_triggers = booking_cost(after + timedelta(days=args.bookings // 8 + 7), args.bookings)
+        finally:
+            set_triggers(True)
+        print(f"Booking: {with_triggers:.2f} ms with the summary triggers, {without_triggers:.2f} ms without")
+    finally:
+        reset()
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Email outbox benchmark against a local SMTP stand-in (aiosmtpd).
+
+1. Request latency: times the newsletter subscribe transaction as it ran
+   before the outbox (upsert only), as it runs now (upsert plus an outbox
+   insert), and with the email sent inline over a fresh SMTP connection, the
+   cost the outbox keeps off the request path.
+2. Delivery: queues N emails, starts the outbox worker pool and reports
+   emails per second until the outbox is drained. With --fail-rate, the SMTP
+   stand-in answers 451 to that share of first deliveries so retries and
+   backoff are exercised. Exits non-zero if any email is lost, sent twice or
+   left undelivered.
+
+Run from the backend directory against a disposable, migrated database:
+
+    python -m benchmarks.outbox --emails 2000 --workers 4 --fail-rate 0.05
+"""
+import argparse
+import logging
+import random
+import smtplib
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, List
+from aiosmtpd.controller import Controller
+from sqlalchemy import delete, func, select
+from app.core.mailer import build_message, start_outbox_workers
+from app.crud.newsletter import upsert_subscription
+from app.crud.outbox import enqueue_email, enqueue_newsletter_welcome
+from app.db.config import settings
+from app.db.session import get_db
+from app.models import EmailOutbox, Newsletter
+from benchmarks.loadgen import percentile
+
+EMAIL_DOMAIN = "outbox-bench.example.com"
+
+
+class CountingHandler:
+    """aiosmtpd handler that counts deliveries per Message-ID and can defer some."""
+
+    def __init__(self, fail_rate: float = 0.0):
+        self.fail_rate = fail_rate
+        self.delivered: Counter = Counter()
+        self.deferred = 0
+        self._seen = set()
+        self._rng = random.Random(1)
+        self._lock = threading.Lock()
+
+    async def handle_DATA(self, server, session, envelope):
+        message_id = next((line.split(b":", 1)[1].strip() for line in envelope.content.splitlines()
+                           if line.lower().startswith(b"message-id:")), b"")
+        with self._lock:
+            first_attempt = message_id not in self._seen
+            self._seen.add(message_id)
+            if first_attempt and self._rng.random() < self.fail_rate:
+                self.deferred += 1
+                return "451 4.3.0 Try again later"
+            self.delivered[message_id] += 1
+        return "250 Message accepted for delivery"
+
+
+def cleanup() -> None:
+    with get_db() as db:
+        db.execute(delete(EmailOutbox).where(EmailOutbox.recipient.like(f"%@{EMAIL_DOMAIN}")))
+        db.execute(delete(Newsletter).where(Newsletter.email.like(f"%@{EMAIL_DOMAIN}")))
+
+
+def time_requests(requests: int, handle: Callable[[str], None], run: str) -> List[float]:
+    latencies = []
+    for number in range(requests):
+        started = time.perf_counter()
+        handle(f"{run}-{number}@{EMAIL_DOMAIN}")
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def request_latency(requests: int, port: int) -> None:
+    """Print subscribe transaction latency without the outbox, with it, and with inline SMTP."""
+    def upsert_only(email: str) -> None:
+        with get_db() as db:
+            upsert_subscription(db, email)
+
+    def with_outbox(email: str) -> None:
+        with get_db() as db:
+            upsert_subscription(db, email)
+            enqueue_newsletter_welcome(db, email)
+
+    def inline_smtp(email: str) -> None:
+        with get_db() as db:
+            upsert_subscription(db, email)
+            outbox_email = enqueue_newsletter_welcome(db, email)
+            db.flush()
+            with smtplib.SMTP("127.0.0.1", port, timeout=10) as smtp:
+                smtp.send_message(build_message(outbox_email))
+
+    variants = [("upsert only", upsert_only), ("with outbox", with_outbox), ("inline SMTP", inline_smtp)]
+    # Warm the connection pool and the statement caches first
+    time_requests(50, with_outbox, "warmup")
+    print(f"{'subscribe':<12} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    baseline = None
+    for name, handle in variants:
+        latencies = time_requests(requests, handle, name.replace(" ", "-"))
+        p50 = percentile(latencies, 50) * 1000
+        print(f"{name:<12} {p50:>8.2f} {percentile(latencies, 95) * 1000:>8.2f} "
+              f"{percentile(latencies, 99) * 1000:>8.2f}" + (f"   +{p50 - baseline:.2f} ms p50" if baseline else ""))
+        baseline = baseline or p50
+
+
+def delivery(emails: int, workers: int, handler: CountingHandler, timeout: float) -> bool:
+    """Queue emails, drain them with the worker pool and check every one arrived exactly once."""
+    with get_db() as db:
+        for number in range(emails):
+            enqueue_email(db, "benchmark", f"guest-{number}@{EMAIL_DOMAIN}", f"Benchmark email {number}",
+                          "Hello from the outbox benchmark.\n")
+    with get_db() as db:
+        pending = select(func.count()).where(EmailOutbox.recipient.like(f"%@{EMAIL_DOMAIN}"),
+                                             EmailOutbox.status == "pending")
+        queued = db.scalar(pending)
+
+    stop = threading.Event()
+    started = time.perf_counter()
+    threads = start_outbox_workers(get_db, stop, workers=workers)
+    remaining = queued
+    while remaining and time.perf_counter() - started < timeout:
+        time.sleep(0.05)
+        with get_db() as db:
+            remaining = db.scalar(pending)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for thread in threads:
+        thread.join()
+    threads[0].worker.smtp_pool.close()
+
+    with get_db() as db:
+        statuses = dict(db.execute(
+            select(EmailOutbox.status, func.count())
+            .where(EmailOutbox.recipient.like(f"%@{EMAIL_DOMAIN}"))
+            .group_by(EmailOutbox.status)
+        ).all())
+    duplicates = sum(1 for count in handler.delivered.values() if count > 1)
+    sent = statuses.get("sent", 0)
+    print(f"{queued} emails, {workers} workers: {sent / elapsed:.0f} emails/s over {elapsed:.2f}s, "
+          f"{handler.deferred} deferred and retried, "
+          f"{threads[0].worker.smtp_pool.connections_opened} SMTP connections opened")
+    print(f"outbox statuses {statuses}, delivered {len(handler.delivered)}, duplicates {duplicates}")
+    return sent == queued == len(handler.delivered) and not duplicates
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=2000, help="Emails to queue and deliver")
+    parser.add_argument("--workers", type=int, default=settings.OUTBOX_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=settings.OUTBOX_BATCH_SIZE)
+    parser.add_argument("--requests", type=int, default=300, help="Subscribe transactions per latency variant")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Share of first deliveries answered with 451")
+    parser.add_argument("--port", type=int, default=8025, help="Port of the SMTP stand-in")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds to wait for the outbox to drain")
+    args = parser.parse_args()
+
+    # Send to the stand-in and retry deferred emails right away
+    settings.SMTP_HOST = "127.0.0.1"
+    settings.SMTP_PORT = args.port
+    settings.SMTP_USERNAME = None
+    settings.SMTP_STARTTLS = False
+    settings.OUTBOX_BATCH_SIZE = args.batch_size
+    settings.OUTBOX_POLL_SECONDS = 0.05
+    settings.OUTBOX_BACKOFF_SECONDS = 0.1
+    # Deferred deliveries are expected, they are counted instead of logged
+    logging.getLogger("app.core.mailer").setLevel(logging.ERROR)
+
+    handler = CountingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=args.port)
+    controller.start()
+    cleanup()
+    try:
+        request_latency(args.requests, args.port)
+        cleanup()
+        handler.__init__(args.fail_rate)
+        ok = delivery(args.emails, args.workers, handler, args.timeout)
+    finally:
+        controller.stop()
+        cleanup()
+    if not ok:
+        print("Some emails were lost, duplicated or not delivered in time")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
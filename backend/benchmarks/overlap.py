@@ -0,0 +1,95 @@
+"""
+Overlap checks of the occupancy index against naive scans, as a night fills up.
+
+For growing numbers of seatings per table, times "is this table free for
+[start, end)?" three ways:
+
+    interval_set  IntervalSet.overlaps, a binary search (the occupancy index)
+    table_scan    a scan of the table's own seatings
+    night_scan    a scan of every seating of the night, all tables together
+
+Seatings are back to back with random lengths, so the densest rows stand in
+for a long service of short bookings or a day's worth of cached history.
+
+Run from the backend directory:
+
+    python -m benchmarks.overlap --tables 30 --lookups 20000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Callable, List, Tuple
+from app.core.intervals import IntervalSet
+
+Seating = Tuple[datetime, datetime]
+
+
+def fill_table(opening: datetime, seatings: int, rng: random.Random) -> List[Seating]:
+    """Back-to-back seatings of 30 to 120 minutes with short gaps."""
+    result = []
+    start = opening
+    for _ in range(seatings):
+        end = start + timedelta(minutes=rng.choice((30, 60, 90, 120)))
+        result.append((start, end))
+        start = end + timedelta(minutes=rng.choice((0, 15, 30)))
+    return result
+
+
+def time_lookups(check: Callable[[int, datetime, datetime], bool],
+                 queries: List[Tuple[int, datetime, datetime]]) -> float:
+    """Microseconds per lookup."""
+    started = time.perf_counter()
+    for table, start, end in queries:
+        check(table, start, end)
+    return (time.perf_counter() - started) / len(queries) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, default=30)
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[4, 16, 64, 256, 1024],
+                        help="Seatings per table")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    opening = datetime(2099, 1, 5, 17, 0)
+    print(f"{'seatings/table':>14} {'interval_set us':>16} {'table_scan us':>14} {'night_scan us':>14}")
+    for size in args.sizes:
+        per_table = [fill_table(opening, size, rng) for _ in range(args.tables)]
+        sets = []
+        for seatings in per_table:
+            intervals = IntervalSet()
+            for start, end in seatings:
+                intervals.add(start, end)
+            sets.append(intervals)
+        night = [(table, start, end) for table, seatings in enumerate(per_table) for start, end in seatings]
+
+        last_end = max(end for seatings in per_table for _, end in seatings)
+        span = int((last_end - opening).total_seconds() // 60)
+        queries = []
+        for _ in range(args.lookups):
+            start = opening + timedelta(minutes=rng.randrange(0, span, 15))
+            queries.append((rng.randrange(args.tables), start, start + timedelta(minutes=90)))
+
+        # All three must agree before their timings mean anything
+        for table, start, end in queries[:500]:
+            expected = sets[table].overlaps(start, end)
+            assert expected == any(s < end and e > start for s, e in per_table[table])
+            assert expected == any(t == table and s < end and e > start for t, s, e in night)
+
+        interval_set = time_lookups(lambda t, s, e: sets[t].overlaps(s, e), queries)
+        table_scan = time_lookups(
+            lambda t, s, e: any(start < e and end > s for start, end in per_table[t]), queries
+        )
+        night_scan = time_lookups(
+            lambda t, s, e: any(n == t and start < e and end > s for n, start, end in night),
+            queries[:max(args.lookups // size, 100)],
+        )
+        print(f"{size:>14} {interval_set:>16.2f} {table_scan:>14.2f} {night_scan:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
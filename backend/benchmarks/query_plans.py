@@ -0,0 +1,198 @@
+"""
+Query-plan regression check for the reservation hot paths.
+
+Seeds a year of booking history, runs the booking, availability and admin
+listing code paths while recording every statement they send, then EXPLAINs each recorded
+statement with its real parameters. Exits non-zero if any plan reads the
+reservations or customers table with a sequential scan.
+
+Run from the backend directory against a disposable, migrated database:
+
+    python -m benchmarks.query_plans --days 365
+"""
+import argparse
+import json
+import sys
+from datetime import date, datetime, timedelta
+from typing import Iterator, List, Tuple
+from sqlalchemy import delete, event, text
+from app.core.cache import availability_cache
+from app.core.occupancy import occupancy_index
+from app.crud.reservation import create_reservation, get_availability, list_reservations
+from app.db.session import get_db, get_engine
+from app.models import Customer, Reservation
+
+EMAIL_DOMAIN = "query-plan-bench.example.com"
+# Relations that must always be read through an index on the hot paths
+INDEXED_TABLES = {"reservations", "customers"}
+
+# One 30 minute booking per table per slot for every opening slot (17:00-22:30)
+# of the seeded days, spread over the seeded customers; every tenth one cancelled
+_SEED_SQL = text("""
+    WITH seeded_customers AS (
+        INSERT INTO customers (name, email, phone, newsletter_signup, created_at)
+        SELECT 'Plan Guest ' || n, 'guest-' || n || '@' || :domain, NULL, false, now()
+        FROM generate_series(1, :customers) AS n
+        RETURNING id
+    ),
+    numbered AS (
+        SELECT id, row_number() OVER (ORDER BY id) - 1 AS n FROM seeded_customers
+    )
+    INSERT INTO reservations (customer_id, reservation_date, duration_minutes, table_number, guest_count,
+                              status, created_at)
+    SELECT c.id, s.slot, 30, t.n, 2, CASE WHEN (s.i + t.n) % 10 = 0 THEN 'cancelled' ELSE 'confirmed' END, now()
+    FROM (
+        SELECT slot, row_number() OVER (ORDER BY slot) AS i
+        FROM generate_series(CAST(:start AS timestamp), CAST(:end AS timestamp), interval '30 minutes') AS slot
+        WHERE slot::time >= '17:00' AND slot::time < '23:00'
+    ) s
+    CROSS JOIN generate_series(1, :tables) AS t(n)
+    JOIN numbered c ON c.n = (s.i * :tables + t.n) % :customers
+""")
+
+
+class StatementRecorder:
+    """Records statements and parameters sent on the engine inside ``with`` blocks."""
+
+    def __init__(self):
+        self.statements: List[Tuple[str, object]] = []
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if not executemany:
+            self.statements.append((statement, parameters))
+
+    def __enter__(self):
+        # Listening only while active keeps finished recorders off the shared engine
+        event.listen(get_engine(), "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        event.remove(get_engine(), "before_cursor_execute", self._on_execute)
+
+
+def seed(start: date, days: int, customers: int) -> int:
+    """Insert the seeded history and refresh planner statistics."""
+    with get_db() as db:
+        result = db.execute(_SEED_SQL, {
+            "domain": EMAIL_DOMAIN,
+            "customers": customers,
+            "tables": occupancy_index.table_count,
+            "start": datetime.combine(start, datetime.min.time()),
+            "end": datetime.combine(start + timedelta(days=days - 1), datetime.max.time()),
+        })
+        rows = result.rowcount
+    with get_engine().connect() as connection:
+        connection.execute(text("ANALYZE reservations"))
+        connection.execute(text("ANALYZE customers"))
+        connection.commit()
+    return rows
+
+
+def reset() -> None:
+    """Delete every seeded and booked row."""
+    with get_db() as db:
+        customer_ids = db.query(Customer.id).filter(Customer.email.like(f"%@{EMAIL_DOMAIN}"))
+        db.execute(delete(Reservation).where(Reservation.customer_id.in_(customer_ids.scalar_subquery())))
+        db.execute(delete(Customer).where(Customer.email.like(f"%@{EMAIL_DOMAIN}")))
+    occupancy_index.invalidate()
+    availability_cache.invalidate()
+
+
+def scans(plan: dict) -> Iterator[dict]:
+    """Yield every node of an EXPLAIN (FORMAT JSON) plan tree."""
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from scans(child)
+
+
+def explain(statement: str, parameters) -> dict:
+    """EXPLAIN one statement without executing it."""
+    connection = get_engine().raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+        plan = cursor.fetchone()[0]
+        cursor.close()
+    finally:
+        connection.rollback()
+        connection.close()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+def record_hot_paths(slot: datetime) -> List[Tuple[str, str, object]]:
+    """Run the booking and availability paths once each and return (path, statement, parameters)."""
+    recorded = []
+    for strategy in ("retry", "single_statement"):
+        occupancy_index.invalidate()
+        recorder = StatementRecorder()
+        with recorder, get_db() as db:
+            create_reservation(
+                db=db,
+                email=f"walk-in-{strategy}@{EMAIL_DOMAIN}",
+                name="Walk-in Guest",
+                reservation_date=slot,
+                guest_count=2,
+                strategy=strategy,
+            )
+            db.rollback()
+        recorded += [(f"create_reservation[{strategy}]", s, p) for s, p in recorder.statements]
+
+    for days in (1, 7, 31):
+        availability_cache.invalidate()
+        recorder = StatementRecorder()
+        with recorder, get_db() as db:
+            get_availability(db, slot.date(), slot.date() + timedelta(days=days - 1))
+        recorded += [(f"get_availability[{days}d]", s, p) for s, p in recorder.statements]
+
+    # First page, a keyset page deep in the range, and one table's bookings
+    listings = [("first", {}), ("keyset", {"after": (slot, 0)}), ("table", {"table_number": 5, "status": "confirmed"})]
+    for name, filters in listings:
+        recorder = StatementRecorder()
+        with recorder, get_db() as db:
+            for _ in list_reservations(db, slot.date() - timedelta(days=90), slot.date() + timedelta(days=90),
+                                       limit=101, **filters):
+                pass
+        recorded += [(f"list_reservations[{name}]", s, p) for s, p in recorder.statements]
+    return recorded
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=365, help="Days of booking history to seed")
+    parser.add_argument("--customers", type=int, default=20000)
+    parser.add_argument("--start", default="2098-01-01", help="First seeded day, YYYY-MM-DD")
+    args = parser.parse_args()
+
+    start = datetime.strptime(args.start, "%Y-%m-%d").date()
+    reset()
+    try:
+        rows = seed(start, args.days, args.customers)
+        print(f"Seeded {rows} reservations over {args.days} days")
+
+        # A Saturday evening in the middle of the seeded history
+        probe = start + timedelta(days=args.days // 2)
+        probe += timedelta(days=(5 - probe.weekday()) % 7)
+        slot = datetime.combine(probe, datetime.min.time()).replace(hour=19)
+
+        failed = False
+        for path, statement, parameters in record_hot_paths(slot):
+            if not statement.lstrip().upper().startswith(("SELECT", "WITH", "INSERT", "UPDATE")):
+                continue
+            plan = explain(statement, parameters)
+            seq_scans = sorted({
+                node["Relation Name"] for node in scans(plan)
+                if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in INDEXED_TABLES
+            })
+            first_line = " ".join(statement.split())[:70]
+            status = f"FAIL seq scan on {', '.join(seq_scans)}" if seq_scans else "ok"
+            print(f"{path:<38} {status:<28} {first_line}")
+            failed = failed or bool(seq_scans)
+    finally:
+        reset()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""
+Read replica benchmark: where read-only work runs with and without replicas.
+
+1. Seeds --days of booking history on the primary.
+2. Runs --reads read-only requests from --threads threads, once with the
+   primary alone and once with the replicas, after waiting for every
+   --replica to replay the history: an availability week (with its
+   cache and occupancy index entries dropped first, so it reads the
+   database), the first listing page of a week and a month's nightly
+   occupancy report. Prints reads/sec, latency and the connection checkouts
+   each pool served.
+3. Books --bookings tables one after another with replicas enabled, checking
+   after each one that the availability of its slot already counts it.
+   Bookings stay on the primary and the occupancy index never keeps days read
+   from a replica, so the check holds however far a replica trails. Exits
+   non-zero if it does not.
+
+Needs a streaming replica of the database, e.g. made with
+``pg_basebackup -R`` and started on another port. Run from the backend
+directory against a disposable, migrated database:
+
+    python -m benchmarks.replicas --replica "postgresql://postgres@:5433/cafe_fausse?host=/tmp/pgreplica"
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List
+from app.core.cache import availability_cache
+from app.core.occupancy import occupancy_index
+from app.crud.occupancy import get_nightly_occupancy
+from app.crud.reservation import create_reservation, get_availability, list_reservations
+from app.db import session
+from app.db.config import settings
+from app.db.pool import POOL_STATS
+from app.db.session import get_db, get_replicas
+from benchmarks.loadgen import summarize
+from benchmarks.query_plans import EMAIL_DOMAIN, reset, seed
+
+
+def availability_week(first: date) -> None:
+    for day in (first + timedelta(days=n) for n in range(7)):
+        availability_cache.invalidate(day)
+        occupancy_index.invalidate(day)
+    with get_db(readonly=True) as db:
+        get_availability(db, first, first + timedelta(days=6))
+
+
+def listing_page(first: date) -> None:
+    with get_db(readonly=True) as db:
+        next(list_reservations(db, first, first + timedelta(days=6), limit=100), None)
+
+
+def occupancy_month(first: date) -> None:
+    with get_db(readonly=True) as db:
+        get_nightly_occupancy(db, first, first + timedelta(days=29))
+
+
+READS = [availability_week, listing_page, occupancy_month]
+
+
+def checkouts() -> Dict[str, int]:
+    return {name: stats.checkouts for name, stats in POOL_STATS.items()}
+
+
+def run_reads(start: date, days: int, reads: int, threads: int) -> dict:
+    """Run ``reads`` random reads from ``threads`` threads and summarize them."""
+    remaining = iter(range(reads))
+    lock = threading.Lock()
+    latencies: List[float] = []
+
+    def worker() -> None:
+        rng = random.Random()
+        local: List[float] = []
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    break
+            first = start + timedelta(days=rng.randrange(max(days - 30, 1)))
+            started = time.perf_counter()
+            rng.choice(READS)(first)
+            local.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local)
+
+    before = checkouts()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    result = summarize(latencies, time.perf_counter() - started)
+    result["checkouts"] = {name: count - before.get(name, 0) for name, count in checkouts().items()
+                           if count != before.get(name, 0)}
+    return result
+
+
+def wait_for_replicas(timeout: float = 300.0) -> None:
+    """Block until every replica has replayed everything it received."""
+    replicas = get_replicas()
+    deadline = time.monotonic() + timeout
+    for engine in replicas.engines:
+        while replicas.lag(engine) != 0:
+            if time.monotonic() > deadline:
+                raise TimeoutError("A replica did not catch up with the seeded history")
+            time.sleep(0.5)
+
+
+def booked_slots_visible(first_day: date, bookings: int) -> int:
+    """Book one slot after another and count how many did not show up in availability at once."""
+    missed = 0
+    for n in range(bookings):
+        slot = datetime.combine(first_day + timedelta(days=n // 8), datetime.min.time()) \
+            + timedelta(hours=17, minutes=30 * (n % 8))
+        # Read the slot's day before booking it, as a guest picking a time would
+        with get_db(readonly=True) as db:
+            before = {(s["date"], s["time"]): s["free_tables"] for s in get_availability(db, slot.date(), slot.date())}
+        with get_db() as db:
+            response = create_reservation(db, f"replica-{n}@{EMAIL_DOMAIN}", slot, 2, name="Replica Guest")
+        assert response["success"], response
+        with get_db(readonly=True) as db:
+            after = {(s["date"], s["time"]): s["free_tables"] for s in get_availability(db, slot.date(), slot.date())}
+        key = (slot.strftime("%Y-%m-%d"), slot.strftime("%H:%M"))
+        if after[key] != before[key] - 1:
+            missed += 1
+    return missed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--replica", action="append", required=True, help="Replica URI, may be repeated")
+    parser.add_argument("--days", type=int, default=90, help="Days of booking history to seed")
+    parser.add_argument("--customers", type=int, default=5000)
+    parser.add_argument("--start", default="2098-01-01", help="First seeded day, YYYY-MM-DD")
+    parser.add_argument("--reads", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--bookings", type=int, default=40)
+    args = parser.parse_args()
+
+    start = datetime.strptime(args.start, "%Y-%m-%d").date()
+    reset()
+    ok = True
+    try:
+        rows = seed(start, args.days, args.customers)
+        print(f"Seeded {rows} reservations over {args.days} days")
+
+        print(f"{'reads on':<10} {'reads/s':>8} {'p50 ms':>8} {'p99 ms':>8}  checkouts per pool")
+        for label in ("primary", "replicas"):
+            if label == "replicas":
+                # The read-only sessions of the first run created an empty replica set
+                settings.DB_REPLICA_URIS = args.replica
+                session._replicas = None
+                wait_for_replicas()
+            result = run_reads(start, args.days, args.reads, args.threads)
+            print(f"{label:<10} {result['throughput']:>8.1f} {result['p50_ms']:>8.1f} "
+                  f"{result['p99_ms']:>8.1f}  {result['checkouts']}")
+
+        missed = booked_slots_visible(start + timedelta(days=args.days + 7), args.bookings)
+        print(f"{args.bookings} bookings: {missed} missing from the availability read right after them")
+        ok = missed == 0
+    finally:
+        reset()
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
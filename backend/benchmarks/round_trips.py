@@ -0,0 +1,90 @@
+"""
+Count the SQL statements each booking path sends per reservation.
+
+Books a series of reservations through create_reservation with every table
+allocation strategy and prints the statements per booking. Exits non-zero if
+the single_statement path ever needs more than one round trip.
+
+Run from the backend directory against a disposable database:
+
+    python -m benchmarks.round_trips --bookings 20
+"""
+import argparse
+import sys
+from datetime import datetime
+from sqlalchemy import delete, event
+from app.core.occupancy import occupancy_index
+from app.crud.reservation import create_reservation
+from app.db.session import engine, get_db
+from app.models import Customer, Reservation
+
+STRATEGIES = ["index", "retry", "advisory_lock", "single_statement"]
+EMAIL_DOMAIN = "round-trip-bench.example.com"
+
+
+class StatementCounter:
+    """Counts statements sent on the engine while active."""
+
+    def __init__(self):
+        self.count = 0
+        self.active = False
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if self.active:
+            self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        self.active = True
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.active = False
+
+
+def reset(slot: datetime) -> None:
+    """Delete benchmark reservations and customers."""
+    with get_db() as db:
+        db.execute(delete(Reservation).where(Reservation.reservation_date == slot))
+        db.execute(delete(Customer).where(Customer.email.like(f"%@{EMAIL_DOMAIN}")))
+    occupancy_index.invalidate()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bookings", type=int, default=20, help="Bookings per strategy (at most 30)")
+    parser.add_argument("--slot", default="2099-01-05 18:00", help="Slot to book, YYYY-MM-DD HH:MM")
+    args = parser.parse_args()
+
+    slot = datetime.strptime(args.slot, "%Y-%m-%d %H:%M")
+    counter = StatementCounter()
+    failed = False
+
+    print(f"{'strategy':<18} {'min':>4} {'max':>4} {'mean':>6}")
+    for strategy in STRATEGIES:
+        reset(slot)
+        counts = []
+        for number in range(args.bookings):
+            with counter, get_db() as db:
+                response = create_reservation(
+                    db=db,
+                    email=f"{strategy}-{number}@{EMAIL_DOMAIN}",
+                    name=f"Bench Guest {number}",
+                    reservation_date=slot,
+                    guest_count=2,
+                    strategy=strategy,
+                )
+            assert response["success"], response["message"]
+            counts.append(counter.count)
+        print(f"{strategy:<18} {min(counts):>4} {max(counts):>4} {sum(counts) / len(counts):>6.2f}")
+
+        if strategy == "single_statement" and max(counts) != 1:
+            print(f"FAIL: single_statement used up to {max(counts)} statements per booking")
+            failed = True
+    reset(slot)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+Requests/sec of the production server (scripts/serve.py) from 1 to N worker processes.
+
+1. For each --workers count, starts the server and drives
+   GET /api/reservations/availability (Flask, on the worker's threads) and
+   POST /api/reservations (native async route) at --concurrency, printing
+   requests/sec, latency and the speedup over one worker.
+2. Repeats the availability run on the most workers with a --max-requests
+   budget, so workers are replaced one at a time during the run.
+3. Sends SIGTERM while bookings are in flight and checks that every booking
+   answered 201 is in the database and that none was committed without its
+   response reaching the client. Exits non-zero if either check fails.
+
+Client threads share the machine with the server, so leave cores free for
+them or run the load from another host for numbers close to production.
+
+Run from the backend directory against a disposable database:
+
+    python -m benchmarks.scaling --workers 1 --workers 2 --workers 4 --requests 4000
+"""
+import argparse
+import itertools
+import os
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import func, select
+from app.db.session import get_db
+from app.models import Customer, Reservation
+from benchmarks.async_vs_sync import EMAIL_DOMAIN, FIRST_DAY, SLOT_TIMES, TABLES_PER_SLOT, booking_requests, cleanup
+from benchmarks.loadgen import run_load, start_server, stop_server
+
+
+def server_command(workers: int, threads: int, port: int, max_requests: Optional[int] = None) -> List[str]:
+    command = ["scripts.serve", "--workers", str(workers), "--threads", str(threads),
+               "--port", str(port), "--log-level", "warning"]
+    if max_requests:
+        command += ["--max-requests", str(max_requests), "--max-requests-jitter", str(max_requests // 2)]
+    return command
+
+
+def print_row(label: str, endpoint: str, result: dict, baseline: Optional[float]) -> None:
+    speedup = f"{result['throughput'] / baseline:.2f}x" if baseline else ""
+    print(f"{label:<22} {endpoint:<13} {result['throughput']:>8.1f} {speedup:>8} "
+          f"{result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f}  {result['statuses']}")
+
+
+def booked(run: str) -> int:
+    """Reservations made by a benchmark run."""
+    with get_db() as db:
+        return db.execute(
+            select(func.count()).select_from(Reservation).join(Customer, Reservation.customer_id == Customer.id)
+            .where(Customer.email.like(f"{run}-%@{EMAIL_DOMAIN}"))
+        ).scalar_one()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, action="append",
+                        help="Worker processes, may be repeated (default: 1, 2, 4, ... up to the CPU count)")
+    parser.add_argument("--threads", type=int, default=10, help="Flask threads per worker")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per endpoint and worker count")
+    parser.add_argument("--concurrency", type=int, default=32, help="Client threads")
+    parser.add_argument("--max-requests", type=int, default=300, help="Worker request budget for the recycling run")
+    parser.add_argument("--drain-after", type=float, default=1.0, help="Seconds of bookings before SIGTERM")
+    parser.add_argument("--port", type=int, default=8095)
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    worker_counts = args.workers or [n for n in (1, 2, 4, 8, 16, 32) if n <= cpus] or [1]
+    # Every run books its own days so no server sees a slot another run filled
+    days_per_run = args.requests // (TABLES_PER_SLOT * len(SLOT_TIMES)) + 1
+    first_day = FIRST_DAY
+    availability = [("GET", f"/api/reservations/availability?from={date.today() + timedelta(days=7):%Y-%m-%d}", None)]
+    ok = True
+
+    cleanup()
+    print(f"{cpus} CPUs, {args.concurrency} client threads, {args.threads} threads per worker")
+    print(f"{'server':<22} {'endpoint':<13} {'req/s':>8} {'speedup':>8} {'p50 ms':>8} {'p99 ms':>8}  statuses")
+    baselines: Dict[str, float] = {}
+    try:
+        for workers in worker_counts:
+            server = start_server(server_command(workers, args.threads, args.port), args.port)
+            try:
+                label = f"{workers} workers"
+                result = run_load("127.0.0.1", args.port, availability * args.requests, args.concurrency)
+                print_row(label, "availability", result, baselines.get("availability"))
+                baselines.setdefault("availability", result["throughput"])
+                result = run_load("127.0.0.1", args.port,
+                                  itertools.islice(booking_requests(f"scale-{workers}", first_day), args.requests),
+                                  args.concurrency)
+                first_day += timedelta(days=days_per_run)
+                print_row(label, "booking", result, baselines.get("booking"))
+                baselines.setdefault("booking", result["throughput"])
+            finally:
+                stop_server(server)
+
+        workers = max(worker_counts)
+        server = start_server(server_command(workers, args.threads, args.port, args.max_requests), args.port)
+        try:
+            result = run_load("127.0.0.1", args.port, availability * args.requests, args.concurrency)
+            print_row(f"{workers} workers, recycled", "availability", result, baselines["availability"])
+        finally:
+            stop_server(server)
+
+        # Graceful shutdown with bookings in flight
+        run = "drain"
+        server = start_server(server_command(workers, args.threads, args.port), args.port)
+        results: List[dict] = []
+        load = threading.Thread(target=lambda: results.append(run_load(
+            "127.0.0.1", args.port, itertools.islice(booking_requests(run, first_day), args.requests), args.concurrency,
+        )))
+        load.start()
+        time.sleep(args.drain_after)
+        stopped = time.perf_counter()
+        stop_server(server)
+        print(f"\nSIGTERM after {args.drain_after:.1f}s of bookings; server exited in {time.perf_counter() - stopped:.2f}s")
+        load.join()
+        statuses = results[0]["statuses"]
+        acknowledged, rows = statuses.get("201", 0), booked(run)
+        failed = sum(count for status, count in statuses.items() if status.startswith("5"))
+        print(f"{acknowledged} bookings answered 201, {rows} in the database, {failed} answered 5xx, "
+              f"{statuses.get('0', 0)} refused after shutdown")
+        if rows != acknowledged or failed:
+            ok = False
+    finally:
+        cleanup()
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
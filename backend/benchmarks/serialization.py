@@ -0,0 +1,142 @@
+"""
+Response serialization benchmark: Flask's stdlib jsonify against the pydantic-core layer.
+
+Encodes these responses both ways:
+
+* a single booking confirmation, as returned by POST /api/reservations
+* a 31-day availability response, the largest GET /api/reservations/availability
+* --rows reservation rows from a column select, built into dicts by hand
+  (strftime per field) for jsonify and through row_dicts for the new layer;
+  this needs the database, but only runs a generate_series query
+
+Prints microseconds per response and the speedup, and exits non-zero if the
+two paths ever decode to different JSON.
+
+Run from the backend directory:
+
+    python -m benchmarks.serialization --rows 5000
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import date, timedelta
+from typing import Callable
+from flask import Flask, jsonify
+from sqlalchemy import text
+from app.core.serialization import init_json, row_dicts
+from app.crud.reservation import get_bookable_slots
+from app.db.session import get_db
+
+
+def confirmation() -> dict:
+    return {
+        "message": "Reservation confirmed",
+        "success": True,
+        "data": {
+            "email": "guest@example.com",
+            "name": "Bench Guest",
+            "phone": "202-555-0100",
+            "table_number": 7,
+            "tables": [7],
+            "date": "2099-01-05",
+            "time": "19:00",
+            "duration_minutes": 90,
+            "guest_count": 2,
+        },
+    }
+
+
+def availability() -> dict:
+    start = date(2099, 1, 1)
+    end = start + timedelta(days=30)
+    slots = [
+        {"date": slot.strftime("%Y-%m-%d"), "time": slot.strftime("%H:%M"), "free_tables": n % 30}
+        for n, slot in enumerate(get_bookable_slots(start, end))
+    ]
+    return {"success": True, "data": {"from": start.isoformat(), "to": end.isoformat(), "slots": slots}}
+
+
+def column_rows(count: int) -> list:
+    """Rows shaped like ``select(Reservation.id, ...)``, generated by Postgres."""
+    with get_db() as db:
+        return db.execute(text("""
+            SELECT n + 1 AS id, n % 500 + 1 AS customer_id,
+                   timestamp '2099-01-01 17:00' + (n % 10) * interval '30 minutes' + (n / 300) * interval '1 day'
+                       AS reservation_date,
+                   n % 6 + 1 AS guest_count, n % 30 + 1 AS table_number, 90 AS duration_minutes,
+                   'confirmed' AS status, timestamp '2099-01-01 12:00:00.123456' AS created_at,
+                   NULL::integer AS parent_id
+            FROM generate_series(0, :count - 1) AS n
+        """), {"count": count}).all()
+
+
+def rows_by_hand(rows) -> dict:
+    """The way endpoints build responses today: a dict per row, dates formatted in Python."""
+    return {"success": True, "data": [
+        {
+            "id": row.id,
+            "customer_id": row.customer_id,
+            "reservation_date": row.reservation_date.strftime("%Y-%m-%dT%H:%M:%S"),
+            "guest_count": row.guest_count,
+            "table_number": row.table_number,
+            "duration_minutes": row.duration_minutes,
+            "status": row.status,
+            "created_at": row.created_at.isoformat(),
+            "parent_id": row.parent_id,
+        }
+        for row in rows
+    ]}
+
+
+def per_call(encode: Callable[[], bytes], seconds: float) -> float:
+    """Microseconds per call, repeating for about ``seconds``."""
+    calls, started = 0, time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        encode()
+        calls += 1
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000, help="Reservation rows in the list response")
+    parser.add_argument("--seconds", type=float, default=2.0, help="Time spent per measurement")
+    args = parser.parse_args()
+
+    stdlib_app = Flask("stdlib")
+    fast_app = Flask("fast")
+    init_json(fast_app)
+
+    columns = column_rows(args.rows)
+    cases = [
+        ("confirmation", confirmation, confirmation),
+        ("availability 31d", availability, availability),
+        (f"{args.rows} col rows", lambda: rows_by_hand(columns),
+         lambda: {"success": True, "data": row_dicts(columns)}),
+    ]
+    ok = True
+    print(f"{'response':<18} {'bytes':>9} {'jsonify us':>11} {'pydantic us':>12} {'speedup':>8}")
+    for name, build_stdlib, build_fast in cases:
+        # Payloads that do not depend on rows are built once, like a cached response
+        stdlib_body, fast_body = (build_stdlib(), build_fast()) if "rows" not in name else (None, None)
+
+        def stdlib() -> bytes:
+            with stdlib_app.app_context():
+                return jsonify(stdlib_body if stdlib_body is not None else build_stdlib()).get_data()
+
+        def fast() -> bytes:
+            with fast_app.app_context():
+                return jsonify(fast_body if fast_body is not None else build_fast()).get_data()
+
+        if json.loads(stdlib()) != json.loads(fast()):
+            print(f"{name}: the two paths encode different JSON")
+            ok = False
+        stdlib_us, fast_us = per_call(stdlib, args.seconds), per_call(fast, args.seconds)
+        print(f"{name:<18} {len(fast()):>9} {stdlib_us:>11.1f} {fast_us:>12.1f} {stdlib_us / fast_us:>7.1f}x")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Serve the app under uvicorn with a SQL statement counter, for benchmarks.e2e.
+
+Counts every statement sent on the sync and async engines and answers
+GET /__bench__/stats with {"statements": n}. Started from the backend directory
+by benchmarks.loadgen.start_server:
+
+    python -m benchmarks.server --stack sync --port 8090
+"""
+import argparse
+import json
+import threading
+import uvicorn
+from sqlalchemy import event
+from app.db.session import async_engine, engine
+
+STATS_PATH = "/__bench__/stats"
+
+
+class StatementCounter:
+    """Thread-safe count of statements sent on the engines it listens to."""
+
+    def __init__(self, *engines):
+        self.count = 0
+        self._lock = threading.Lock()
+        for target in engines:
+            event.listen(target, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        with self._lock:
+            self.count += 1
+
+
+def with_stats(app, counter: StatementCounter):
+    """Wrap an ASGI app so STATS_PATH reports the counter."""
+    async def wrapped(scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["path"] != STATS_PATH:
+            await app(scope, receive, send)
+            return
+        body = json.dumps({"statements": counter.count}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+    return wrapped
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stack", choices=["sync", "async"], default="sync")
+    parser.add_argument("--port", type=int, default=8090)
+    args = parser.parse_args()
+
+    if args.stack == "async":
+        from app.asgi import app
+    else:
+        from uvicorn.middleware.wsgi import WSGIMiddleware
+        from app.main import app as flask_app
+        app = WSGIMiddleware(flask_app)
+
+    counter = StatementCounter(engine, async_engine.sync_engine)
+    uvicorn.run(with_stats(app, counter), host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
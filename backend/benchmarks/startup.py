@@ -0,0 +1,152 @@
+"""
+Startup benchmark: how long a fresh worker takes before it can serve.
+
+Each measurement runs in a new interpreter, --repeats times, reporting medians:
+
+1. ``python -X importtime -c "import app.main"``, with the import time spent
+   in each top-level package it pulls in, so whatever makes importing slow
+   again shows up by name.
+2. ``create_app()`` with and without warm_up, in wall-clock milliseconds.
+3. The first and second GET /api/reservations/availability on a cold app
+   against one that was warmed up before its first request.
+
+Then checks fork safety: a worker forked after the parent opened its pool must
+talk to Postgres over its own connection, never one the parent holds. Exits
+non-zero if it does not.
+
+Run from the backend directory against a migrated database:
+
+    python -m benchmarks.startup --repeats 5
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# "import time:       412 |       1853 |   flask" - the name is indented two spaces per nesting level
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| *(\S+)")
+
+# Times create_app, then two availability requests through the test client
+_FIRST_REQUEST_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+from app.main import create_app
+app = create_app(warmup={warmup})
+ready = time.perf_counter()
+client = app.test_client()
+requests = []
+for _ in range(2):
+    sent = time.perf_counter()
+    response = client.get("/api/reservations/availability")
+    assert response.status_code == 200, response.status_code
+    requests.append(time.perf_counter() - sent)
+print(json.dumps({{"create_app": ready - started, "first": requests[0], "second": requests[1]}}))
+"""
+
+# Forks after the parent's pool is open; the child reports the backend it reached
+_FORK_SCRIPT = """
+import json, os
+from sqlalchemy import text
+from app.db.session import get_db, warm_pool
+
+def backend_pid():
+    with get_db() as db:
+        return db.execute(text("SELECT pg_backend_pid()")).scalar()
+
+warm_pool()
+parent = backend_pid()
+read_end, write_end = os.pipe()
+if os.fork() == 0:
+    os.write(write_end, str(backend_pid()).encode())
+    os._exit(0)
+os.wait()
+child = int(os.read(read_end, 32))
+print(json.dumps({"parent": parent, "child": child, "parent_after": backend_pid()}))
+"""
+
+
+def run_python(*args: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=str(BACKEND_DIR))
+    return subprocess.run([sys.executable, *args], cwd=BACKEND_DIR, env=env,
+                          capture_output=True, text=True, check=True)
+
+
+def import_times() -> Tuple[float, Dict[str, float]]:
+    """
+    Import app.main in a fresh interpreter under -X importtime.
+
+    Returns:
+        The cumulative milliseconds for app.main, and the milliseconds spent
+        importing the modules of each top-level package
+    """
+    stderr = run_python("-X", "importtime", "-c", "import app.main").stderr
+    total = 0.0
+    packages: Dict[str, float] = defaultdict(float)
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative, name = match.groups()
+        if name == "app.main":
+            total = int(cumulative) / 1000
+        # Self times, so a module is not counted again under the modules that import it
+        packages[name.split(".")[0]] += int(self_us) / 1000
+    return total, packages
+
+
+def first_requests(warmup: bool) -> Dict[str, float]:
+    """Seconds to create the app and serve its first two availability requests."""
+    stdout = run_python("-c", _FIRST_REQUEST_SCRIPT.format(warmup=warmup)).stdout
+    return json.loads(stdout.splitlines()[-1])
+
+
+def median_ms(values: List[float]) -> float:
+    return statistics.median(values) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=10, help="Slowest top-level packages to list")
+    args = parser.parse_args()
+
+    totals: List[float] = []
+    packages: Dict[str, List[float]] = defaultdict(list)
+    for _ in range(args.repeats):
+        total, per_package = import_times()
+        totals.append(total)
+        for name, cumulative in per_package.items():
+            packages[name].append(cumulative)
+    print(f"import app.main: {statistics.median(totals):.0f} ms cumulative")
+    slowest = sorted(packages.items(), key=lambda item: statistics.median(item[1]), reverse=True)
+    for name, cumulative in slowest[:args.top]:
+        print(f"  {name:<24} {statistics.median(cumulative):>7.1f} ms")
+    # Nothing that needs the database or asyncpg should load at import
+    loaded = run_python("-c", "import sys, app.main; print(' '.join(sorted(sys.modules)))").stdout.split()
+    eager = [name for name in ("asyncpg", "psycopg2", "app.models", "app.db.session") if name in loaded]
+    print(f"Loaded by the import alone: {', '.join(eager) or 'none of asyncpg, psycopg2, app.models, app.db.session'}")
+
+    print(f"\n{'app':<10} {'create_app ms':>14} {'1st request ms':>15} {'2nd request ms':>15}")
+    for warmup in (False, True):
+        runs = [first_requests(warmup) for _ in range(args.repeats)]
+        print(f"{'warm' if warmup else 'cold':<10} {median_ms([r['create_app'] for r in runs]):>14.0f} "
+              f"{median_ms([r['first'] for r in runs]):>15.1f} {median_ms([r['second'] for r in runs]):>15.1f}")
+
+    pids = json.loads(run_python("-c", _FORK_SCRIPT).stdout.splitlines()[-1])
+    shared = pids["child"] in (pids["parent"], pids["parent_after"])
+    print(f"\nFork: parent on backend {pids['parent']} before and {pids['parent_after']} after, "
+          f"child on {pids['child']}: {'SHARED' if shared else 'separate connections'}")
+    if shared or eager:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
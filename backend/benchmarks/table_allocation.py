@@ -0,0 +1,114 @@
+"""
+In-memory benchmark of the capacity-aware table allocator.
+
+Replays a night of walk-in demand against the dining room layout (see
+app/core/tables.py) with a few allocation policies, without a database:
+
+    best_fit   TableInventory.best_fit, the allocator used for bookings
+    first_fit  the lowest numbered free single table that seats the party
+    random     any free single table that seats the party, like the old allocator
+               once it had to respect capacities
+
+Reports parties seated, guests turned away, seat utilization of the tables
+used, and the time per allocation decision. Fails if best_fit takes 1 ms or
+more per booking.
+
+Run from the backend directory:
+
+    python -m benchmarks.table_allocation --nights 200 --slots 12
+"""
+import argparse
+import random
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from app.core.tables import TableInventory, get_table_inventory
+
+# Party size distribution of a typical evening, size -> weight
+PARTY_SIZES = {1: 4, 2: 40, 3: 12, 4: 22, 5: 7, 6: 7, 7: 3, 8: 3, 10: 1, 12: 1}
+# Allocation budget per booking
+MAX_MS_PER_BOOKING = 1.0
+
+Policy = Callable[[int, int], Optional[Tuple[int, ...]]]
+
+
+def policies(inventory: TableInventory) -> Dict[str, Policy]:
+    tables = sorted(inventory.capacities)
+
+    def first_fit(occupied: int, guest_count: int) -> Optional[Tuple[int, ...]]:
+        for n in tables:
+            if inventory.capacities[n] >= guest_count and not occupied & inventory.mask((n,)):
+                return (n,)
+        return None
+
+    def random_table(occupied: int, guest_count: int) -> Optional[Tuple[int, ...]]:
+        free = [n for n in tables
+                if inventory.capacities[n] >= guest_count and not occupied & inventory.mask((n,))]
+        return (random.choice(free),) if free else None
+
+    return {"best_fit": inventory.best_fit, "first_fit": first_fit, "random": random_table}
+
+
+def demand(parties: int, rng: random.Random) -> List[int]:
+    sizes, weights = zip(*PARTY_SIZES.items())
+    return rng.choices(sizes, weights=weights, k=parties)
+
+
+def replay(inventory: TableInventory, policy: Policy, nights: List[List[List[int]]]) -> dict:
+    """Seat every party of every slot in arrival order and total the outcome."""
+    seated = turned_away = guests_away = seats_used = guests_seated = decisions = 0
+    elapsed = 0.0
+    for night in nights:
+        for slot in night:
+            occupied = 0
+            for guest_count in slot:
+                started = time.perf_counter()
+                tables = policy(occupied, guest_count)
+                elapsed += time.perf_counter() - started
+                decisions += 1
+                if tables is None:
+                    turned_away += 1
+                    guests_away += guest_count
+                    continue
+                occupied |= inventory.mask(tables)
+                seated += 1
+                guests_seated += guest_count
+                seats_used += inventory.seats(tables)
+    return {
+        "seated": seated,
+        "turned_away": turned_away,
+        "guests_away": guests_away,
+        "utilization": guests_seated / seats_used if seats_used else 0.0,
+        "ms_per_booking": elapsed / decisions * 1000 if decisions else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nights", type=int, default=200)
+    parser.add_argument("--slots", type=int, default=12, help="Reservation slots per night")
+    parser.add_argument("--parties", type=int, default=28, help="Parties asking for each slot")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    nights = [[demand(args.parties, rng) for _ in range(args.slots)] for _ in range(args.nights)]
+    total_parties = args.nights * args.slots * args.parties
+    inventory = get_table_inventory()
+
+    print(f"{inventory.table_count} tables, {inventory.seats(inventory.capacities)} seats, "
+          f"{total_parties} parties")
+    print(f"{'policy':<10} {'seated':>8} {'turned away':>12} {'guests away':>12} {'utilization':>12} {'ms/booking':>11}")
+    results = {}
+    for name, policy in policies(inventory).items():
+        result = results[name] = replay(inventory, policy, nights)
+        print(f"{name:<10} {result['seated']:>8} {result['turned_away']:>12} {result['guests_away']:>12} "
+              f"{result['utilization']:>12.1%} {result['ms_per_booking']:>11.4f}")
+
+    if results["best_fit"]["ms_per_booking"] >= MAX_MS_PER_BOOKING:
+        print(f"best_fit takes {MAX_MS_PER_BOOKING} ms or more per booking")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
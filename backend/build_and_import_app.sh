@@ -39,4 +39,12 @@ rm -rf "$BACKEND_STATIC_DIR"/*
 echo "📋 Copying frontend build to backend..."
 cp -r dist/* "$BACKEND_STATIC_DIR/"
 
+# Resize and re-encode images; unchanged images are reused from backend/.cache
+echo "🖼️  Generating responsive image variants..."
+python "$BACKEND_DIR/scripts/optimize_images.py" --static-dir "$BACKEND_STATIC_DIR"
+
+# Pre-compress text assets so the backend can send them gzip/brotli encoded
+echo "🗜️  Pre-compressing static assets..."
+python "$BACKEND_DIR/scripts/precompress_static.py" --static-dir "$BACKEND_STATIC_DIR"
+
 echo "✅ Build and copy process completed!"
\ No newline at end of file
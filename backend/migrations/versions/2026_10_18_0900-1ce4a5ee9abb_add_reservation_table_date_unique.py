@@ -0,0 +1,69 @@
+"""Add reservation table/date unique index
+
+Revision ID: 1ce4a5ee9abb
+Revises: daf7db4beeec
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1ce4a5ee9abb'
+down_revision: Union[str, None] = 'daf7db4beeec'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Conflicting rows listed when the constraint cannot be added
+MAX_REPORTED_CONFLICTS = 20
+
+
+def check_duplicate_bookings() -> None:
+    """Abort with the bookings that share a table and time, which the index would reject."""
+    if op.get_context().as_sql:
+        return
+    duplicates = op.get_bind().execute(sa.text("""
+        SELECT table_number, reservation_date, array_agg(id ORDER BY id) AS ids
+        FROM reservations
+        WHERE status <> 'cancelled'
+        GROUP BY table_number, reservation_date
+        HAVING count(*) > 1
+        ORDER BY reservation_date, table_number
+    """)).all()
+    if not duplicates:
+        return
+    lines = [f"  table {row.table_number} at {row.reservation_date:%Y-%m-%d %H:%M}: reservations "
+             + ", ".join(str(n) for n in row.ids) for row in duplicates[:MAX_REPORTED_CONFLICTS]]
+    if len(duplicates) > MAX_REPORTED_CONFLICTS:
+        lines.append(f"  ... and {len(duplicates) - MAX_REPORTED_CONFLICTS} more")
+    # Which of two bookings for one table keeps it is not ours to decide
+    raise RuntimeError(
+        f"{len(duplicates)} table/time pairs hold more than one active booking, so "
+        "uix_reservation_table_date cannot be added. Move or delete all but one "
+        "active reservation of each and run the migration again:\n" + "\n".join(lines)
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    check_duplicate_bookings()
+    # Declared on the Reservation model but missing from the initial migration.
+    # Table allocation relies on it to detect two bookings racing for one table.
+    # A unique index rather than a constraint, since a constraint cannot be
+    # partial: a cancelled booking must not keep its table and time taken.
+    op.create_index(
+        'uix_reservation_table_date',
+        'reservations',
+        ['table_number', 'reservation_date'],
+        unique=True,
+        postgresql_where=sa.text("status <> 'cancelled'")
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uix_reservation_table_date', table_name='reservations')
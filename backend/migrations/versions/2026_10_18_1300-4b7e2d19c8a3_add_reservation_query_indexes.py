@@ -0,0 +1,62 @@
+"""Add reservation query indexes
+
+Revision ID: 4b7e2d19c8a3
+Revises: 1ce4a5ee9abb
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b7e2d19c8a3'
+down_revision: Union[str, None] = '1ce4a5ee9abb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Slot occupancy and availability: reservation_date equality or range, filtered by status
+    op.create_index(
+        'ix_reservation_date_status',
+        'reservations',
+        ['reservation_date', 'status']
+    )
+    # Duplicate booking check: one customer's reservations at a given time
+    op.create_index(
+        'ix_reservation_customer_date',
+        'reservations',
+        ['customer_id', 'reservation_date']
+    )
+    # Only confirmed bookings hold a table, so a cancelled booking no longer
+    # blocks its table for that slot. Leading with the date also lets the
+    # free-table lookup read a slot's confirmed tables from the index alone.
+    op.create_index(
+        'uix_reservation_confirmed_table_date',
+        'reservations',
+        ['reservation_date', 'table_number'],
+        unique=True,
+        postgresql_where=sa.text("status = 'confirmed'")
+    )
+    # Databases upgraded before 1ce4a5ee9abb made it a partial index still have
+    # it as a constraint; drop whichever of the two is there
+    op.execute("ALTER TABLE reservations DROP CONSTRAINT IF EXISTS uix_reservation_table_date")
+    op.execute("DROP INDEX IF EXISTS uix_reservation_table_date")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(
+        'uix_reservation_table_date',
+        'reservations',
+        ['table_number', 'reservation_date'],
+        unique=True,
+        postgresql_where=sa.text("status <> 'cancelled'")
+    )
+    op.drop_index('uix_reservation_confirmed_table_date', table_name='reservations')
+    op.drop_index('ix_reservation_customer_date', table_name='reservations')
+    op.drop_index('ix_reservation_date_status', table_name='reservations')
@@ -0,0 +1,43 @@
+"""Add reservation parent for combined tables
+
+Revision ID: 8e3f5a72b1d4
+Revises: 4b7e2d19c8a3
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e3f5a72b1d4'
+down_revision: Union[str, None] = '4b7e2d19c8a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A party seated at combined tables gets one reservation per table; the
+    # extra tables point at the reservation holding the guest count
+    op.add_column('reservations', sa.Column('parent_id', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'fk_reservation_parent',
+        'reservations', 'reservations',
+        ['parent_id'], ['id']
+    )
+    op.create_index(
+        'ix_reservation_parent',
+        'reservations',
+        ['parent_id'],
+        postgresql_where=sa.text('parent_id IS NOT NULL')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_reservation_parent', table_name='reservations')
+    op.drop_constraint('fk_reservation_parent', 'reservations', type_='foreignkey')
+    op.drop_column('reservations', 'parent_id')
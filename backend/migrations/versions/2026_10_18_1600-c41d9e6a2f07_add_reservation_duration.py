@@ -0,0 +1,89 @@
+"""Add reservation duration and seating overlap constraint
+
+Revision ID: c41d9e6a2f07
+Revises: 8e3f5a72b1d4
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41d9e6a2f07'
+down_revision: Union[str, None] = '8e3f5a72b1d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Conflicting rows listed when the constraint cannot be added
+MAX_REPORTED_CONFLICTS = 20
+
+
+def check_overlapping_seatings() -> None:
+    """Abort with the confirmed bookings whose 30 minute seatings overlap on one table."""
+    if op.get_context().as_sql:
+        return
+    # Bookings on the half hour never overlap; ones made at other times can
+    overlaps = op.get_bind().execute(sa.text("""
+        SELECT a.table_number, a.reservation_date AS first_date, a.id AS first_id,
+               b.reservation_date AS second_date, b.id AS second_id
+        FROM reservations a
+        JOIN reservations b
+          ON b.table_number = a.table_number
+         AND b.id > a.id
+         AND b.reservation_date < a.reservation_date + interval '30 minutes'
+         AND a.reservation_date < b.reservation_date + interval '30 minutes'
+        WHERE a.status = 'confirmed' AND b.status = 'confirmed'
+        ORDER BY a.reservation_date, a.table_number
+    """)).all()
+    if not overlaps:
+        return
+    lines = [f"  table {row.table_number}: reservation {row.first_id} at {row.first_date:%Y-%m-%d %H:%M} "
+             f"and {row.second_id} at {row.second_date:%Y-%m-%d %H:%M}" for row in overlaps[:MAX_REPORTED_CONFLICTS]]
+    if len(overlaps) > MAX_REPORTED_CONFLICTS:
+        lines.append(f"  ... and {len(overlaps) - MAX_REPORTED_CONFLICTS} more")
+    raise RuntimeError(
+        f"{len(overlaps)} pairs of confirmed reservations hold the same table at overlapping "
+        "times, so excl_reservation_table_seating cannot be added. Move or cancel one of "
+        "each pair and run the migration again:\n" + "\n".join(lines)
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    check_overlapping_seatings()
+    # Existing bookings were made when a table was only held for its 30 minute
+    # slot, so they keep that length; new bookings default to 90 minutes
+    op.add_column('reservations', sa.Column('duration_minutes', sa.Integer(), nullable=False, server_default='30'))
+    op.alter_column('reservations', 'duration_minutes', server_default='90')
+    op.add_column('reservations', sa.Column(
+        'seating',
+        postgresql.TSRANGE(),
+        sa.Computed("tsrange(reservation_date, reservation_date + make_interval(mins => duration_minutes))"),
+    ))
+    # A table's confirmed seatings must not overlap. Wrapping the table number
+    # in a range lets the GiST index compare it without the btree_gist extension.
+    op.execute("""
+        ALTER TABLE reservations ADD CONSTRAINT excl_reservation_table_seating
+        EXCLUDE USING gist (int4range(table_number, table_number, '[]') WITH =, seating WITH &&)
+        WHERE (status = 'confirmed')
+    """)
+    op.drop_index('uix_reservation_confirmed_table_date', table_name='reservations')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(
+        'uix_reservation_confirmed_table_date',
+        'reservations',
+        ['reservation_date', 'table_number'],
+        unique=True,
+        postgresql_where=sa.text("status = 'confirmed'")
+    )
+    op.drop_constraint('excl_reservation_table_seating', 'reservations')
+    op.drop_column('reservations', 'seating')
+    op.drop_column('reservations', 'duration_minutes')
@@ -0,0 +1,29 @@
+"""Add reservation listing index
+
+Revision ID: a6c3d8e2f5b1
+Revises: 9b47e1f3c6d2
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6c3d8e2f5b1'
+down_revision: Union[str, None] = '9b47e1f3c6d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # GET /api/reservations pages in (reservation_date, id) order and starts each
+    # page right after the previous one's last row
+    op.create_index('ix_reservation_date_id', 'reservations', ['reservation_date', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_reservation_date_id', table_name='reservations')
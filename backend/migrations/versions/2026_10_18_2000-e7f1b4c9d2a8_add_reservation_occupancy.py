@@ -0,0 +1,117 @@
+"""Add reservation occupancy summary
+
+Revision ID: e7f1b4c9d2a8
+Revises: a6c3d8e2f5b1
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7f1b4c9d2a8'
+down_revision: Union[str, None] = 'a6c3d8e2f5b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'reservation_occupancy',
+        sa.Column('slot', sa.DateTime(), nullable=False),
+        sa.Column('bookings', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('guests', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('tables_held', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('slot'),
+    )
+    # What one reservation adds to the summary: its party and guests in the slot
+    # it starts in, and one held table in every 30 minute slot its seating touches.
+    # The trigger and the rebuild both go through this function, so they agree.
+    op.execute("""
+        CREATE FUNCTION reservation_occupancy_rows(start_at timestamp, held_minutes integer,
+                                                   is_party boolean, party_guests integer)
+        RETURNS TABLE (slot timestamp, bookings integer, guests integer, tables_held integer)
+        LANGUAGE sql IMMUTABLE AS $$
+            SELECT s,
+                   CASE WHEN s = first_slot AND is_party THEN 1 ELSE 0 END,
+                   CASE WHEN s = first_slot THEN party_guests ELSE 0 END,
+                   1
+            FROM date_bin(interval '30 minutes', start_at, timestamp '2000-01-01') AS first_slot,
+                 generate_series(first_slot,
+                                 start_at + make_interval(mins => held_minutes) - interval '1 microsecond',
+                                 interval '30 minutes') AS s
+        $$
+    """)
+    # Statement-level triggers apply one aggregated change per statement, so a
+    # bulk insert or delete touches each slot once instead of once per row.
+    # Cancelled reservations hold nothing. Slots are upserted in order, so
+    # concurrent bookings lock summary rows in the same order and cannot deadlock.
+    changes = {
+        'INSERT': "SELECT *, 1 AS sign FROM new_rows",
+        'DELETE': "SELECT *, -1 AS sign FROM old_rows",
+        'UPDATE': "SELECT *, -1 AS sign FROM old_rows UNION ALL SELECT *, 1 AS sign FROM new_rows",
+    }
+    apply = """
+            INSERT INTO reservation_occupancy AS o (slot, bookings, guests, tables_held)
+            SELECT d.slot, sum(r.sign * d.bookings), sum(r.sign * d.guests), sum(r.sign * d.tables_held)
+            FROM ({changes}) AS r
+            CROSS JOIN LATERAL reservation_occupancy_rows(r.reservation_date, r.duration_minutes,
+                                                          r.parent_id IS NULL, r.guest_count) d
+            WHERE r.status IS DISTINCT FROM 'cancelled'
+            GROUP BY d.slot
+            HAVING sum(r.sign * d.bookings) <> 0 OR sum(r.sign * d.guests) <> 0 OR sum(r.sign * d.tables_held) <> 0
+            ORDER BY d.slot
+            ON CONFLICT (slot) DO UPDATE
+            SET bookings = o.bookings + excluded.bookings,
+                guests = o.guests + excluded.guests,
+                tables_held = o.tables_held + excluded.tables_held;"""
+    # Slots no reservation holds any more are dropped
+    prune = """
+            DELETE FROM reservation_occupancy o
+            USING old_rows r
+            CROSS JOIN LATERAL reservation_occupancy_rows(r.reservation_date, r.duration_minutes,
+                                                          r.parent_id IS NULL, r.guest_count) d
+            WHERE o.slot = d.slot AND o.tables_held = 0;"""
+    op.execute(f"""
+        CREATE FUNCTION reservation_occupancy_apply() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN{apply.format(changes=changes['INSERT'])}
+            ELSIF TG_OP = 'DELETE' THEN{apply.format(changes=changes['DELETE'])}{prune}
+            ELSE{apply.format(changes=changes['UPDATE'])}{prune}
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    """)
+    for event, tables in (('INSERT', 'NEW TABLE AS new_rows'),
+                          ('DELETE', 'OLD TABLE AS old_rows'),
+                          ('UPDATE', 'OLD TABLE AS old_rows NEW TABLE AS new_rows')):
+        op.execute(f"""
+            CREATE TRIGGER trg_reservation_occupancy_{event.lower()}
+            AFTER {event} ON reservations
+            REFERENCING {tables}
+            FOR EACH STATEMENT EXECUTE FUNCTION reservation_occupancy_apply()
+        """)
+    # Summarize the existing bookings
+    op.execute("""
+        INSERT INTO reservation_occupancy (slot, bookings, guests, tables_held)
+        SELECT d.slot, sum(d.bookings), sum(d.guests), sum(d.tables_held)
+        FROM reservations r
+        CROSS JOIN LATERAL reservation_occupancy_rows(r.reservation_date, r.duration_minutes,
+                                                      r.parent_id IS NULL, r.guest_count) d
+        WHERE r.status IS DISTINCT FROM 'cancelled'
+        GROUP BY d.slot
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for event in ('insert', 'delete', 'update'):
+        op.execute(f"DROP TRIGGER trg_reservation_occupancy_{event} ON reservations")
+    op.execute("DROP FUNCTION reservation_occupancy_apply()")
+    op.execute("DROP FUNCTION reservation_occupancy_rows(timestamp, integer, boolean, integer)")
+    op.drop_table('reservation_occupancy')
@@ -0,0 +1,139 @@
+"""Key reservation occupancy by table
+
+Revision ID: b3d9f0a7e215
+Revises: e7f1b4c9d2a8
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3d9f0a7e215'
+down_revision: Union[str, None] = 'e7f1b4c9d2a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CHANGES = {
+    'INSERT': "SELECT *, 1 AS sign FROM new_rows",
+    'DELETE': "SELECT *, -1 AS sign FROM old_rows",
+    'UPDATE': "SELECT *, -1 AS sign FROM old_rows UNION ALL SELECT *, 1 AS sign FROM new_rows",
+}
+
+# As in e7f1b4c9d2a8, with a summary row per slot and table. The upsert returns
+# the rows it left holding nothing, and only those are deleted, by key:
+# joining the old rows to the summary again is quadratic on a bulk delete.
+APPLY = """
+            WITH applied AS (
+                INSERT INTO reservation_occupancy AS o (slot, table_number, bookings, guests, tables_held)
+                SELECT d.slot, r.table_number,
+                       sum(r.sign * d.bookings), sum(r.sign * d.guests), sum(r.sign * d.tables_held)
+                FROM ({changes}) AS r
+                CROSS JOIN LATERAL reservation_occupancy_rows(r.reservation_date, r.duration_minutes,
+                                                              r.parent_id IS NULL, r.guest_count) d
+                WHERE r.status IS DISTINCT FROM 'cancelled'
+                GROUP BY d.slot, r.table_number
+                HAVING sum(r.sign * d.bookings) <> 0 OR sum(r.sign * d.guests) <> 0
+                    OR sum(r.sign * d.tables_held) <> 0
+                ORDER BY d.slot, r.table_number
+                ON CONFLICT (slot, table_number) DO UPDATE
+                SET bookings = o.bookings + excluded.bookings,
+                    guests = o.guests + excluded.guests,
+                    tables_held = o.tables_held + excluded.tables_held
+                RETURNING o.slot, o.table_number, o.tables_held
+            )
+            SELECT array_agg(slot), array_agg(table_number) INTO empty_slots, empty_tables
+            FROM applied WHERE tables_held = 0;"""
+PRUNE = """
+            DELETE FROM reservation_occupancy o
+            USING unnest(empty_slots, empty_tables) AS e(slot, table_number)
+            WHERE o.slot = e.slot AND o.table_number = e.table_number AND o.tables_held = 0;"""
+APPLY_FUNCTION = f"""
+    CREATE OR REPLACE FUNCTION reservation_occupancy_apply() RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        empty_slots timestamp[];
+        empty_tables integer[];
+    BEGIN
+        IF TG_OP = 'INSERT' THEN{APPLY.format(changes=CHANGES['INSERT'])}
+        ELSIF TG_OP = 'DELETE' THEN{APPLY.format(changes=CHANGES['DELETE'])}{PRUNE}
+        ELSE{APPLY.format(changes=CHANGES['UPDATE'])}{PRUNE}
+        END IF;
+        RETURN NULL;
+    END
+    $$
+"""
+
+# The e7f1b4c9d2a8 function, summarizing per slot
+SLOT_APPLY = """
+            INSERT INTO reservation_occupancy AS o (slot, bookings, guests, tables_held)
+            SELECT d.slot, sum(r.sign * d.bookings), sum(r.sign * d.guests), sum(r.sign * d.tables_held)
+            FROM ({changes}) AS r
+            CROSS JOIN LATERAL reservation_occupancy_rows(r.reservation_date, r.duration_minutes,
+                                                          r.parent_id IS NULL, r.guest_count) d
+            WHERE r.status IS DISTINCT FROM 'cancelled'
+            GROUP BY d.slot
+            HAVING sum(r.sign * d.bookings) <> 0 OR sum(r.sign * d.guests) <> 0 OR sum(r.sign * d.tables_held) <> 0
+            ORDER BY d.slot
+            ON CONFLICT (slot) DO UPDATE
+            SET bookings = o.bookings + excluded.bookings,
+                guests = o.guests + excluded.guests,
+                tables_held = o.tables_held + excluded.tables_held;"""
+SLOT_PRUNE = """
+            DELETE FROM reservation_occupancy o
+            USING old_rows r
+            CROSS JOIN LATERAL reservation_occupancy_rows(r.reservation_date, r.duration_minutes,
+                                                          r.parent_id IS NULL, r.guest_count) d
+            WHERE o.slot = d.slot AND o.tables_held = 0;"""
+SLOT_APPLY_FUNCTION = f"""
+    CREATE OR REPLACE FUNCTION reservation_occupancy_apply() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN{SLOT_APPLY.format(changes=CHANGES['INSERT'])}
+        ELSIF TG_OP = 'DELETE' THEN{SLOT_APPLY.format(changes=CHANGES['DELETE'])}{SLOT_PRUNE}
+        ELSE{SLOT_APPLY.format(changes=CHANGES['UPDATE'])}{SLOT_PRUNE}
+        END IF;
+        RETURN NULL;
+    END
+    $$
+"""
+
+
+def summarize(keys: str) -> str:
+    """Refill the summary from the reservations, grouped by ``keys``."""
+    return f"""
+        INSERT INTO reservation_occupancy ({keys.replace('d.', '').replace('r.', '')}, bookings, guests, tables_held)
+        SELECT {keys}, sum(d.bookings), sum(d.guests), sum(d.tables_held)
+        FROM reservations r
+        CROSS JOIN LATERAL reservation_occupancy_rows(r.reservation_date, r.duration_minutes,
+                                                      r.parent_id IS NULL, r.guest_count) d
+        WHERE r.status IS DISTINCT FROM 'cancelled'
+        GROUP BY {keys}
+    """
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # With one summary row per slot, every booking of a slot waited for the one
+    # before it to commit, whose trigger held the row lock until then. The tables
+    # of a slot are booked by different transactions, so a row per slot and table
+    # is only contended by bookings that conflict anyway.
+    op.execute("LOCK TABLE reservations IN SHARE MODE")
+    op.execute("DELETE FROM reservation_occupancy")
+    op.add_column('reservation_occupancy', sa.Column('table_number', sa.Integer(), nullable=False))
+    op.drop_constraint('reservation_occupancy_pkey', 'reservation_occupancy', type_='primary')
+    op.create_primary_key('reservation_occupancy_pkey', 'reservation_occupancy', ['slot', 'table_number'])
+    op.execute(APPLY_FUNCTION)
+    op.execute(summarize('d.slot, r.table_number'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("LOCK TABLE reservations IN SHARE MODE")
+    op.execute("DELETE FROM reservation_occupancy")
+    op.drop_constraint('reservation_occupancy_pkey', 'reservation_occupancy', type_='primary')
+    op.drop_column('reservation_occupancy', 'table_number')
+    op.create_primary_key('reservation_occupancy_pkey', 'reservation_occupancy', ['slot'])
+    op.execute(SLOT_APPLY_FUNCTION)
+    op.execute(summarize('d.slot'))
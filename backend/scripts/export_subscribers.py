@@ -0,0 +1,24 @@
+#!/usr/bin/env python
+import argparse
+import sys
+
+from app.db.session import get_db
+from app.crud.newsletter import EXPORT_FORMATS, export_active_subscribers
+
+def export_subscribers(export_format: str, output) -> None:
+    """Stream every active newsletter subscriber to a file object"""
+    with get_db(readonly=True) as db:
+        for chunk in export_active_subscribers(db, export_format):
+            output.write(chunk)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export active newsletter subscribers")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    parser.add_argument("--output", help="File to write to (default: stdout)")
+    args = parser.parse_args()
+
+    if args.output:
+        with open(args.output, "w", newline="") as output:
+            export_subscribers(args.format, output)
+    else:
+        export_subscribers(args.format, sys.stdout)
@@ -0,0 +1,18 @@
+#!/usr/bin/env python
+import argparse
+import json
+
+from app.db.session import get_db
+from app.crud.newsletter import bulk_import_subscribers, iter_csv_emails
+
+def import_subscribers(path: str) -> dict:
+    """Bulk import newsletter subscribers from a CSV file"""
+    with open(path, encoding="utf-8-sig", newline="") as source, get_db() as db:
+        return bulk_import_subscribers(db, iter_csv_emails(source))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import newsletter subscribers from a CSV file")
+    parser.add_argument("path", help="CSV file with an email column (or emails in the first column)")
+    args = parser.parse_args()
+
+    print(json.dumps(import_subscribers(args.path), indent=2))
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+import argparse
+import hashlib
+import json
+import os
+import shutil
+
+from PIL import Image, features
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_STATIC_DIR = os.path.join(BACKEND_DIR, "app", "static")
+# Outlives the static directory, which the build wipes on every import
+DEFAULT_CACHE_DIR = os.path.join(BACKEND_DIR, ".cache", "images")
+
+# Directory under the static root for the variants; StaticFiles treats it as immutable
+VARIANTS_DIR = "_images"
+MANIFEST_NAME = "manifest.json"
+
+SOURCE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".webp"}
+WIDTHS = (480, 960, 1600)
+
+# format -> (file extension, Pillow save options)
+FORMATS = {
+    "avif": (".avif", {"quality": 60, "speed": 6}),
+    "webp": (".webp", {"quality": 80, "method": 6}),
+}
+
+def available_formats() -> list:
+    """Formats the installed Pillow can encode; AVIF needs Pillow 11.2+ built with libavif"""
+    return [name for name in FORMATS if features.check(name)]
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def target_widths(width: int) -> list:
+    """Every configured width below the original, plus the original; images are never upscaled"""
+    return [w for w in WIDTHS if w < width] + [width]
+
+def encode_variants(source_path: str, cache_dir: str, formats: list) -> dict:
+    """
+    Encode every width and format of one image into cache_dir.
+
+    Returns:
+        Metadata with the original size and a list of variants
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    with Image.open(source_path) as image:
+        image.load()
+        width, height = image.size
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+        variants = []
+        for target_width in target_widths(width):
+            target_height = max(1, round(height * target_width / width))
+            resized = image if target_width == width else image.resize((target_width, target_height), Image.LANCZOS)
+            for name in formats:
+                extension, options = FORMATS[name]
+                file_name = f"{target_width}{extension}"
+                resized.save(os.path.join(cache_dir, file_name), format=name.upper(), **options)
+                variants.append({
+                    "file": file_name,
+                    "format": name,
+                    "width": target_width,
+                    "height": target_height,
+                    "bytes": os.path.getsize(os.path.join(cache_dir, file_name)),
+                })
+
+    meta = {"width": width, "height": height, "formats": formats, "variants": variants}
+    with open(os.path.join(cache_dir, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    return meta
+
+def cached_variants(cache_dir: str, formats: list):
+    """Return cached metadata if every variant for these formats is already encoded"""
+    try:
+        with open(os.path.join(cache_dir, "meta.json")) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not set(formats) <= set(meta.get("formats", [])):
+        return None
+    if not all(os.path.exists(os.path.join(cache_dir, v["file"])) for v in meta["variants"]):
+        return None
+    return meta
+
+def optimize_images(static_dir: str, cache_dir: str, formats: list) -> dict:
+    """
+    Publish resized variants of every source image under static_dir and write the manifest.
+
+    Images are keyed by the SHA-256 of their content, so an image already
+    encoded by an earlier build (even under another name) is only copied.
+
+    Returns:
+        Counts of images encoded and reused
+    """
+    variants_root = os.path.join(static_dir, VARIANTS_DIR)
+    os.makedirs(variants_root, exist_ok=True)
+
+    manifest = {}
+    counts = {"encoded": 0, "reused": 0}
+    for directory, dirs, files in os.walk(static_dir):
+        if os.path.abspath(directory) == os.path.abspath(variants_root):
+            dirs[:] = []
+            continue
+        for name in sorted(files):
+            stem, extension = os.path.splitext(name)
+            if extension.lower() not in SOURCE_EXTENSIONS:
+                continue
+            source_path = os.path.join(directory, name)
+            content_hash = file_hash(source_path)
+            image_cache_dir = os.path.join(cache_dir, content_hash)
+
+            meta = cached_variants(image_cache_dir, formats)
+            if meta is None:
+                meta = encode_variants(source_path, image_cache_dir, formats)
+                counts["encoded"] += 1
+            else:
+                counts["reused"] += 1
+
+            variants = []
+            for variant in meta["variants"]:
+                if variant["format"] not in formats:
+                    continue
+                published = f"{VARIANTS_DIR}/{stem}.{content_hash[:12]}.{variant['file']}"
+                shutil.copyfile(os.path.join(image_cache_dir, variant["file"]),
+                                os.path.join(static_dir, published))
+                variants.append({**{k: v for k, v in variant.items() if k != "file"}, "path": published})
+
+            relative_path = os.path.relpath(source_path, static_dir).replace(os.sep, "/")
+            manifest[relative_path] = {
+                "hash": content_hash,
+                "width": meta["width"],
+                "height": meta["height"],
+                "bytes": os.path.getsize(source_path),
+                "variants": variants,
+            }
+
+    with open(os.path.join(variants_root, MANIFEST_NAME), "w") as f:
+        json.dump({"images": manifest}, f, indent=2, sort_keys=True)
+    return counts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate resized WebP/AVIF variants of the built static images")
+    parser.add_argument("--static-dir", default=DEFAULT_STATIC_DIR)
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--formats", nargs="+", choices=list(FORMATS), help="Default: every format Pillow supports")
+    args = parser.parse_args()
+
+    formats = args.formats or available_formats()
+    counts = optimize_images(args.static_dir, args.cache_dir, formats)
+    print(f"Encoded {counts['encoded']} images, reused {counts['reused']} from cache ({', '.join(formats)})")
@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+import argparse
+import logging
+import signal
+import threading
+
+from app.core.mailer import start_outbox_workers
+from app.db.config import settings
+from app.db.session import get_db
+
+def run_outbox_workers(workers: int) -> None:
+    """Send queued emails until interrupted, then let every worker finish its batch"""
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+
+    threads = start_outbox_workers(get_db, stop, workers=workers)
+    logging.info("Sending outbox emails through %s:%s with %d workers", settings.SMTP_HOST, settings.SMTP_PORT, workers)
+    stop.wait()
+    for thread in threads:
+        thread.join()
+    threads[0].worker.smtp_pool.close()
+    logging.info("Sent %d emails, %d failed attempts",
+                 sum(t.worker.sent for t in threads), sum(t.worker.failed for t in threads))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deliver emails queued in the outbox over SMTP")
+    parser.add_argument("--workers", type=int, default=settings.OUTBOX_WORKERS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    run_outbox_workers(args.workers)
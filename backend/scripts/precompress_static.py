@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+import argparse
+import gzip
+import os
+import brotli
+
+# Text formats worth compressing; images and fonts are already compressed
+COMPRESSIBLE_EXTENSIONS = {".html", ".css", ".js", ".mjs", ".json", ".svg", ".txt", ".xml", ".map"}
+
+# Smaller files are not worth the extra lookup
+MIN_SIZE = 1024
+
+DEFAULT_STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app", "static")
+
+def compress_file(path: str, force: bool = False) -> list:
+    """
+    Write .gz and .br siblings next to a file.
+
+    A variant is skipped when it is already newer than the source, and removed
+    when it would not be smaller than the source.
+
+    Returns:
+        The variant paths written
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    source_mtime = os.stat(path).st_mtime
+
+    encoders = [
+        (".gz", lambda d: gzip.compress(d, compresslevel=9, mtime=0)),
+        (".br", lambda d: brotli.compress(d, quality=11)),
+    ]
+
+    written = []
+    for suffix, encode in encoders:
+        variant = path + suffix
+        if not force and os.path.exists(variant) and os.stat(variant).st_mtime >= source_mtime:
+            continue
+        compressed = encode(data)
+        if len(compressed) >= len(data):
+            if os.path.exists(variant):
+                os.remove(variant)
+            continue
+        with open(variant, "wb") as f:
+            f.write(compressed)
+        written.append(variant)
+    return written
+
+def precompress(static_dir: str, force: bool = False) -> int:
+    """Compress every eligible file under static_dir and return the number of variants written"""
+    count = 0
+    for directory, _, files in os.walk(static_dir):
+        for name in files:
+            path = os.path.join(directory, name)
+            if os.path.splitext(name)[1] not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            if os.path.getsize(path) < MIN_SIZE:
+                continue
+            count += len(compress_file(path, force))
+    return count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write gzip/brotli variants of the built static files")
+    parser.add_argument("--static-dir", default=DEFAULT_STATIC_DIR)
+    parser.add_argument("--force", action="store_true", help="Recompress files with up-to-date variants")
+    args = parser.parse_args()
+
+    written = precompress(args.static_dir, args.force)
+    print(f"Wrote {written} compressed variants")
@@ -0,0 +1,14 @@
+#!/usr/bin/env python
+import argparse
+
+from app.db.session import get_db
+from app.crud.idempotency import purge_expired_keys
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete expired reservation Idempotency-Keys")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Keys deleted per transaction")
+    args = parser.parse_args()
+
+    with get_db() as db:
+        deleted = purge_expired_keys(db, args.batch_size)
+    print(f"Deleted {deleted} expired idempotency keys")
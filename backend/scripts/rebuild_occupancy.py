@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+import argparse
+import sys
+from datetime import datetime
+
+from app.db.session import get_db
+from app.crud.occupancy import occupancy_drift, rebuild_occupancy
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild or verify the reservation occupancy summary")
+    parser.add_argument("--verify", action="store_true", help="Only report summary rows that differ, exit 1 if any do")
+    parser.add_argument("--from", dest="start", help="First day, YYYY-MM-DD (default: the whole history)")
+    parser.add_argument("--to", dest="end", help="Last day, YYYY-MM-DD (default: same as --from)")
+    args = parser.parse_args()
+    if args.end and not args.start:
+        # Rebuilding the whole history blocks bookings until it finishes, only do it on purpose
+        parser.error("--to needs --from")
+
+    start_date = datetime.strptime(args.start, "%Y-%m-%d").date() if args.start else None
+    end_date = datetime.strptime(args.end, "%Y-%m-%d").date() if args.end else start_date
+
+    with get_db() as db:
+        if args.verify:
+            drift = occupancy_drift(db, start_date, end_date)
+            for row in drift:
+                print(f"{row['slot']:%Y-%m-%d %H:%M}  table {row['table_number']}  "
+                      f"stored {row['stored']}  expected {row['expected']}")
+            print(f"{len(drift)} summary rows differ from the reservations")
+            sys.exit(1 if drift else 0)
+        rows = rebuild_occupancy(db, start_date, end_date)
+    print(f"Rebuilt {rows} occupancy summary rows")
@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+import argparse
+import logging
+import os
+
+from app.core.server import serve
+from app.db.config import settings
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the app with several worker processes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=settings.WEB_WORKERS or os.cpu_count() or 1)
+    parser.add_argument("--threads", type=int, default=settings.WEB_THREADS, help="Flask request threads per worker")
+    parser.add_argument("--max-requests", type=int, default=settings.WEB_MAX_REQUESTS,
+                        help="Replace a worker after this many requests")
+    parser.add_argument("--max-requests-jitter", type=int, default=settings.WEB_MAX_REQUESTS_JITTER)
+    parser.add_argument("--graceful-timeout", type=float, default=settings.WEB_GRACEFUL_TIMEOUT_SECONDS,
+                        help="Seconds a stopping worker waits for in-flight requests")
+    parser.add_argument("--db-max-connections", type=int, default=settings.DB_MAX_CONNECTIONS,
+                        help="Postgres connections all workers together may open")
+    parser.add_argument("--warmup", action=argparse.BooleanOptionalAction, default=settings.WARMUP_ON_START)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    if args.workers > 1 and settings.ADMISSION_CONTROL_ENABLED and settings.RATE_LIMIT_BACKEND == "memory":
+        logging.warning("Each of the %d workers enforces its own rate limits; "
+                        "set RATE_LIMIT_BACKEND=shared_memory to share them", args.workers)
+    serve(args.host, args.port, args.workers, args.threads,
+          max_requests=args.max_requests, max_requests_jitter=args.max_requests_jitter,
+          graceful_timeout=args.graceful_timeout, max_connections=args.db_max_connections,
+          max_overflow=settings.DB_MAX_OVERFLOW, warmup=args.warmup, log_level=args.log_level)
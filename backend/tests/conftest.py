@@ -0,0 +1,82 @@
+"""
+Shared fixtures.
+
+Tests that need Postgres run against the database configured in the
+environment or .env, like the benchmarks, and are skipped when it cannot be
+reached. Without the POSTGRES_* settings, tests that read settings are
+skipped too. They only create rows for customers at EMAIL_DOMAIN on days far in
+the future, and delete them again afterwards.
+"""
+from datetime import datetime
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import delete, text
+from sqlalchemy.exc import SQLAlchemyError
+from app.core.cache import availability_cache, idempotency_cache
+from app.core.occupancy import occupancy_index
+from app.db.config import get_settings, settings
+from app.db.session import get_db, get_engine
+from app.main import create_app
+from app.models import Customer, EmailOutbox, IdempotencyKey, Newsletter, Reservation
+
+# Under example.com, which passes email validation unlike a .invalid domain
+EMAIL_DOMAIN = "tests.cafefausse.example.com"
+# Prefix of the Idempotency-Keys tests send
+KEY_PREFIX = "tests-"
+
+# Far enough ahead that no real booking shares a slot with a test
+FIRST_DAY = datetime(2097, 1, 1)
+
+
+def cleanup() -> None:
+    """Delete every customer and subscriber at EMAIL_DOMAIN with their reservations and emails, and the tests' idempotency keys."""
+    with get_db() as db:
+        customer_ids = db.query(Customer.id).filter(Customer.email.like(f"%@{EMAIL_DOMAIN}")).scalar_subquery()
+        db.execute(delete(Reservation).where(Reservation.customer_id.in_(customer_ids)))
+        db.execute(delete(EmailOutbox).where(EmailOutbox.recipient.like(f"%@{EMAIL_DOMAIN}")))
+        db.execute(delete(Customer).where(Customer.email.like(f"%@{EMAIL_DOMAIN}")))
+        db.execute(delete(Newsletter).where(Newsletter.email.like(f"%@{EMAIL_DOMAIN}")))
+        db.execute(delete(IdempotencyKey).where(IdempotencyKey.key.like(f"{KEY_PREFIX}%")))
+    occupancy_index.invalidate()
+    availability_cache.invalidate()
+    idempotency_cache.clear()
+
+
+@pytest.fixture(scope="session")
+def configured():
+    """Skips the test unless the settings can be read, which needs the POSTGRES_* variables."""
+    try:
+        get_settings()
+    except ValidationError:
+        pytest.skip("Postgres is not configured")
+
+
+@pytest.fixture(scope="session")
+def database(configured):
+    """Skips the test unless Postgres can be reached."""
+    try:
+        with get_engine().connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except SQLAlchemyError as e:
+        pytest.skip(f"Postgres is not reachable: {e.__class__.__name__}")
+
+
+@pytest.fixture
+def clean_database(database):
+    """Postgres, with the rows of earlier tests removed before and after the test."""
+    cleanup()
+    yield
+    cleanup()
+
+
+@pytest.fixture
+def client(configured):
+    """Flask test client."""
+    return create_app(warmup=False).test_client()
+
+
+@pytest.fixture
+def admin_token(configured, monkeypatch):
+    """ADMIN_API_TOKEN set for the test; send it as a bearer token."""
+    monkeypatch.setattr(settings, "ADMIN_API_TOKEN", "test-admin-token")
+    return "test-admin-token"
@@ -0,0 +1,49 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import pytest
+from sqlalchemy import select
+from app.core.tables import get_table_inventory
+from app.crud.reservation import create_reservation
+from app.db.session import get_db
+from app.models import Reservation
+from tests.conftest import EMAIL_DOMAIN, FIRST_DAY
+
+STRATEGIES = ["index", "retry", "advisory_lock", "single_statement"]
+
+SEVEN_PM = FIRST_DAY + timedelta(days=1, hours=19)
+
+# More parties than tables, fired from more threads than the pool keeps open
+EXTRA_BOOKINGS = 10
+THREADS = 8
+
+
+def book(strategy: str, number: int) -> dict:
+    """One booking in its own session, rolled back on failure like the endpoint does."""
+    with get_db() as db:
+        response = create_reservation(db, f"{strategy}-{number}@{EMAIL_DOMAIN}", SEVEN_PM, 2,
+                                      name=f"Test Guest {number}", strategy=strategy)
+        if not response["success"]:
+            db.rollback()
+    return response
+
+
+@pytest.mark.parametrize("strategy", STRATEGIES)
+def test_concurrent_bookings_never_share_a_table(clean_database, strategy):
+    table_count = get_table_inventory().table_count
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        responses = list(pool.map(lambda n: book(strategy, n), range(table_count + EXTRA_BOOKINGS)))
+
+    confirmed = [response["data"]["table_number"] for response in responses if response["success"]]
+    assert len(confirmed) == len(set(confirmed))
+    for response in responses:
+        if not response["success"]:
+            assert response.get("retryable") or "no tables are available" in response["message"]
+
+    with get_db() as db:
+        booked = db.scalars(
+            select(Reservation.table_number)
+            .where(Reservation.reservation_date == SEVEN_PM, Reservation.status == "confirmed")
+        ).all()
+    assert sorted(booked) == sorted(confirmed)
+    # Every party fits a table of its own, so the room fills up before anyone is turned away
+    assert len(booked) == table_count
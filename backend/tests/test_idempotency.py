@@ -0,0 +1,99 @@
+import asyncio
+import uuid
+from datetime import timedelta
+from sqlalchemy import select, text
+from sqlalchemy.exc import IntegrityError
+from app.asgi import create_reservation_view
+from app.crud import reservation
+from app.crud.reservation import SlotContentionError
+from app.db.session import dispose_async_engine, get_db
+from app.models import IdempotencyKey
+from tests.conftest import EMAIL_DOMAIN, FIRST_DAY, KEY_PREFIX
+
+SEVEN_PM = FIRST_DAY + timedelta(days=2, hours=19)
+
+
+def booking(email: str, start=SEVEN_PM) -> dict:
+    return {
+        "email": f"{email}@{EMAIL_DOMAIN}",
+        "name": "Test Guest",
+        "date": start.strftime("%Y-%m-%d"),
+        "time": start.strftime("%I:%M %p"),
+        "guests": 2,
+    }
+
+
+def new_key() -> str:
+    return f"{KEY_PREFIX}{uuid.uuid4()}"
+
+
+def stored(key: str):
+    with get_db() as db:
+        return db.execute(select(IdempotencyKey.status_code).where(IdempotencyKey.key == key)).scalar()
+
+
+def test_lost_race_is_not_replayed(clean_database, client, monkeypatch):
+    def lose_race(*args, **kwargs):
+        raise SlotContentionError("taken")
+
+    key = new_key()
+    with monkeypatch.context() as patched:
+        patched.setattr(reservation, "allocate_table", lose_race)
+        response = client.post("/api/reservations", json=booking("race"), headers={"Idempotency-Key": key})
+    assert response.status_code == 503
+    assert stored(key) is None
+
+    response = client.post("/api/reservations", json=booking("race"), headers={"Idempotency-Key": key})
+    assert response.status_code == 201
+    assert stored(key) == 201
+
+
+def test_lost_race_is_not_replayed_on_the_async_route(clean_database, monkeypatch):
+    def lose_race(*args, **kwargs):
+        raise SlotContentionError("taken")
+
+    async def post(headers):
+        try:
+            return await create_reservation_view(booking("async-race"), headers)
+        finally:
+            # The async pool belongs to this event loop
+            await dispose_async_engine()
+
+    key = new_key()
+    with monkeypatch.context() as patched:
+        patched.setattr(reservation, "allocate_table", lose_race)
+        status, _ = asyncio.run(post({"idempotency-key": key}))
+    assert status == 503
+    assert stored(key) is None
+
+    status, _ = asyncio.run(post({"idempotency-key": key}))
+    assert status == 201
+    assert stored(key) == 201
+
+
+def test_database_error_answers_503_not_500(clean_database, client, monkeypatch):
+    def fail_in_database(db, *args, **kwargs):
+        # Leaves the transaction aborted, as a failed insert does
+        try:
+            db.execute(text("SELECT 1 / 0"))
+        except Exception as e:
+            raise IntegrityError("SELECT 1 / 0", None, e.orig) from e
+
+    key = new_key()
+    monkeypatch.setattr(reservation, "allocate_table", fail_in_database)
+    response = client.post("/api/reservations", json=booking("aborted"), headers={"Idempotency-Key": key})
+    assert response.status_code == 503
+    assert response.json["retryable"]
+    assert stored(key) is None
+
+
+def test_rejection_is_replayed(clean_database, client):
+    key = new_key()
+    closed = booking("closed", FIRST_DAY + timedelta(hours=10))
+    first = client.post("/api/reservations", json=closed, headers={"Idempotency-Key": key})
+    assert first.status_code == 400
+    assert stored(key) == 400
+
+    again = client.post("/api/reservations", json=closed, headers={"Idempotency-Key": key})
+    assert again.status_code == 400
+    assert again.json == first.json
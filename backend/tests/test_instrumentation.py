@@ -0,0 +1,93 @@
+import asyncio
+import json
+from datetime import timedelta
+from app.asgi import app as asgi_app
+from app.core.instrumentation import endpoint_stats
+from app.crud.reservation import create_reservation
+from app.db.session import dispose_async_engine, get_db
+from tests.conftest import EMAIL_DOMAIN, FIRST_DAY
+
+BOOKING_ENDPOINT = "reservations.create_reservation_endpoint"
+LISTING_ENDPOINT = "reservations.list_reservations_endpoint"
+
+
+def counts(endpoint: str):
+    stats = endpoint_stats(endpoint)
+    return (stats.duration.snapshot()["count"], stats.statements.snapshot()["sum"],
+            stats.response_bytes.snapshot()["sum"])
+
+
+def call_asgi(method: str, path: str, body: bytes):
+    """Send one request to the ASGI app and return the status, headers and body."""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    async def run():
+        scope = {"type": "http", "method": method, "path": path, "headers": [], "client": ("127.0.0.1", 5000)}
+        try:
+            await asgi_app(scope, receive, send)
+        finally:
+            await dispose_async_engine()
+
+    asyncio.run(run())
+    start, body = messages
+    return start["status"], dict(start["headers"]), body["body"]
+
+
+def test_streamed_response_is_recorded_once_sent(clean_database, client, admin_token):
+    day = FIRST_DAY + timedelta(days=20)
+    with get_db() as db:
+        create_reservation(db, f"listed@{EMAIL_DOMAIN}", day + timedelta(hours=19), 2, name="Listed Guest")
+
+    requests, statements, size = counts(LISTING_ENDPOINT)
+    response = client.get(f"/api/reservations?from={day:%Y-%m-%d}",
+                          headers={"Authorization": f"Bearer {admin_token}"})
+    assert "Server-Timing" not in response.headers
+    # Nothing is recorded until the body has been sent
+    assert counts(LISTING_ENDPOINT) == (requests, statements, size)
+
+    body = response.get_data()
+    response.close()
+    assert json.loads(body)["data"]["reservations"]
+    after_requests, after_statements, after_size = counts(LISTING_ENDPOINT)
+    assert after_requests == requests + 1
+    # The page is read from the database while it streams
+    assert after_statements > statements
+    assert after_size == size + len(body)
+
+
+def test_native_route_is_timed(database):
+    requests, _, size = counts(BOOKING_ENDPOINT)
+    status, headers, body = call_asgi("POST", "/api/reservations", b"[]")
+    assert status == 400
+    assert b"app;dur=" in headers[b"server-timing"]
+    after_requests, _, after_size = counts(BOOKING_ENDPOINT)
+    assert after_requests == requests + 1
+    assert after_size == size + len(body)
+
+
+def test_native_route_counts_its_sql(clean_database):
+    _, statements, _ = counts(BOOKING_ENDPOINT)
+    start = FIRST_DAY + timedelta(days=21, hours=19)
+    payload = {"email": f"native@{EMAIL_DOMAIN}", "name": "Native Guest", "guests": 2,
+               "date": start.strftime("%Y-%m-%d"), "time": start.strftime("%I:%M %p")}
+    status, headers, _ = call_asgi("POST", "/api/reservations", json.dumps(payload).encode())
+    assert status == 201
+    assert b"statement" in headers[b"server-timing"]
+    assert counts(BOOKING_ENDPOINT)[1] > statements
+
+
+def test_streamed_response_closed_early_is_recorded_once(clean_database, client, admin_token):
+    requests, _, _ = counts(LISTING_ENDPOINT)
+    response = client.get(f"/api/reservations?from={FIRST_DAY:%Y-%m-%d}",
+                          headers={"Authorization": f"Bearer {admin_token}"})
+    # The client goes away after the first chunk
+    next(iter(response.response))
+    response.close()
+    response.close()
+    assert counts(LISTING_ENDPOINT)[0] == requests + 1
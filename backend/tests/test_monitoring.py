@@ -0,0 +1,22 @@
+import pytest
+from app.db.config import settings
+
+ENDPOINTS = ["/api/pool", "/api/metrics"]
+
+
+@pytest.mark.parametrize("path", ENDPOINTS)
+def test_disabled_without_a_configured_token(client, monkeypatch, path):
+    monkeypatch.setattr(settings, "ADMIN_API_TOKEN", None)
+    assert client.get(path).status_code == 403
+
+
+@pytest.mark.parametrize("path", ENDPOINTS)
+def test_rejects_a_missing_or_wrong_token(client, admin_token, path):
+    assert client.get(path).status_code == 401
+    assert client.get(path, headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+
+@pytest.mark.parametrize("path", ENDPOINTS)
+def test_serves_the_admin(client, admin_token, path):
+    response = client.get(path, headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
@@ -0,0 +1,53 @@
+import asyncio
+from sqlalchemy import func, select
+from app.asgi import subscribe_view
+from app.db.session import dispose_async_engine, get_db
+from app.models import EmailOutbox, Newsletter
+from tests.conftest import EMAIL_DOMAIN
+
+
+def count(model, column, email: str) -> int:
+    with get_db() as db:
+        return db.scalar(select(func.count()).select_from(model).where(func.lower(column) == email.lower()))
+
+
+def subscribe_async(email) -> tuple:
+    async def post():
+        try:
+            return await subscribe_view({"email": email}, {})
+        finally:
+            await dispose_async_engine()
+
+    return asyncio.run(post())
+
+
+def totals() -> tuple:
+    with get_db() as db:
+        return db.scalar(select(func.count()).select_from(Newsletter)), db.scalar(select(func.count()).select_from(EmailOutbox))
+
+
+def test_invalid_address_is_rejected(clean_database, client):
+    before = totals()
+    for email in ("not-an-email", f"two@@{EMAIL_DOMAIN}", 42):
+        response = client.post("/api/newsletter/subscribe", json={"email": email})
+        assert response.status_code == 400
+        assert subscribe_async(email)[0] == 400
+    # Neither a subscriber nor a welcome email that could never be delivered
+    assert totals() == before
+
+
+def test_address_is_normalized_like_an_import(clean_database, client):
+    response = client.post("/api/newsletter/subscribe", json={"email": f"  Reader@{EMAIL_DOMAIN.upper()} "})
+    assert response.status_code == 201
+    assert response.get_json()["data"]["email"] == f"Reader@{EMAIL_DOMAIN}"
+
+    # The domain's case does not make a second subscriber
+    response = client.post("/api/newsletter/subscribe", json={"email": f"Reader@{EMAIL_DOMAIN}"})
+    assert response.status_code == 409
+    assert subscribe_async(f"Reader@{EMAIL_DOMAIN.title()}")[0] == 409
+
+    assert count(Newsletter, Newsletter.email, f"Reader@{EMAIL_DOMAIN}") == 1
+    assert count(EmailOutbox, EmailOutbox.recipient, f"Reader@{EMAIL_DOMAIN}") == 1
+
+    response = client.post("/api/newsletter/unsubscribe", json={"email": f"Reader@{EMAIL_DOMAIN.upper()}"})
+    assert response.status_code == 200
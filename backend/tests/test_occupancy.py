@@ -0,0 +1,68 @@
+import time
+from datetime import datetime, timedelta
+from app.core.intervals import IntervalSet
+from app.core.occupancy import OccupancyIndex
+from app.core.tables import DEFAULT_CAPACITIES, DEFAULT_COMBINATIONS, TableInventory
+
+SEVEN_PM = datetime(2099, 1, 1, 19, 0)
+
+
+class FakeSession:
+    """Only the info dict is used when holding and releasing claims."""
+
+    def __init__(self):
+        self.info = {}
+
+
+def new_index() -> OccupancyIndex:
+    """An index over the default layout that needs no settings."""
+    return OccupancyIndex(TableInventory(DEFAULT_CAPACITIES, DEFAULT_COMBINATIONS), ttl=30,
+                          max_duration=timedelta(hours=4))
+
+
+def seating(start: datetime, minutes: int = 90):
+    return start, start + timedelta(minutes=minutes)
+
+
+def test_claim_never_picks_a_claimed_table():
+    index = new_index()
+    # An empty night, as if loaded from the database
+    index._days[SEVEN_PM.date()] = ([IntervalSet() for _ in range(index.table_count)], time.monotonic())
+    first = index.claim(FakeSession(), *seating(SEVEN_PM), guest_count=2)
+    second = index.claim(FakeSession(), *seating(SEVEN_PM + timedelta(minutes=30)), guest_count=2)
+    assert first and second
+    assert not set(first) & set(second)
+
+
+def test_overlapping_holds_of_one_table_settle_independently():
+    index = new_index()
+    early, late = FakeSession(), FakeSession()
+    index.hold(early, *seating(SEVEN_PM), table_number=3)
+    index.hold(late, *seating(SEVEN_PM + timedelta(minutes=30)), table_number=3)
+
+    # The early transaction lost the race and rolled back
+    index.release_claim(early, *seating(SEVEN_PM), table_number=3)
+    assert index.claimed_tables(*seating(SEVEN_PM + timedelta(minutes=30))) == [3]
+    assert index.claimed_tables(*seating(SEVEN_PM)) == [3]
+
+    index.release_claim(late, *seating(SEVEN_PM + timedelta(minutes=30)), table_number=3)
+    assert index.claimed_tables(*seating(SEVEN_PM, 240)) == []
+
+
+def test_identical_holds_are_counted():
+    index = new_index()
+    sessions = [FakeSession(), FakeSession()]
+    for session in sessions:
+        index.hold(session, *seating(SEVEN_PM), table_number=5)
+
+    index.settle_claim(*seating(SEVEN_PM), table_number=5, reserved=False)
+    assert index.claimed_tables(*seating(SEVEN_PM)) == [5]
+    index.settle_claim(*seating(SEVEN_PM), table_number=5, reserved=False)
+    assert index.claimed_tables(*seating(SEVEN_PM)) == []
+
+
+def test_settling_an_unknown_claim_leaves_others_alone():
+    index = new_index()
+    index.hold(FakeSession(), *seating(SEVEN_PM), table_number=2)
+    index.settle_claim(*seating(SEVEN_PM, 60), table_number=2, reserved=False)
+    assert index.claimed_tables(*seating(SEVEN_PM)) == [2]
@@ -0,0 +1,214 @@
+import asyncio
+import socket
+import threading
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+import pytest
+from aiosmtpd.controller import Controller
+from sqlalchemy import select, text
+from app.api import reservations
+from app.core import emails
+from app.core.mailer import OutboxWorker, SMTPConnectionPool
+from app.crud.outbox import enqueue_email
+from app.db.config import settings
+from app.db.session import get_db, get_engine
+from app.models import EmailOutbox, Reservation
+from tests.conftest import EMAIL_DOMAIN, FIRST_DAY
+
+SEVEN_PM = FIRST_DAY + timedelta(days=3, hours=19)
+
+
+class StandIn:
+    """aiosmtpd handler recording each delivery, answering with queued replies first."""
+
+    def __init__(self):
+        self.delivered = []
+        self.replies = []
+        self.gather(1)
+
+    def gather(self, sessions: int) -> None:
+        """Hold each message in DATA until this many sessions are there at once."""
+        self._expected = sessions
+        self._waiting = 0
+        self._gathered = None
+
+    async def handle_DATA(self, server, session, envelope):
+        self._gathered = self._gathered or asyncio.Event()
+        self._waiting += 1
+        if self._waiting >= self._expected:
+            self._gathered.set()
+        await asyncio.wait_for(self._gathered.wait(), timeout=5)
+        if self.replies:
+            return self.replies.pop(0)
+        self.delivered.extend(envelope.rcpt_tos)
+        return "250 Message accepted for delivery"
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+@pytest.fixture
+def smtp():
+    """An SMTP stand-in on a free local port."""
+    handler = StandIn()
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    handler.port = controller.port
+    yield handler
+    controller.stop()
+
+
+@pytest.fixture
+def worker(clean_database, smtp):
+    """
+    An outbox worker sending to the stand-in that only sees the tests' emails.
+
+    Every other email is locked by a transaction held open for the test, which
+    the worker's claim skips like it skips the rows of another worker.
+    """
+    with get_engine().connect() as other_worker:
+        other_worker.execute(
+            text("SELECT id FROM email_outbox WHERE recipient NOT LIKE :tests FOR UPDATE"),
+            {"tests": f"%@{EMAIL_DOMAIN}"},
+        )
+        smtp_pool = SMTPConnectionPool("127.0.0.1", smtp.port, size=2, timeout=5)
+        yield OutboxWorker(get_db, smtp_pool, batch_size=10)
+        smtp_pool.close()
+        other_worker.rollback()
+
+
+def queue(*recipients: str) -> None:
+    with get_db() as db:
+        for recipient in recipients:
+            enqueue_email(db, "test", f"{recipient}@{EMAIL_DOMAIN}", "Test email", "Hello.\n")
+
+
+def outbox(recipient: str) -> EmailOutbox:
+    with get_db() as db:
+        email = db.scalars(select(EmailOutbox).where(EmailOutbox.recipient == f"{recipient}@{EMAIL_DOMAIN}")).one()
+        db.expunge(email)
+    return email
+
+
+def booking(email: str) -> dict:
+    return {
+        "email": f"{email}@{EMAIL_DOMAIN}",
+        "name": "Test Guest",
+        "date": SEVEN_PM.strftime("%Y-%m-%d"),
+        "time": SEVEN_PM.strftime("%I:%M %p"),
+        "guests": 2,
+    }
+
+
+def test_booking_queues_its_confirmation(clean_database, client):
+    response = client.post("/api/reservations", json=booking("confirmed"))
+    assert response.status_code == 201
+
+    email = outbox("confirmed")
+    assert email.kind == emails.RESERVATION_CONFIRMATION
+    assert email.status == "pending"
+
+
+def test_confirmation_is_rolled_back_with_its_booking(clean_database, client, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("failed after queueing")
+
+    # Fails after the booking and its email are in the session, before the commit
+    monkeypatch.setattr(reservations, "save_idempotent_response", fail)
+    response = client.post("/api/reservations", json=booking("rolled-back"),
+                           headers={"Idempotency-Key": "tests-rolled-back"})
+    assert response.status_code == 500
+
+    with get_db() as db:
+        assert db.scalar(select(Reservation.id).where(Reservation.reservation_date == SEVEN_PM)) is None
+        assert db.scalar(select(EmailOutbox.id).where(EmailOutbox.recipient.like(f"%@{EMAIL_DOMAIN}"))) is None
+
+
+def test_worker_sends_a_batch_over_one_connection(worker, smtp):
+    queue("first", "second", "third")
+
+    assert worker.drain_batch() == 3
+    assert sorted(smtp.delivered) == sorted(f"{name}@{EMAIL_DOMAIN}" for name in ("first", "second", "third"))
+    assert worker.smtp_pool.connections_opened == 1
+    assert outbox("first").status == "sent"
+    assert worker.drain_batch() == 0
+
+
+def test_deferred_email_is_retried_after_a_backoff(worker, smtp, monkeypatch):
+    monkeypatch.setattr(settings, "OUTBOX_BACKOFF_SECONDS", 30.0)
+    smtp.replies.append("451 4.3.0 Try again later")
+    queue("deferred")
+
+    assert worker.drain_batch() == 1
+    email = outbox("deferred")
+    assert email.status == "pending"
+    assert email.attempts == 1
+    assert "451" in email.last_error
+    assert email.next_attempt_at >= datetime.utcnow() + timedelta(seconds=14)
+    # Not due again until the backoff has passed
+    assert worker.drain_batch() == 0
+
+    with get_db() as db:
+        db.get(EmailOutbox, email.id).next_attempt_at = datetime.utcnow()
+    assert worker.drain_batch() == 1
+    assert outbox("deferred").status == "sent"
+    assert outbox("deferred").attempts == 2
+    assert smtp.delivered == [f"deferred@{EMAIL_DOMAIN}"]
+
+
+def test_rejected_email_is_given_up_on(worker, smtp):
+    smtp.replies.append("550 5.1.1 No such user")
+    queue("rejected", "accepted")
+
+    assert worker.drain_batch() == 2
+    assert outbox("rejected").status == "failed"
+    assert outbox("accepted").status == "sent"
+    # A rejection is about one message, the connection is kept for the next
+    assert worker.smtp_pool.connections_opened == 1
+
+
+def test_email_is_given_up_on_after_the_last_attempt(worker, smtp, monkeypatch):
+    monkeypatch.setattr(settings, "OUTBOX_MAX_ATTEMPTS", 2)
+    monkeypatch.setattr(settings, "OUTBOX_BACKOFF_SECONDS", 0.0)
+    smtp.replies += ["451 4.3.0 Try again later"] * 2
+    queue("unlucky")
+
+    assert worker.drain_batch() == 1
+    assert outbox("unlucky").status == "pending"
+    assert worker.drain_batch() == 1
+    assert outbox("unlucky").status == "failed"
+    assert smtp.delivered == []
+
+
+def send_concurrently(smtp_pool: SMTPConnectionPool, smtp: StandIn, senders: int) -> None:
+    """Send one email from each of several threads, all connected to the stand-in at once."""
+    message = EmailMessage()
+    message["From"] = f"tests@{EMAIL_DOMAIN}"
+    message["To"] = f"pooled@{EMAIL_DOMAIN}"
+    message["Subject"] = "Test email"
+    message.set_content("Hello.\n")
+    smtp.gather(senders)
+    threads = [threading.Thread(target=smtp_pool.send, args=([message],)) for _ in range(senders)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_pool_keeps_at_most_its_size_idle(smtp):
+    smtp_pool = SMTPConnectionPool("127.0.0.1", smtp.port, size=2, timeout=5)
+
+    send_concurrently(smtp_pool, smtp, 3)
+    assert smtp_pool.connections_opened == 3
+    # Only two of the three connections were kept, so three senders need one more
+    send_concurrently(smtp_pool, smtp, 3)
+    assert smtp_pool.connections_opened == 4
+    # One at a time, the idle connections are reused
+    send_concurrently(smtp_pool, smtp, 1)
+    send_concurrently(smtp_pool, smtp, 1)
+    assert smtp_pool.connections_opened == 4
+    assert len(smtp.delivered) == 8
+    smtp_pool.close()
@@ -0,0 +1,74 @@
+import time
+from types import SimpleNamespace
+import psycopg2.extensions
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.orm import Session
+from app.db import pool
+from app.db.config import settings
+from app.db.pool import POOL_STATS
+from app.db.session import _create_sync_engine, get_db, get_engine
+
+
+@pytest.fixture
+def idle_pool(database, monkeypatch):
+    """The primary pool with a connection checked in and then left idle past the ping threshold."""
+    if settings.DB_POOL_PRE_PING != "idle":
+        pytest.skip("Idle pings are disabled")
+    with get_engine().connect() as connection:
+        connection.execute(text("SELECT 1"))
+    later = time.monotonic() + settings.DB_POOL_PRE_PING_IDLE_SECONDS + 1
+    monkeypatch.setattr(pool, "time", SimpleNamespace(monotonic=lambda: later, perf_counter=time.perf_counter))
+    return POOL_STATS["primary"]
+
+
+def test_idle_ping_leaves_no_transaction_open(idle_pool):
+    pings = idle_pool.pings
+    with get_engine().connect() as connection:
+        assert idle_pool.pings == pings + 1
+        status = connection.connection.dbapi_connection.get_transaction_status()
+        assert status == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+
+def test_readonly_session_after_idle_ping(idle_pool):
+    with get_db(readonly=True) as db:
+        assert db.execute(text("SELECT 1")).scalar() == 1
+
+
+def test_readonly_execution_option_after_idle_ping(idle_pool):
+    # psycopg2 refuses to change session characteristics inside a transaction
+    with Session(get_engine().execution_options(postgresql_readonly=True)) as db:
+        assert db.execute(text("SHOW transaction_read_only")).scalar() == "on"
+
+
+@pytest.fixture
+def small_engine(database, monkeypatch):
+    """An engine built like the primary, with one pooled connection, one overflow and a short timeout."""
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 1)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 1)
+    monkeypatch.setattr(settings, "DB_POOL_TIMEOUT", 0.2)
+    engine = _create_sync_engine(settings.SQLALCHEMY_DATABASE_URI, "tests-small")
+    yield engine
+    engine.dispose()
+    POOL_STATS.pop("tests-small", None)
+
+
+def test_checkout_beyond_size_and_overflow_times_out(small_engine):
+    stats = POOL_STATS["tests-small"]
+    first, second = small_engine.connect(), small_engine.connect()
+    assert stats.as_dict(small_engine.pool)["overflow"] == 1
+
+    started = time.perf_counter()
+    with pytest.raises(exc.TimeoutError):
+        small_engine.connect()
+    assert time.perf_counter() - started >= settings.DB_POOL_TIMEOUT
+    assert stats.checkout_errors == 1
+    assert stats.checked_out == 2
+
+    # A returned connection is handed out again without opening another
+    second.close()
+    with small_engine.connect() as third:
+        assert third.execute(text("SELECT 1")).scalar() == 1
+    first.close()
+    assert stats.connections_created == 2
+    assert stats.checked_out == 0
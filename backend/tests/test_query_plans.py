@@ -0,0 +1,40 @@
+from datetime import date, datetime, timedelta
+import pytest
+from benchmarks.query_plans import INDEXED_TABLES, explain, record_hot_paths, reset, scans, seed
+
+# A year, as the benchmark seeds: with much less, a month of availability is a
+# large enough share of the table that a sequential scan is the better plan
+SEEDED_DAYS = 365
+SEEDED_CUSTOMERS = 5000
+FIRST_SEEDED_DAY = date(2098, 1, 1)
+
+
+@pytest.fixture(scope="module")
+def history(database):
+    """Seeded booking history, deleted again after the module's tests."""
+    reset()
+    try:
+        seed(FIRST_SEEDED_DAY, SEEDED_DAYS, SEEDED_CUSTOMERS)
+        yield
+    finally:
+        reset()
+
+
+def test_hot_paths_never_scan_reservations_or_customers(history):
+    # A Saturday evening in the middle of the history
+    day = FIRST_SEEDED_DAY + timedelta(days=SEEDED_DAYS // 2)
+    day += timedelta(days=(5 - day.weekday()) % 7)
+    slot = datetime.combine(day, datetime.min.time()).replace(hour=19)
+
+    seq_scans = {}
+    explained = 0
+    for path, statement, parameters in record_hot_paths(slot):
+        if not statement.lstrip().upper().startswith(("SELECT", "WITH", "INSERT", "UPDATE")):
+            continue
+        explained += 1
+        for node in scans(explain(statement, parameters)):
+            if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in INDEXED_TABLES:
+                seq_scans.setdefault(path, set()).add(node["Relation Name"])
+
+    assert explained
+    assert seq_scans == {}
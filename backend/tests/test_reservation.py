@@ -0,0 +1,100 @@
+from datetime import timedelta
+import pytest
+from sqlalchemy import event
+from app.core.tables import get_table_inventory
+from app.crud.reservation import create_reservation
+from app.db.session import get_db, get_engine
+from tests.conftest import EMAIL_DOMAIN, FIRST_DAY
+
+STRATEGIES = ["retry", "single_statement"]
+
+SIX_PM = FIRST_DAY + timedelta(hours=18)
+
+
+def book(email: str, start, guest_count: int = 2, strategy: str = "retry", **kwargs) -> dict:
+    with get_db() as db:
+        return create_reservation(db, email, start, guest_count, name="Test Guest", strategy=strategy, **kwargs)
+
+
+@pytest.mark.parametrize("strategy", STRATEGIES)
+def test_overlapping_booking_for_the_same_customer_is_rejected(clean_database, strategy):
+    email = f"overlap-{strategy}@{EMAIL_DOMAIN}"
+    assert book(email, SIX_PM, strategy=strategy)["success"]
+
+    for start in (SIX_PM + timedelta(minutes=30), SIX_PM - timedelta(minutes=60)):
+        response = book(email, start, strategy=strategy)
+        assert not response["success"]
+        assert response["data"]["time"] == "18:00"
+        assert "overlaps" in response["message"]
+
+
+@pytest.mark.parametrize("strategy", STRATEGIES)
+def test_back_to_back_bookings_for_the_same_customer_are_accepted(clean_database, strategy):
+    email = f"back-to-back-{strategy}@{EMAIL_DOMAIN}"
+    assert book(email, SIX_PM, strategy=strategy, duration_minutes=90)["success"]
+    assert book(email, SIX_PM + timedelta(minutes=90), strategy=strategy)["success"]
+
+
+@pytest.mark.parametrize("strategy", STRATEGIES)
+def test_same_start_updates_the_guest_count(clean_database, strategy):
+    email = f"update-{strategy}@{EMAIL_DOMAIN}"
+    assert book(email, SIX_PM, strategy=strategy)["success"]
+    response = book(email, SIX_PM, guest_count=1, strategy=strategy)
+    assert response["success"]
+    assert response["data"]["guest_count"] == 1
+
+
+@pytest.fixture
+def statements():
+    """Statements sent on the primary engine during the test, as a list that fills up."""
+    sent = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        sent.append(statement)
+
+    engine = get_engine()
+    event.listen(engine, "before_cursor_execute", count)
+    yield sent
+    event.remove(engine, "before_cursor_execute", count)
+
+
+def test_single_statement_books_in_one_round_trip(clean_database, statements):
+    email = f"round-trip@{EMAIL_DOMAIN}"
+    for start in (SIX_PM, SIX_PM + timedelta(hours=2)):
+        statements.clear()
+        assert book(email, start, strategy="single_statement")["success"]
+        assert len(statements) == 1
+
+
+def booking_story(strategy: str) -> list:
+    """Responses to a customer's bookings and changes, with the parts that may differ between runs masked."""
+    email = f"story-{strategy}@{EMAIL_DOMAIN}"
+    start = SIX_PM + timedelta(days=5)
+    responses = [
+        book(email, start, strategy=strategy),
+        # A party of two gets a table for two, which cannot take four
+        book(email, start, guest_count=4, strategy=strategy),
+        book(email, start, guest_count=1, strategy=strategy),
+        book(email, start, guest_count=1, strategy=strategy),
+        book(email, start + timedelta(minutes=30), strategy=strategy),
+        book(email, start + timedelta(hours=2), guest_count=3, strategy=strategy),
+    ]
+    with get_db() as db:
+        responses.append(create_reservation(db, f"nameless-{strategy}@{EMAIL_DOMAIN}", start, 2,
+                                            strategy=strategy))
+
+    capacities = get_table_inventory().capacities
+    for response in responses:
+        data = response.get("data", {})
+        if "email" in data:
+            data["email"] = data["email"].replace(strategy, "")
+        # Ties between equally sized tables are broken at random, so compare sizes
+        if "table_number" in data:
+            data["table_number"] = capacities[data["table_number"]]
+        if "tables" in data:
+            data["tables"] = [capacities[n] for n in data["tables"]]
+    return responses
+
+
+def test_single_statement_responds_like_the_retry_path(clean_database):
+    assert booking_story("single_statement") == booking_story("retry")